@@ -2287,6 +2287,52 @@ class RuntimeApiEngine:
 
         return Utilities.nativeToPythonArray(valueNumElements, valueValue)
 
+    def getExpressionArrayNumpy(
+            self
+            ,
+            expression
+    ):
+        """
+        Attempts to retrieve the numeric array value of the specified expression as numpy array.
+
+        The native buffer is copied once into an array owned by numpy, which is much faster than
+        getExpressionArray for large values. Requires the numpy package.
+
+        .. note::
+
+            To call this function successfully, the engine must be in either the Prepared, or
+            Mission-Plan-Error state.
+
+        :param engine:          The handle to the target FreeFlyer engine.
+        :param expression:      The expression whose value to retrieve.
+
+        :returns:               The numeric array value of the specified expression (float64 numpy array).
+
+        :raises: RuntimeApiException, see getExpressionArray for the possible errors.
+        """
+        if self._IsClosed:
+            raise RuntimeError("A closed engine cannot be used.")
+
+        if expression is None:
+            raise TypeError("The argument 'expression' must not be NoneType.")
+
+        valueNumElements = ctypes.c_size_t()
+        valueValue = ctypes.POINTER(ctypes.c_double)()
+
+        Utilities.checkResult(
+            CInterfaceWrapper.lib.ffGetExpressionArray(
+                self._EngineHandle
+                ,
+                Utilities.encodeString(expression)
+                ,
+                byref(valueNumElements)
+                ,
+                byref(valueValue)
+            )
+        )
+
+        return Utilities.nativeToNumpyArray(valueNumElements, valueValue)
+
     def getExpressionArrayAsync(
             self
             ,
@@ -2398,6 +2444,55 @@ class RuntimeApiEngine:
 
         return Utilities.nativeToPythonMatrix(valueNumRows, valueNumCols, valueValue)
 
+    def getExpressionMatrixNumpy(
+            self
+            ,
+            expression
+    ):
+        """
+        Attempts to retrieve the numeric matrix value of the specified expression as numpy array.
+
+        The native buffer is copied once into an array owned by numpy, which is much faster than
+        getExpressionMatrix for large values. Requires the numpy package.
+
+        .. note::
+
+            To call this function successfully, the engine must be in either the Prepared, or
+            Mission-Plan-Error state.
+
+        :param engine:          The handle to the target FreeFlyer engine.
+        :param expression:      The expression whose value to retrieve.
+
+        :returns:               The numeric matrix value of the specified expression (float64 numpy array of shape (rows, columns)).
+
+        :raises: RuntimeApiException, see getExpressionMatrix for the possible errors.
+        """
+        if self._IsClosed:
+            raise RuntimeError("A closed engine cannot be used.")
+
+        if expression is None:
+            raise TypeError("The argument 'expression' must not be NoneType.")
+
+        valueNumRows = ctypes.c_size_t()
+        valueNumCols = ctypes.c_size_t()
+        valueValue = ctypes.POINTER(ctypes.c_double)()
+
+        Utilities.checkResult(
+            CInterfaceWrapper.lib.ffGetExpressionMatrix(
+                self._EngineHandle
+                ,
+                Utilities.encodeString(expression)
+                ,
+                byref(valueNumRows)
+                ,
+                byref(valueNumCols)
+                ,
+                byref(valueValue)
+            )
+        )
+
+        return Utilities.nativeToNumpyMatrix(valueNumRows, valueNumCols, valueValue)
+
     def getExpressionMatrixAsync(
             self
             ,
@@ -2617,6 +2712,55 @@ class RuntimeApiEngine:
 
         return Utilities.nativeToPythonTimeSpanArray(valueNumElements, valueWholeSeconds, valueNanoseconds)
 
+    def getExpressionTimeSpanArrayNumpy(
+            self
+            ,
+            expression
+    ):
+        """
+        Attempts to retrieve the timespan array value of the specified expression as numpy array.
+
+        The native buffer is copied once into an array owned by numpy, which is much faster than
+        getExpressionTimeSpanArray for large values. Requires the numpy package.
+
+        .. note::
+
+            To call this function successfully, the engine must be in either the Prepared, or
+            Mission-Plan-Error state.
+
+        :param engine:          The handle to the target FreeFlyer engine.
+        :param expression:      The expression whose value to retrieve.
+
+        :returns:               The timespan array value of the specified expression as two int64 numpy arrays (whole seconds, nanoseconds).
+
+        :raises: RuntimeApiException, see getExpressionTimeSpanArray for the possible errors.
+        """
+        if self._IsClosed:
+            raise RuntimeError("A closed engine cannot be used.")
+
+        if expression is None:
+            raise TypeError("The argument 'expression' must not be NoneType.")
+
+        valueNumElements = ctypes.c_size_t()
+        valueWholeSeconds = ctypes.POINTER(ctypes.c_int64)()
+        valueNanoseconds = ctypes.POINTER(ctypes.c_int64)()
+
+        Utilities.checkResult(
+            CInterfaceWrapper.lib.ffGetExpressionTimeSpanArray(
+                self._EngineHandle
+                ,
+                Utilities.encodeString(expression)
+                ,
+                byref(valueNumElements)
+                ,
+                byref(valueWholeSeconds)
+                ,
+                byref(valueNanoseconds)
+            )
+        )
+
+        return Utilities.nativeToNumpyTimeSpanArray(valueNumElements, valueWholeSeconds, valueNanoseconds)
+
     def getExpressionTimeSpanArrayAsync(
             self
             ,
@@ -3090,6 +3234,52 @@ class RuntimeApiEngine:
             )
         )
 
+    def setExpressionArrayNumpy(
+            self
+            ,
+            expression
+            ,
+            value
+    ):
+        """
+        Attempts to set the numeric array value of the specified expression from a numpy array.
+
+        The data is passed to the engine without building an intermediate ctypes array. Requires
+        the numpy package.
+
+        .. note::
+
+            To call this function successfully, the engine must be in the Prepared state.
+
+        :param engine:          The handle to the target FreeFlyer engine.
+        :param expression:      The expression whose value to set.
+        :param value:           The numeric array value with which to assign the specified expression (one-dimensional array-like).
+
+        :raises: RuntimeApiException, see setExpressionArray for the possible errors.
+        """
+        if self._IsClosed:
+            raise RuntimeError("A closed engine cannot be used.")
+
+        if expression is None:
+            raise TypeError("The argument 'expression' must not be NoneType.")
+
+        if value is None:
+            raise TypeError("The argument 'value' must not be NoneType.")
+
+        value, valuePointer = Utilities.numpyArrayToCArray(value)
+
+        Utilities.checkResult(
+            CInterfaceWrapper.lib.ffSetExpressionArray(
+                self._EngineHandle
+                ,
+                Utilities.encodeString(expression)
+                ,
+                len(value)
+                ,
+                valuePointer
+            )
+        )
+
     def setExpressionArrayAsync(
             self
             ,
@@ -3255,6 +3445,54 @@ class RuntimeApiEngine:
             )
         )
 
+    def setExpressionMatrixNumpy(
+            self
+            ,
+            expression
+            ,
+            value
+    ):
+        """
+        Attempts to set the numeric matrix value of the specified expression from a numpy array.
+
+        The data is passed to the engine without building an intermediate ctypes array. Requires
+        the numpy package.
+
+        .. note::
+
+            To call this function successfully, the engine must be in the Prepared state.
+
+        :param engine:          The handle to the target FreeFlyer engine.
+        :param expression:      The expression whose value to set.
+        :param value:           The numeric matrix value with which to assign the specified expression (two-dimensional array-like, row major).
+
+        :raises: RuntimeApiException, see setExpressionMatrix for the possible errors.
+        """
+        if self._IsClosed:
+            raise RuntimeError("A closed engine cannot be used.")
+
+        if expression is None:
+            raise TypeError("The argument 'expression' must not be NoneType.")
+
+        if value is None:
+            raise TypeError("The argument 'value' must not be NoneType.")
+
+        value, valuePointer = Utilities.numpyMatrixToCMatrix(value)
+
+        Utilities.checkResult(
+            CInterfaceWrapper.lib.ffSetExpressionMatrix(
+                self._EngineHandle
+                ,
+                Utilities.encodeString(expression)
+                ,
+                value.shape[0]
+                ,
+                value.shape[1]
+                ,
+                valuePointer
+            )
+        )
+
     def setExpressionMatrixAsync(
             self
             ,
@@ -3585,6 +3823,59 @@ class RuntimeApiEngine:
             )
         )
 
+    def setExpressionTimeSpanArrayNumpy(
+            self
+            ,
+            expression
+            ,
+            value
+    ):
+        """
+        Attempts to set the timespan array value of the specified expression from numpy arrays.
+
+        The data is passed to the engine without building intermediate ctypes arrays. Requires
+        the numpy package.
+
+        .. note::
+
+            To call this function successfully, the engine must be in the Prepared state.
+
+        :param engine:          The handle to the target FreeFlyer engine.
+        :param expression:      The expression whose value to set.
+        :param value:           The timespan array value as tuple (whole seconds, nanoseconds) of integer
+                                arrays, as returned by getExpressionTimeSpanArrayNumpy.
+
+        :raises: RuntimeApiException, see setExpressionTimeSpanArray for the possible errors.
+        """
+        if self._IsClosed:
+            raise RuntimeError("A closed engine cannot be used.")
+
+        if expression is None:
+            raise TypeError("The argument 'expression' must not be NoneType.")
+
+        if value is None:
+            raise TypeError("The argument 'value' must not be NoneType.")
+
+        wholeSeconds, wholeSecondsPointer = Utilities.numpyArrayToCArray(value[0], ctypes.c_int64)
+        nanoseconds, nanosecondsPointer = Utilities.numpyArrayToCArray(value[1], ctypes.c_int64)
+
+        if len(wholeSeconds) != len(nanoseconds):
+            raise ValueError("The whole seconds and nanoseconds arrays must have the same length.")
+
+        Utilities.checkResult(
+            CInterfaceWrapper.lib.ffSetExpressionTimeSpanArray(
+                self._EngineHandle
+                ,
+                Utilities.encodeString(expression)
+                ,
+                len(wholeSeconds)
+                ,
+                wholeSecondsPointer
+                ,
+                nanosecondsPointer
+            )
+        )
+
     def setExpressionTimeSpanArrayAsync(
             self
             ,
@@ -24,6 +24,12 @@ import ctypes
 import sys
 import locale
 
+try:
+    import numpy
+except ImportError:
+    # numpy is only needed for the *Numpy variants of the array and matrix accessors
+    numpy = None
+
 from .FFTimeSpan import FFTimeSpan
 from .CInterfaceWrapper import CInterfaceWrapper
 from .RuntimeApiException import RuntimeApiException
@@ -123,6 +129,99 @@ class Utilities:
                 wholeSeconds[i],
                 nanoseconds[i]) for i in range(num_elements.value)]
 
+    @staticmethod
+    def requireNumpy():
+        """
+            Raise an ImportError if numpy is not available.
+        """
+        if numpy is None:
+            raise ImportError("The *Numpy functions of the Runtime API require the numpy package.")
+
+    @staticmethod
+    def nativeToNumpyArray(num_elements, p_native_array):
+        """
+            Convert a native C-array into a numpy array. The native buffer is copied once into
+            an array owned by numpy before it is freed.
+        """
+        try:
+            Utilities.requireNumpy()
+
+            if num_elements.value == 0 or not p_native_array:
+                return numpy.empty(0, dtype=numpy.float64)
+
+            return numpy.ctypeslib.as_array(p_native_array, shape=(num_elements.value,)).copy()
+
+        finally:
+            CInterfaceWrapper.lib.ffFreeMemory(p_native_array)
+
+    @staticmethod
+    def nativeToNumpyMatrix(num_rows, num_cols, p_native_matrix):
+        """
+            Convert a native C-matrix (row major) into a 2d numpy array of shape (num_rows, num_cols).
+        """
+        try:
+            Utilities.requireNumpy()
+
+            if num_rows.value == 0 or num_cols.value == 0 or not p_native_matrix:
+                return numpy.empty((num_rows.value, num_cols.value), dtype=numpy.float64)
+
+            return numpy.ctypeslib.as_array(p_native_matrix, shape=(num_rows.value, num_cols.value)).copy()
+
+        finally:
+            CInterfaceWrapper.lib.ffFreeMemory(p_native_matrix)
+
+    @staticmethod
+    def nativeToNumpyTimeSpanArray(
+            num_elements,
+            native_whole_seconds_array,
+            native_nanoseconds_array):
+        """
+            Convert a native C-timespan-array into two int64 numpy arrays (whole seconds, nanoseconds).
+        """
+        try:
+            Utilities.requireNumpy()
+
+            if num_elements.value == 0 or not native_whole_seconds_array or not native_nanoseconds_array:
+                return numpy.empty(0, dtype=numpy.int64), numpy.empty(0, dtype=numpy.int64)
+
+            shape = (num_elements.value,)
+            return (numpy.ctypeslib.as_array(native_whole_seconds_array, shape=shape).copy(),
+                    numpy.ctypeslib.as_array(native_nanoseconds_array, shape=shape).copy())
+
+        finally:
+            CInterfaceWrapper.lib.ffFreeMemory(native_whole_seconds_array)
+            CInterfaceWrapper.lib.ffFreeMemory(native_nanoseconds_array)
+
+    @staticmethod
+    def numpyArrayToCArray(value, ctype=ctypes.c_double):
+        """
+            Convert an array-like of numbers into a contiguous numpy array and a C-pointer to its data.
+            The numpy array has to be kept alive as long as the pointer is used.
+        """
+        Utilities.requireNumpy()
+
+        value = numpy.ascontiguousarray(value, dtype=numpy.dtype(ctype))
+
+        if value.ndim != 1:
+            raise ValueError("The argument 'value' must be a one-dimensional array.")
+
+        return value, value.ctypes.data_as(ctypes.POINTER(ctype))
+
+    @staticmethod
+    def numpyMatrixToCMatrix(value):
+        """
+            Convert a 2d array-like of double into a contiguous (row major) numpy array and a
+            C-pointer to its data. The numpy array has to be kept alive as long as the pointer is used.
+        """
+        Utilities.requireNumpy()
+
+        value = numpy.ascontiguousarray(value, dtype=numpy.float64)
+
+        if value.ndim != 2:
+            raise ValueError("The argument 'value' must be a two-dimensional array.")
+
+        return value, value.ctypes.data_as(ctypes.POINTER(ctypes.c_double))
+
     @staticmethod
     def pythonArrayToCArray(value):
         """
@@ -3,24 +3,34 @@ import shutil
 try:
     # import sys
     import os
+    import asyncio
     import threading
+    from bisect import bisect_right
     import tkinter as tk
     from tkinter import messagebox as mbox
     from tkinter import filedialog
     from tkinter import scrolledtext as st
     import tkinter.ttk as ttk
     import numpy as np
-    from time import sleep
+    from time import sleep, time
 
     # import scipy.fft as fft
     # from matplotlib.backends.backend_tkagg import (FigureCanvasTkAgg, NavigationToolbar2Tk)
     # import matplotlib.pyplot as plt
     from skyfield.api import load as sky_load
+    from skyfield.api import wgs84 as sky_wgs84
 
-    from utils.configManager import MISSION_PLAN_PATH, EPHEMERIDES_PATH, OGS_TLE_FILE
+    from utils.configManager import MISSION_PLAN_PATH, EPHEMERIDES_PATH, OGS_TLE_FILE, \
+        FREEFLYER_ENGINES, FREEFLYER_ASYNC_MODE, EPHEMERIS_TOLERANCE_ARCSEC, \
+        EPHEMERIS_BINARY_STORE, TELEMETRY_GUI_REFRESH_S, TELEMETRY_STALE_PERIODS
+    from utils.skyfieldProvider import get_timescale
     import preprocessing as pre
     import freeflyer as ff
+    import ephemeris as eph
+    import ephemerisstore
     import tracking
+    import telemetry
+    import tracklog
 
 except ModuleNotFoundError as msg:
     print('Failed to load modules. \n' + str(msg))
@@ -56,7 +66,7 @@ class APP(tk.Tk):
         self.postprocessing_tab = ttk.Frame(self.master_tab_holder)
 
         # important variables
-        self.ts = sky_load.timescale()
+        self.ts = get_timescale()
         self.startup_time = self.ts.now()
         self.year = tk.IntVar(value=self.startup_time.utc.year)
         self.month = tk.IntVar(value=self.startup_time.utc.month)
@@ -68,12 +78,25 @@ class APP(tk.Tk):
         self.use_ogs_TLEs = tk.BooleanVar(value=False)
         self.use_spaceTrack_TLEs = tk.BooleanVar(value=True)
         self.sat_tree = None # will be ttk.Treeview
+        self.sat_data_list = list() # rows of sat_tree, sorted by time to rise
+        self.sat_catalog = None # will be satcatalog.SatelliteCatalog of the last computation
+        self.sat_list_progress = tk.DoubleVar(value=0)
+        self.sat_list_status = tk.StringVar(value="")
+        self.sat_list_cancel = threading.Event()
         self.mission_runner = ff.MissionPlanRunner()
         self.eph_preview = None # will be st.ScrolledText
         self.eph_file = None # will be string of filepath
+        self.eph_store = None # will be ephemerisstore.EphemerisStore if a store instead of an .eph file is selected
+        self.eph_store_sat = tk.StringVar(value="") # satellite of the store that is tracked
+        self.eph_store_box = None # will be ttk.Combobox
         self.tle_age_info = tk.StringVar(value=f"TLE sources are {pre.get_TLE_data_aga(ogs_flag=False)} days old")
         self.tel_conn_status_label = None # will be tk.Label (tk instead of ttk because coloring is easier)
         self.telescope = tracking.TelescopeWrapper()
+        self.track_scheduler = tracking.TrackScheduler(self.telescope, on_start=self._scheduled_track_started,
+                                                       on_error=self._show_track_queue_error,
+                                                       progress=self._show_upload_progress)
+        self.track_queue_info = tk.StringVar(value="Track queue empty")
+        self.telemetry = telemetry.TelemetrySampler(self.telescope) # polls the telescope while it is connected
         self.tracking_status_label = None # will be tk.Label (tk instead of ttk because coloring is easier)
         self.current_Azi = tk.StringVar(value="Not connected")
         self.current_Elev = tk.StringVar(value="Not connected")
@@ -82,6 +105,8 @@ class APP(tk.Tk):
         # threads
         # self.timing_thread = None  # will be a new thread each time there is a new measurement started
         self.tracking_thread = None  # will be a new thread each time there is a new track started
+        self.sat_list_thread = None  # will be a new thread each time the satellite list is computed
+        self.ff_thread = None  # will be a new thread each time FreeFlyer generates ephemerides asynchronously
         # self.converting_thread = None  # will be a new thread each time there is a new measurement started
 
         # # plotting
@@ -99,7 +124,10 @@ class APP(tk.Tk):
     def _app_quit(self):
         """ Quit application """
         err_msg = None
+        self.sat_list_cancel.set() # stop a running satellite list computation
+        self.track_scheduler.stop() # no more queued tracks
         if self.telescope.connected_flag: # disconnect telescope
+            self.telemetry.stop()
             err_msg = self.telescope.disconnect_telescope()
         if err_msg is None:
             self.destroy()
@@ -202,6 +230,11 @@ class APP(tk.Tk):
                        padx=self.WIDGET_PADX, pady=self.WIDGET_PADY)
 
         self._tree_frame.grid(row=1, column=0, columnspan=2)
+        ttk.Progressbar(self.satellite_summary_frame, variable=self.sat_list_progress, maximum=100,
+                        mode='determinate').grid(row=2, column=0)
+        ttk.Button(self.satellite_summary_frame, text="Cancel",
+                   command=self.sat_list_cancel.set).grid(row=2, column=1)
+        ttk.Label(self.satellite_summary_frame, textvariable=self.sat_list_status).grid(row=3, column=0, columnspan=2)
         for widget in self.satellite_summary_frame.winfo_children():
             widget.grid_configure(padx=self.WIDGET_PADX, pady=self.WIDGET_PADY, sticky="NESW")
 
@@ -214,6 +247,9 @@ class APP(tk.Tk):
                    command=self._ff_sgp4_eph).grid(row=0, column=0, padx=self.WIDGET_PADX, pady=self.WIDGET_PADY, sticky="NESW")
         ttk.Button(self.freeFlyer_frame, text="Generate Ephemerides based on Orbit Determination",
                    command=self._ff_od_eph).grid(row=0, column=1, padx=self.WIDGET_PADX, pady=self.WIDGET_PADY, sticky="NESW")
+        ttk.Button(self.freeFlyer_frame, text="Generate Ephemerides based on SGP4 without FreeFlyer (selected satellites)",
+                   command=self._sgp4_eph).grid(row=1, column=0, columnspan=2, padx=self.WIDGET_PADX,
+                                                pady=self.WIDGET_PADY, sticky="NESW")
         self.freeFlyer_frame.grid(row=2, column=0, columnspan=2)
 
         # tab layout
@@ -258,6 +294,10 @@ class APP(tk.Tk):
             return
 
     def _update_satellite_list(self):
+        if self.sat_list_thread is not None and self.sat_list_thread.is_alive():
+            mbox.showerror("Error", "Wait for current satellite list computation to finish or cancel it!")
+            return
+
         start_time = self.ts.utc(self.year.get(),
                                  self.month.get(),
                                  self.day.get(),
@@ -266,29 +306,64 @@ class APP(tk.Tk):
         duration = self.dr_hour.get() * 60 + self.dr_minute.get()
 
         print(start_time)
-        self.sat_data_list, self.sat_tle_dict = pre.create_satellite_data_list(start_time, duration,
-                                                                               ogs_flag=self.use_ogs_TLEs.get())
-
-        # sort by time to rise, item = x.y min
-        self.sat_data_list.sort(key = lambda item: float(item[2].strip().split()[0]))
-
+        self.sat_data_list = list()
         self.sat_tree.delete(*self.sat_tree.get_children())  # clears table before refill
-        for sat_data in self.sat_data_list:  # refill
-            self.sat_tree.insert('', tk.END, values=sat_data)
-        return
-
+        self.sat_list_progress.set(0)
+        self.sat_list_status.set("Loading TLE catalog")
+        self.sat_list_cancel.clear()
+        # rows are computed in the background and handed to the GUI via after() as soon as a shard is done
+        self.sat_list_thread = self._start_a_thread(self._compute_satellite_list,
+                                                    args=(start_time, duration, self.use_ogs_TLEs.get()))
+
+    def _compute_satellite_list(self, start_time, duration:int, ogs_flag:bool):
+        # only called internally by a thread, all GUI changes are scheduled with after()
+        try:
+            catalog = pre.load_TLE_catalog(ogs_flag)
+            self.after(0, setattr, self, "sat_catalog", catalog)
+            for done, total, rows in pre.iter_satellite_data(catalog, start_time, duration):
+                if self.sat_list_cancel.is_set():
+                    break # closing the generator stops the remaining shards
+                self.after(0, self._insert_satellite_rows, [sat_data for _, sat_data in rows], done, total)
+        except Exception as e:
+            self.after(0, mbox.showerror, "Error", f"Satellite list could not be computed:\n{str(e)}")
+            self.after(0, self.sat_list_status.set, "Failed")
+            return
+        if self.sat_list_cancel.is_set():
+            # the message is built in the GUI thread, after the rows scheduled before have been inserted
+            self.after(0, self._cancel_satellite_list)
+        else:
+            self.after(0, self._finish_satellite_list)
+
+    def _insert_satellite_rows(self, rows:list, done:int, total:int):
+        # keep the table sorted by time to rise, item = x.y min
+        rise_times = [float(sat_data[2].strip().split()[0]) for sat_data in self.sat_data_list]
+        for sat_data in rows:
+            rise_time = float(sat_data[2].strip().split()[0])
+            index = bisect_right(rise_times, rise_time)
+            rise_times.insert(index, rise_time)
+            self.sat_data_list.insert(index, sat_data)
+            self.sat_tree.insert('', index, values=sat_data)
+        self.sat_list_progress.set(100 * done / total if total > 0 else 100)
+        self.sat_list_status.set(f"{done}/{total} satellites checked, {len(self.sat_data_list)} visible")
+
+    def _finish_satellite_list(self):
+        self.sat_list_progress.set(100)
+        self.sat_list_status.set(f"{len(self.sat_data_list)} visible satellites")
+
+    def _cancel_satellite_list(self):
+        self.sat_list_status.set(f"Cancelled, {len(self.sat_data_list)} satellites listed")
 
     def _export_satellites(self):
         selected_items = self.sat_tree.selection()
         if len(selected_items) > 0:
-            with open(os.path.join(MISSION_PLAN_PATH, "TLE_export.tle"), "w", encoding='utf-8') as f:
-                for _id in selected_items:
-                    sat_key = self.sat_tree.item(_id).get("values")[1]  # NoradID
-                    for line in self.sat_tle_dict[sat_key]:
-                        f.write(line)
+            norad_ids = [self.sat_tree.item(_id).get("values")[1] for _id in selected_items]  # NoradID
+            self.sat_catalog.export_tle(os.path.join(MISSION_PLAN_PATH, "TLE_export.tle"), norad_ids)
         mbox.showinfo("Info", "Exported selected TLE data!")
 
     def _ff_sgp4_eph(self):
+        if self.ff_thread is not None and self.ff_thread.is_alive():
+            mbox.showerror("Error", "Wait for the current ephemeris generation to finish!")
+            return
         start_time = self.ts.utc(self.year.get(),
                                  self.month.get(),
                                  self.day.get(),
@@ -296,11 +371,26 @@ class APP(tk.Tk):
                                  self.minute.get())
         durationMin = self.dr_hour.get() * 60 + self.dr_minute.get()
         startTimeString = start_time.utc_strftime("%b %d %Y %H:%M:%S")
+        eph_dir = os.path.join(EPHEMERIDES_PATH, start_time.utc_strftime(f"%Y%b%d__%H_%M__{durationMin}"))
         os.mkdir(os.path.join(MISSION_PLAN_PATH, "tmp")) # eph files will be put there
-        self.mission_runner.run_SGP4_EPH_plan(durationMin, startTimeString)
+        if FREEFLYER_ASYNC_MODE: # engines work in the background, files are moved as soon as they are done
+            os.makedirs(eph_dir, exist_ok=True)
+            self.ff_thread = self._start_a_thread(self._ff_sgp4_eph_async, args=(durationMin, startTimeString, eph_dir))
+            return
+        if FREEFLYER_ENGINES > 1: # satellites distributed over several engines
+            self.mission_runner.run_SGP4_EPH_plan_parallel(durationMin, startTimeString)
+        else:
+            self.mission_runner.run_SGP4_EPH_plan(durationMin, startTimeString)
+        self._ff_sgp4_eph_finish(eph_dir)
+
+    def _ff_sgp4_eph_async(self, durationMin:int, startTimeString:str, eph_dir:str):
+        # only called internally by a thread, the event loop lives as long as the ephemeris generation
+        asyncio.run(self.mission_runner.run_SGP4_EPH_plan_async(durationMin, startTimeString, eph_dir))
+        self.after(0, self._ff_sgp4_eph_finish, eph_dir)
+
+    def _ff_sgp4_eph_finish(self, eph_dir:str):
         if self.mission_runner.missionplan_success_flag:
             # now there exist files called "ASATrackingData_xy.txt"
-            eph_dir = os.path.join(EPHEMERIDES_PATH, start_time.utc_strftime(f"%Y%b%d__%H_%M__{durationMin}"))
             # check if dir exits:
             if not os.path.isdir(eph_dir):
                 os.mkdir(eph_dir) # create if non-existing
@@ -308,13 +398,68 @@ class APP(tk.Tk):
                 if eph_file.startswith("ASATrackingData"):
                     shutil.move(os.path.join(MISSION_PLAN_PATH, "tmp", eph_file), str(eph_dir))
             # moved all eph files
-            mbox.showinfo("Info", "Generated Ephemerides!")
+            stats = list()
+            if EPHEMERIS_TOLERANCE_ARCSEC > 0:
+                # thin out the files FreeFlyer reported with the fixed step
+                for sat_name in ff.read_export_names():
+                    eph_file = os.path.join(eph_dir, eph.eph_file_name(sat_name))
+                    if os.path.exists(eph_file):
+                        _, lines, max_error = eph.thin_eph_file(eph_file)
+                        stats.append((sat_name, lines, max_error))
+            if EPHEMERIS_BINARY_STORE:
+                # FreeFlyer can only write text, the store makes them available without parsing again
+                eph_files = [(sat_name, os.path.join(eph_dir, eph.eph_file_name(sat_name)))
+                             for sat_name in ff.read_export_names()]
+                ephemerisstore.write_store(eph_dir, [(sat_name, eph.read_eph_states(eph_file))
+                                                     for sat_name, eph_file in eph_files if os.path.exists(eph_file)])
+            mbox.showinfo("Info", "Generated Ephemerides!" + self._ephemeris_summary(stats))
         else:
             mbox.showerror("Error", message=
                             f"There was an error while executing the missionplan:\n{self.mission_runner.error_msg}")
         shutil.rmtree(os.path.join(MISSION_PLAN_PATH, "tmp"), ignore_errors=False)
 
 
+    def _sgp4_eph(self):
+        selected_items = self.sat_tree.selection()
+        if self.sat_catalog is None or len(selected_items) == 0:
+            mbox.showerror("Error", "Select satellites in the satellite list first!")
+            return
+        norad_ids = [self.sat_tree.item(_id).get("values")[1] for _id in selected_items]  # NoradID
+
+        start_time = self.ts.utc(self.year.get(),
+                                 self.month.get(),
+                                 self.day.get(),
+                                 self.hour.get(),
+                                 self.minute.get())
+        durationMin = self.dr_hour.get() * 60 + self.dr_minute.get()
+        gnd_station = sky_wgs84.latlon(*pre.load_StationLatLongAlt())
+        # same directory as the FreeFlyer generated files, all satellites are propagated in one go
+        eph_dir = os.path.join(EPHEMERIDES_PATH, start_time.utc_strftime(f"%Y%b%d__%H_%M__{durationMin}"))
+        try:
+            if EPHEMERIS_BINARY_STORE: # one file for the run, .eph text is exported when a track is started
+                ephemerides = eph.compute_ephemerides(self.sat_catalog, norad_ids, gnd_station, start_time, durationMin)
+                ephemerisstore.write_store(eph_dir, ephemerides)
+                stats = [(sat_name, len(states), max_error) for sat_name, states, max_error in ephemerides]
+            else:
+                eph_files = eph.write_ephemerides(self.sat_catalog, norad_ids, gnd_station, start_time, durationMin,
+                                                  eph_dir)
+                stats = [(os.path.basename(eph_file), lines, max_error) for eph_file, lines, max_error in eph_files]
+        except Exception as e:
+            mbox.showerror("Error", message=f"There was an error while generating the ephemerides:\n{str(e)}")
+            return
+        mbox.showinfo("Info", "Generated Ephemerides!" + self._ephemeris_summary(stats))
+
+    @staticmethod
+    def _ephemeris_summary(stats:list) -> str:
+        # stats: (name, lines, max. interpolation error in arcsec), only of interest if lines were thinned out
+        if EPHEMERIS_TOLERANCE_ARCSEC <= 0 or len(stats) == 0:
+            return ""
+        for name, lines, max_error in stats:
+            print(f"{name}: {lines} lines, max. interpolation error {max_error:.2f} arcsec")
+        return (f"\n{sum(lines for _, lines, _ in stats)} lines in {len(stats)} files, "
+                f"max. interpolation error {max(max_error for _, _, max_error in stats):.2f} arcsec "
+                f"(tolerance {EPHEMERIS_TOLERANCE_ARCSEC} arcsec)")
+
     def _ff_od_eph(self):
         pass
 
@@ -331,6 +476,9 @@ class APP(tk.Tk):
         self.eph_frame = ttk.LabelFrame(self.tracking_tab, text="Ephemeris selection and inspection")
         ttk.Button(self.eph_frame, text="Select Ephemeris file", command=self._select_eph_file) \
             .pack(padx=self.WIDGET_PADX, pady=self.WIDGET_PADY, expand=True, fill='x')
+        self.eph_store_box = ttk.Combobox(self.eph_frame, textvariable=self.eph_store_sat, state="disabled")
+        self.eph_store_box.bind("<<ComboboxSelected>>", lambda event: self._show_eph_store_sat())
+        self.eph_store_box.pack(padx=self.WIDGET_PADX, pady=self.WIDGET_PADY, expand=True, fill='x')
         self.eph_preview = st.ScrolledText(self.eph_frame, width=90, height=20)
         self.eph_preview.pack(padx=self.WIDGET_PADX, pady=self.WIDGET_PADY, fill='x')
         self.eph_frame.grid(row=0, column=0, columnspan=1)
@@ -349,6 +497,9 @@ class APP(tk.Tk):
             .grid(row=1, column=0)
         self.tracking_status_label = tk.Label(self.telescope_frame, text="Not Tracking", bg="red")
         self.tracking_status_label.grid(row=1, column=1)
+        ttk.Button(self.telescope_frame, text="Add to track queue", command=self._queue_track) \
+            .grid(row=2, column=0)
+        ttk.Label(self.telescope_frame, textvariable=self.track_queue_info).grid(row=2, column=1)
 
         ttk.Label(self.telescope_frame, text="Current Azimuth (deg):").grid(row=0, column=3)
         ttk.Label(self.telescope_frame, text="Current Elevation (deg):").grid(row=1, column=3)
@@ -357,7 +508,7 @@ class APP(tk.Tk):
 
         for widget in self.telescope_frame.winfo_children():
             widget.grid_configure(padx=self.WIDGET_PADX, pady=self.WIDGET_PADY, sticky="nesw")
-        ttk.Separator(self.telescope_frame, orient="vertical").grid(row=0, rowspan=2, column=2, sticky="ns",
+        ttk.Separator(self.telescope_frame, orient="vertical").grid(row=0, rowspan=3, column=2, sticky="ns",
                                                                     padx=self.WIDGET_PADX, pady=self.WIDGET_PADY)
 
         # layout
@@ -369,7 +520,24 @@ class APP(tk.Tk):
         self.eph_preview.configure(state="normal")
         self.eph_preview.delete("1.0", "end")
         self.eph_file = filedialog.askopenfilename(title="Select ephemeris file",
-                                                   filetypes=[("Ephemeris Files", ".eph")])
+                                                   filetypes=[("Ephemeris Files", ".eph"),
+                                                              ("Ephemeris Stores", ".npy")])
+        self.eph_store = None
+        self.eph_store_sat.set("")
+        self.eph_store_box.configure(values=[], state="disabled")
+
+        if self.eph_file and self.eph_file.endswith(".npy"): # store of a whole run, choose the satellite below
+            try:
+                self.eph_store = ephemerisstore.EphemerisStore(self.eph_file)
+            except (OSError, ValueError) as e:
+                mbox.showerror("Error", message=f"Ephemeris store can not be opened:\n{str(e)}")
+            else:
+                self.eph_store_box.configure(values=self.eph_store.names, state="readonly")
+                if len(self.eph_store) > 0:
+                    self.eph_store_sat.set(self.eph_store.names[0])
+            self.eph_preview.configure(state='disabled')
+            self._show_eph_store_sat()
+            return
 
         if os.path.exists(self.eph_file): # check if file has been chosen
             # Inserting eph data which is read only
@@ -378,13 +546,24 @@ class APP(tk.Tk):
         # Making the text read only
         self.eph_preview.configure(state='disabled')
 
+    def _show_eph_store_sat(self):
+        # preview of the satellite selected in the store, exported to the .eph text format
+        self.eph_preview.configure(state="normal")
+        self.eph_preview.delete("1.0", "end")
+        if self.eph_store is not None and self.eph_store_sat.get() in self.eph_store:
+            self.eph_preview.insert("1.0", "".join(self.eph_store.eph_lines(self.eph_store_sat.get())))
+        self.eph_preview.configure(state='disabled')
+
     def _toggle_telescope_conn(self):
         if self.telescope.connected_flag:
             # telescope is connected, -> disconnect
+            self.telemetry.stop()
             err_msg = self.telescope.disconnect_telescope()
         else:
             # telescope not yet connected -> connect
             err_msg = self.telescope.connect_telescope()
+            if err_msg is None:
+                self.telemetry.start()
 
         if err_msg is None:
             if self.telescope.connected_flag:
@@ -404,42 +583,119 @@ class APP(tk.Tk):
             mbox.showerror("Error", "Wait for current tracking to finish!")
             return
 
-        if self.telescope.connected_flag and self.eph_file is not None and os.path.exists(self.eph_file):
-            err_msg = self.telescope.start_track(self.eph_file)
-            if err_msg is not None:
-                mbox.showerror(title="Error", message=err_msg)
-            else:
-                # start update thread, telescope sets tracking_flag
-                self.tracking_thread = self._start_a_thread(self._update_status)
+        track = self._selected_track()
+        if self.telescope.connected_flag and track is not None:
+            # the upload can take a while, the same thread follows the track afterwards
+            self.tracking_thread = self._start_a_thread(self._upload_and_follow_track,
+                                                        args=(track, self._selected_track_name(track)))
         else:
             mbox.showerror(title="Error", message="Ephemeris File not configured correctly!")
 
-    def _update_status(self):
-        # only called internally by a thread while tracking
+    def _selected_track(self):
+        # arguments of start_track for the selected ephemeris, None if nothing is selected
+        if self.eph_store is not None and self.eph_store_sat.get() in self.eph_store:
+            return {"lines": self.eph_store.eph_lines(self.eph_store_sat.get())}
+        elif self.eph_file is not None and os.path.exists(self.eph_file):
+            return {"eph_filepath": self.eph_file}
+        return None
+
+    def _selected_track_name(self, track:dict):
+        # name of a track returned by _selected_track, the satellite of the store or the file name
+        return self.eph_store_sat.get() if "lines" in track else os.path.basename(track["eph_filepath"])
+
+    def _queue_track(self):
+        # the scheduler starts the queued tracks in time order as soon as the previous one has finished
+        track = self._selected_track()
+        if track is None:
+            mbox.showerror(title="Error", message="Ephemeris File not configured correctly!")
+            return
+        future = self.track_scheduler.add(**track, name=self._selected_track_name(track))
+        future.add_done_callback(lambda f: self.after(0, self._show_track_queue))
+        self._show_track_queue()
+        self.track_scheduler.start()
+
+    def _show_track_queue(self):
+        names = self.track_scheduler.names
+        if len(self.track_scheduler) == 0:
+            self.track_queue_info.set("Track queue empty")
+        else:
+            self.track_queue_info.set(f"{len(self.track_scheduler)} queued, next: {names[0] if names else '...'}")
+
+    def _scheduled_track_started(self, name:str):
+        # called by the scheduler thread after the mount accepted a queued track
+        self.tracking_thread = self._start_a_thread(self._update_status, args=(name,))
+        self.after(0, self._show_track_queue)
+        print(f"Started queued track {name}")
+
+    def _show_track_queue_error(self, err_msg:str):
+        # called by the scheduler threads
+        self.after(0, mbox.showerror, "Track queue", err_msg)
+        self.after(0, self._show_track_queue)
+
+    def _show_upload_progress(self, sent_lines:int, total_lines:int):
+        # called by start_track in the tracking or scheduler thread, the label is updated by the GUI thread
+        self.after(0, self.update_tracking_label, f"Uploading Ephemeris {sent_lines}/{total_lines} lines", "yellow")
+
+    def _upload_and_follow_track(self, track:dict, track_name:str):
+        # only called internally by a thread, track are the arguments of start_track
+        err_msg = self.telescope.start_track(**track, progress=self._show_upload_progress)
+        if err_msg is not None:
+            self.after(0, self.update_tracking_label, "Not Tracking", "red")
+            self.after(0, mbox.showerror, "Error", err_msg)
+            return
+        self._update_status(track_name) # telescope has set tracking_flag
+
+    def _update_status(self, track_name:str):
+        # only called internally by a thread while tracking, the telescope is polled by self.telemetry
+        # the telemetry of the track is logged until the track has finished
+        track_log = tracklog.TrackLogWriter(track_name)
+        self.telemetry.listeners.append(track_log)
+        try:
+            self._follow_track()
+        finally:
+            self.telemetry.listeners.remove(track_log)
+            track_log.close()
+
+    def _follow_track(self):
         tracking_has_not_started_yet = True
+        track_start = time()
         while self.telescope.tracking_flag: # is set by telescope
-            err_msg = self.telescope.update_status()
+            sleep(TELEMETRY_GUI_REFRESH_S)
+            err_msg = self.telemetry.error
             if err_msg is not None:
                 self.telescope.tracking_flag = False
                 self.after(0, mbox.showerror, "Error", err_msg)
                 return
+            if not self.telemetry.running: # disconnected meanwhile
+                self.telescope.tracking_flag = False
+                self.after(0, self.update_tracking_label, "Not Tracking", "red")
+                return
+            if self.telemetry.is_stale(since=track_start):
+                self.telescope.tracking_flag = False
+                self.after(0, self.update_tracking_label, "No Telemetry", "red")
+                stale_s = TELEMETRY_STALE_PERIODS * self.telemetry.period_s
+                self.after(0, mbox.showerror, "Error",
+                           f"No telemetry for {stale_s:.1f} s, the track is not followed any more")
+                return
+            sample = self.telemetry.latest()
+            if sample is None or sample.time < track_start: # no status of this track yet
+                continue
             elif tracking_has_not_started_yet: # after method is thread safe in tkinter
-                if self.telescope.slewing_bit == 1:
+                if sample.slewing_bit == 1:
                     self.after(0, self.update_tracking_label, "Slewing to Start Position", "yellow")
-                elif self.telescope.slewing_bit == 0 and self.telescope.tracking_bit == 0:
+                elif sample.slewing_bit == 0 and sample.tracking_bit == 0:
                     self.after(0, self.update_tracking_label, "Waiting in Start Position", "yellow")
-                elif self.telescope.tracking_bit == 1:
+                elif sample.tracking_bit == 1:
                     tracking_has_not_started_yet = False # started tracking
                     self.after(0, self.update_tracking_label, "Tracking", "green")
                 else:
                     print("This should never be printed")
             else: # have started tracking already
-                if self.telescope.tracking_bit != 1: # stopped tracking
+                if sample.tracking_bit != 1: # stopped tracking
                     self.after(0, self.update_tracking_label, "Finished Tracking", "yellow")
                     self.telescope.tracking_flag = False
-            self.after(0, self.current_Azi.set, f"{self.telescope.AZ_deg:.8f}")
-            self.after(0, self.current_Elev.set,f"{self.telescope.EL_deg:.8f}")
-            sleep(1)
+            self.after(0, self.current_Azi.set, f"{sample.az:.8f}")
+            self.after(0, self.current_Elev.set,f"{sample.el:.8f}")
 
 
     def update_tracking_label(self, txt, bg):
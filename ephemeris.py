@@ -0,0 +1,409 @@
+import datetime
+import os
+
+import numpy as np
+from sgp4.api import SatrecArray
+from skyfield.sgp4lib import TEME
+
+from passprediction import TimeGrid, station_itrs, CHUNK_SIZE, DAY_S
+from utils.configManager import EPHEMERIS_STEP_S, EPHEMERIS_MIN_ELEVATION, EPHEMERIS_TOLERANCE_ARCSEC, \
+    EPHEMERIS_ADAPTIVE_BASE_STEP_S, EPHEMERIS_ADAPTIVE_MAX_STEP_S
+from utils.skyfieldProvider import get_timescale
+
+MJD_OFFSET = 2400000.5
+OVERRUN_BLOCK_MIN = 5  # passes still going on at the end of the watch window are followed in blocks of this length
+MAX_OVERRUN_MIN = 24 * 60  # the mission plan would follow a geostationary satellite forever, we stop here
+FILE_NAME_REPLACED_CHARS = ' /\\<>:*?"'  # same replacements as SGP4_EPH.MissionPlan
+EPH_COLUMNS = 7  # mjd, RA, DE, VRA, VDE, azimuth, elevation, the columns of a data line
+ARCSEC = np.pi / (180 * 3600)
+LAGRANGE_STENCIL = 5  # lines used for a derivative in lagrange_derivatives
+
+EPH_HEADER = ("#   Ephemerides\n"
+              "#   -----------\n"
+              "#   Created    : {created}\n"
+              "#\n"
+              "#   Object     : {name}\n"
+              "#\n"
+              "#\n"
+              "#   Epoch          RA           DE           VRA       VDE      AZI         ELE\n"
+              "#    mjd           rad          rad             arcs/sec        deg         deg\n"
+              "#\n")
+
+
+def eph_file_name(sat_name:str) -> str:
+    """ name of the .eph file of a satellite, e.g. ASATrackingData_STARLINK-1019.eph """
+    for char in FILE_NAME_REPLACED_CHARS:
+        sat_name = sat_name.replace(char, "-")
+    return f"ASATrackingData_{sat_name}.eph"
+
+
+def eph_header(sat_name:str, created:datetime.datetime=None) -> str:
+    """ header as written by SGP4_EPH.MissionPlan, created defaults to the local system time like FreeFlyer's
+    SystemTime() """
+    created = datetime.datetime.now() if created is None else created
+    created = created.strftime("%b %d %Y %H:%M:%S") + f".{created.microsecond // 1000:03d}000000"
+    return EPH_HEADER.format(created=created, name=sat_name)
+
+
+def eph_line(mjd:float, ra:float, de:float, vra:float, vde:float, az:float, el:float) -> str:
+    """ one data line, RA/DE in radians, their rates in arcsec/s (VRA is sky motion, i.e. dRA/dt * cos(DE)),
+    azimuth and elevation in degrees """
+    return f"{mjd:14.8f} {ra:12.9f}{de:13.9f}  {vra:08.4f}  {vde:08.4f}{az:12.6f}{el:12.6f}\n"
+
+
+def eph_lines(states) -> list:
+    """ data lines of rows of (mjd, RA, DE, VRA, VDE, azimuth, elevation) """
+    return [eph_line(*row) for row in np.asarray(states, dtype=np.float64).reshape(-1, EPH_COLUMNS).tolist()]
+
+
+def write_eph_file(eph_dir:str, sat_name:str, lines:list) -> str:
+    """ writes header and data lines of one satellite, returns the path of the file """
+    eph_file = os.path.join(eph_dir, eph_file_name(sat_name))
+    with open(eph_file, "w") as f:
+        f.write(eph_header(sat_name))
+        f.writelines(lines)
+    return eph_file
+
+
+def _azimuth_elevation(r_teme, theta, station_xyz, lat, lon):
+    """ topocentric azimuth and elevation in degrees of TEME positions r_teme (n_sat, n_t, 3) """
+    cos_t, sin_t = np.cos(theta), np.sin(theta)
+    # TEME -> pseudo earth fixed, polar motion is below the resolution of the files
+    x = cos_t * r_teme[..., 0] + sin_t * r_teme[..., 1] - station_xyz[0]
+    y = -sin_t * r_teme[..., 0] + cos_t * r_teme[..., 1] - station_xyz[1]
+    z = r_teme[..., 2] - station_xyz[2]
+    east = -np.sin(lon) * x + np.cos(lon) * y
+    north = -np.sin(lat) * np.cos(lon) * x - np.sin(lat) * np.sin(lon) * y + np.cos(lat) * z
+    up = np.cos(lat) * np.cos(lon) * x + np.cos(lat) * np.sin(lon) * y + np.sin(lat) * z
+    azimuth = np.degrees(np.arctan2(east, north)) % 360.0
+    elevation = np.degrees(np.arctan2(up, np.hypot(east, north)))
+    return azimuth, elevation
+
+
+def _ra_dec(r_teme, v_teme, rotation):
+    """ geocentric ICRF right ascension and declination in radians and their rates in arcsec/s from the TEME
+    position and velocity, rotation is TEME.rotation_at (GCRS -> TEME)
+
+    VRA is the sky motion dRA/dt * cos(DE) like the ASA format defines it. The rotation changes so slowly (precession
+    and nutation) that the velocity is rotated like the position.
+    """
+    r_gcrs = np.einsum('jin,snj->sni', rotation, r_teme)
+    v_gcrs = np.einsum('jin,snj->sni', rotation, v_teme)
+    x, y, z = r_gcrs[..., 0], r_gcrs[..., 1], r_gcrs[..., 2]
+    vx, vy, vz = v_gcrs[..., 0], v_gcrs[..., 1], v_gcrs[..., 2]
+    rho = np.hypot(x, y)
+    r = np.linalg.norm(r_gcrs, axis=-1)
+    ra = np.arctan2(y, x) % (2 * np.pi)
+    de = np.arcsin(z / r)
+    vra = (x * vy - y * vx) / (rho * r) / ARCSEC
+    vde = (vz * rho * rho - z * (x * vx + y * vy)) / (rho * r * r) / ARCSEC
+    return ra, de, vra, vde
+
+
+def _sample_block(satrecs, sat_idx, t0, k, step_s, gnd_station, min_elevation):
+    """ propagates satrecs[sat_idx] to the steps k, arrays are (satellite, step) """
+    station_xyz, _ = station_itrs(gnd_station)
+    grid = TimeGrid(t0, k * step_s / DAY_S)
+    error, r_teme, v_teme = SatrecArray([satrecs[i] for i in sat_idx]).sgp4(np.full(len(k), grid.jd), grid.fr_utc)
+    azimuth, elevation = _azimuth_elevation(r_teme, grid.theta, station_xyz,
+                                            gnd_station.latitude.radians, gnd_station.longitude.radians)
+    above = (elevation > min_elevation) & (error == 0)
+    return grid, r_teme, v_teme, azimuth, elevation, above
+
+
+def _ephemeris_states(satrecs, t0, durationMin:float, gnd_station, step_s:float, min_elevation:float) -> list:
+    """ (mjd, RA, DE, VRA, VDE, azimuth, elevation) rows of every satellite, same sampling and stop condition as
+    SGP4_EPH.MissionPlan
+
+    The mission plan steps from the start time in step_s intervals as long as the watch window is not over or the
+    satellite is still above min_elevation and reports every step above min_elevation.
+    """
+    ts = get_timescale()
+    blocks = [list() for _ in satrecs]
+    n_window = int(np.ceil(durationMin * 60 / step_s))
+    n_block = int(np.ceil(OVERRUN_BLOCK_MIN * 60 / step_s))
+    n_max = n_window + int(np.ceil(MAX_OVERRUN_MIN * 60 / step_s))
+
+    for chunk_start in range(0, len(satrecs), CHUNK_SIZE):
+        sat_idx = np.arange(chunk_start, min(chunk_start + CHUNK_SIZE, len(satrecs)))
+        k = np.arange(n_window)
+        while len(sat_idx) > 0 and k[0] < n_max:
+            grid, r_teme, v_teme, azimuth, elevation, above = _sample_block(satrecs, sat_idx, t0, k, step_s,
+                                                                            gnd_station, min_elevation)
+            if k[0] < n_window:
+                written = above
+            else:
+                # after the window the mission plan stops at the first step at or below min_elevation
+                written = np.logical_and.accumulate(above, axis=1)
+
+            if written.any():
+                ra, de, vra, vde = _ra_dec(r_teme, v_teme, TEME.rotation_at(ts.tt_jd(grid.tt)))
+                mjd = (grid.jd - MJD_OFFSET) + grid.fr_utc
+                for row in np.flatnonzero(written.any(axis=1)):
+                    steps = written[row]
+                    blocks[sat_idx[row]].append(np.column_stack((mjd[steps], ra[row, steps], de[row, steps],
+                                                                 vra[row, steps], vde[row, steps],
+                                                                 azimuth[row, steps], elevation[row, steps])))
+
+            # satellites still above the mask are followed in the next block
+            sat_idx = sat_idx[written[:, -1]] if k[0] >= n_window else sat_idx
+            k = np.arange(k[-1] + 1, k[-1] + 1 + n_block)
+    return [np.concatenate(sat_blocks) if sat_blocks else np.empty((0, EPH_COLUMNS))
+            for sat_blocks in blocks]
+
+
+def _unit_vectors(lon, lat):
+    cos_lat = np.cos(lat)
+    return np.stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)), axis=-1)
+
+
+def _angle(u, v):
+    """ angle between unit vectors in radians, accurate for tiny angles unlike arccos of the dot product """
+    return 2 * np.arcsin(np.clip(np.linalg.norm(u - v, axis=-1) / 2, 0.0, 1.0))
+
+
+def hermite_coefficients(t, p, m):
+    """ cubic c0 + c1*s + c2*s^2 + c3*s^3 (s = seconds since t[i]) through p with the derivatives m of every interval
+    [t[i], t[i+1]]
+
+    :returns: array (interval, 4)
+    """
+    h = np.diff(t)
+    slope = np.diff(p) / h
+    c2 = (3 * slope - 2 * m[:-1] - m[1:]) / h
+    c3 = (m[:-1] + m[1:] - 2 * slope) / (h * h)
+    return np.column_stack((p[:-1], m[:-1], c2, c3))
+
+
+def lagrange_derivatives(t, p):
+    """ derivatives of the polynomials through LAGRANGE_STENCIL neighbouring points (Lagrange), centered where
+    possible. Three points are not enough near the culmination of a high pass, the direction turns too fast there.
+    """
+    n = len(t)
+    size = min(LAGRANGE_STENCIL, n)
+    first = np.clip(np.arange(n) - size // 2, 0, n - size)
+    nodes = first[:, np.newaxis] + np.arange(size)  # (point, stencil)
+    dt = t[:, np.newaxis] - t[nodes]  # x - t_k
+    m = np.zeros(n)
+    for j in range(size):
+        others = [k for k in range(size) if k != j]
+        denominator = np.prod([t[nodes[:, j]] - t[nodes[:, k]] for k in others], axis=0)
+        # d/dx of prod_k (x - t_k) over the other nodes
+        numerator = sum(np.prod([dt[:, k] for k in others if k != l], axis=0) for l in others)
+        m += p[nodes[:, j]] * numerator / denominator
+    return m
+
+
+def _interpolation_error(t, lon, lat, i:int, j:int) -> float:
+    """ largest angle in arcsec between the samples i < k < j and their linear interpolation between i and j,
+    longitudes (RA or azimuth) are interpolated the short way round """
+    if j - i < 2:
+        return 0.0
+    k = np.arange(i + 1, j)
+    w = (t[k] - t[i]) / (t[j] - t[i])
+    d_lon = (lon[j] - lon[i] + np.pi) % (2 * np.pi) - np.pi
+    interpolated = _unit_vectors(lon[i] + w * d_lon, lat[i] + w * (lat[j] - lat[i]))
+    return float(np.max(_angle(interpolated, _unit_vectors(lon[k], lat[k])))) / ARCSEC
+
+
+def _cubic_errors(t, states, rows) -> np.ndarray:
+    """ largest angle in arcsec between the rows between two kept rows and the interpolation of
+    ephemerisinterpolator.EphemerisInterpolator through the kept rows, one value per interval
+
+    RA/DE are cubics through the VRA/VDE rates of the kept rows, azimuth/elevation cubics of the topocentric unit
+    vector with the derivatives of lagrange_derivatives.
+    """
+    rows = np.asarray(rows)
+    errors = np.zeros(max(len(rows) - 1, 0))
+    inner = np.setdiff1d(np.arange(rows[0], rows[-1] + 1), rows)
+    if len(inner) == 0:
+        return errors
+    t_kept = t[rows]
+    interval = np.searchsorted(t_kept, t[inner], side='right') - 1
+    s = t[inner] - t_kept[interval]
+
+    def evaluate(p, m):
+        c = hermite_coefficients(t_kept, p, m)[interval]
+        return ((c[:, 3] * s + c[:, 2]) * s + c[:, 1]) * s + c[:, 0]
+
+    kept = states[rows]
+    ra = evaluate(np.unwrap(kept[:, 1]), kept[:, 3] * ARCSEC / np.cos(kept[:, 2]))  # VRA is sky motion
+    de = evaluate(kept[:, 2], kept[:, 4] * ARCSEC)
+    radec_error = _angle(_unit_vectors(ra, de), _unit_vectors(states[inner, 1], states[inner, 2]))
+
+    direction = _unit_vectors(np.radians(kept[:, 5]), np.radians(kept[:, 6]))
+    interpolated = np.column_stack([evaluate(direction[:, axis], lagrange_derivatives(t_kept, direction[:, axis]))
+                                    for axis in range(3)])
+    interpolated /= np.linalg.norm(interpolated, axis=-1, keepdims=True)
+    azel_error = _angle(interpolated, _unit_vectors(np.radians(states[inner, 5]), np.radians(states[inner, 6])))
+
+    np.maximum.at(errors, interval, np.maximum(radec_error, azel_error) / ARCSEC)
+    return errors
+
+
+def _segment_rows(t, az, el, tolerance_arcsec:float, max_step_s:float) -> list:
+    """ rows of one continuously sampled pass that are kept
+
+    The step after a row follows from the angular acceleration a of the topocentric direction: linear interpolation
+    over a step h is off by about a * h^2 / 8. Steps that still exceed the tolerance (e.g. on RA/DE) are split later.
+    """
+    if len(t) < 3:
+        return list(range(len(t)))
+    dt = np.diff(t)
+    u = _unit_vectors(az, el)
+    acceleration = np.empty(len(t))
+    acceleration[1:-1] = np.linalg.norm(np.diff(u, 2, axis=0), axis=-1) / (dt[1:] * dt[:-1])
+    acceleration[0], acceleration[-1] = acceleration[1], acceleration[-2]
+    max_step = np.sqrt(8 * tolerance_arcsec * ARCSEC / np.maximum(acceleration, 1e-30))
+    max_step = np.minimum(max_step, max_step_s)
+
+    rows = [0]
+    allowed = max_step[0]
+    for k in range(1, len(t)):
+        allowed = min(allowed, max_step[k])
+        if t[k] - t[rows[-1]] > allowed:
+            # step k is too far, the previous one is the last row that is still fine
+            rows.append(max(k - 1, rows[-1] + 1))
+            allowed = max_step[rows[-1]:k + 1].min()
+    if rows[-1] != len(t) - 1:
+        rows.append(len(t) - 1)
+    return rows
+
+
+def thin_states(states, tolerance_arcsec:float=EPHEMERIS_TOLERANCE_ARCSEC,
+                max_step_s:float=EPHEMERIS_ADAPTIVE_MAX_STEP_S):
+    """ drops rows of (mjd, RA, DE, VRA, VDE, azimuth, elevation) as long as interpolation between the remaining rows
+    reproduces every dropped row within tolerance_arcsec, in RA/DE as well as in azimuth/elevation
+
+    Rows with VRA/VDE rates are checked against the cubic interpolation of ephemerisinterpolator.EphemerisInterpolator,
+    which uses the rates, rows without (e.g. FreeFlyer files) against linear interpolation. With rates far fewer rows
+    are needed for the same tolerance. Slow, low parts of a pass keep few rows, fast ones near the zenith many.
+    Passes (gaps in the sampling) are handled separately, their first and last rows are always kept.
+
+    :param states: rows of (mjd, RA [rad], DE [rad], VRA [arcsec/s], VDE [arcsec/s], azimuth [deg], elevation [deg])
+    :type states: numpy.ndarray
+
+    :returns: kept rows, largest interpolation error of the dropped rows in arcsec
+    :rtype: (numpy.ndarray, float)
+    """
+    states = np.asarray(states, dtype=np.float64).reshape(-1, EPH_COLUMNS)
+    if len(states) < 3 or tolerance_arcsec <= 0:
+        return states, 0.0
+    t = (states[:, 0] - states[0, 0]) * DAY_S
+    ra, de = states[:, 1], states[:, 2]
+    az, el = np.radians(states[:, 5]), np.radians(states[:, 6])
+    has_rates = bool(np.any(states[:, 3:5] != 0))
+
+    dt = np.diff(t)
+    breaks = np.flatnonzero(dt > 1.5 * np.median(dt)) + 1
+    kept = list()
+    max_error = 0.0
+    for start, end in zip(np.r_[0, breaks], np.r_[breaks, len(t)]):
+        if has_rates:
+            # the step estimate of _segment_rows is for linear interpolation -> start every max_step_s and split
+            steps = np.searchsorted(t[start:end], np.arange(t[start], t[end - 1], max_step_s))
+            rows = [start + row for row in np.unique(np.r_[steps, end - start - 1])]
+        else:
+            rows = [start + row for row in _segment_rows(t[start:end], az[start:end], el[start:end],
+                                                         tolerance_arcsec, max_step_s)]
+        # the estimate is only an estimate -> split steps until the real error is below the tolerance
+        errors = None
+        while errors is None or any(error > tolerance_arcsec for error in errors):
+            if errors is not None:
+                split = [(i + j) // 2 for i, j, error in zip(rows[:-1], rows[1:], errors) if error > tolerance_arcsec]
+                rows = sorted(rows + split)
+            if has_rates:
+                errors = list(_cubic_errors(t, states, rows))
+            else:
+                errors = [max(_interpolation_error(t, ra, de, i, j), _interpolation_error(t, az, el, i, j))
+                          for i, j in zip(rows[:-1], rows[1:])]
+        max_error = max([max_error] + errors)
+        kept.extend(rows)
+    return states[kept], max_error
+
+
+def read_eph_states(eph_file:str) -> np.ndarray:
+    """ rows of (mjd, RA, DE, VRA, VDE, azimuth, elevation) of an .eph file """
+    return np.loadtxt(eph_file, comments="#", ndmin=2).reshape(-1, EPH_COLUMNS)
+
+
+def thin_eph_file(eph_file:str, tolerance_arcsec:float=EPHEMERIS_TOLERANCE_ARCSEC,
+                  max_step_s:float=EPHEMERIS_ADAPTIVE_MAX_STEP_S) -> tuple:
+    """ rewrites an .eph file (e.g. one of FreeFlyer) with thin_states, the header stays as it is
+
+    :returns: number of lines before, after and the largest interpolation error in arcsec
+    :rtype: tuple
+    """
+    with open(eph_file, "r") as f:
+        header = [line for line in f if line.startswith("#")]
+    states = read_eph_states(eph_file)
+    kept, max_error = thin_states(states, tolerance_arcsec, max_step_s)
+    with open(eph_file, "w") as f:
+        f.writelines(header)
+        f.writelines(eph_lines(kept))
+    return len(states), len(kept), max_error
+
+
+def write_ephemerides(catalog, norad_ids, gnd_station, startTime, durationMin:float, eph_dir:str,
+                      step_s:float=EPHEMERIS_STEP_S, min_elevation:float=EPHEMERIS_MIN_ELEVATION,
+                      tolerance_arcsec:float=EPHEMERIS_TOLERANCE_ARCSEC) -> list:
+    """ writes ASATrackingData_*.eph files like SGP4_EPH.MissionPlan, all satellites are propagated in one batch
+
+    RA/DE are geocentric ICRF coordinates with their rates from the SGP4 velocity, azimuth and elevation are seen from
+    the ground station. A file with only the header is written for satellites that do not rise above min_elevation.
+
+    :param catalog: catalog holding the TLEs
+    :type catalog: satcatalog.SatelliteCatalog
+
+    :param norad_ids: NoradIDs of the satellites, e.g. '25544U'
+    :type norad_ids: iterable
+
+    :param gnd_station: ground station
+    :type gnd_station: skyfield.toposlib.GeographicPosition
+
+    :param startTime: first epoch of the ephemerides
+    :type startTime: skyfield.api.Time
+
+    :param durationMin: duration of watch window in minutes
+    :type durationMin: float
+
+    :param eph_dir: directory the files are written to
+    :type eph_dir: str
+
+    :param step_s: time between two lines, in adaptive mode the sampling before thinning out
+    :type step_s: float
+
+    :param min_elevation: only epochs above this elevation in degree are written
+    :type min_elevation: float
+
+    :param tolerance_arcsec: > 0: adaptive mode, lines are dropped as long as the cubic interpolation through the
+        VRA/VDE rates stays below this error (see thin_states)
+    :type tolerance_arcsec: float
+
+    :returns: (path, number of lines, largest interpolation error in arcsec) of every written file
+    :rtype: list
+    """
+    os.makedirs(eph_dir, exist_ok=True)
+    eph_files = list()
+    for sat_name, states, max_error in compute_ephemerides(catalog, norad_ids, gnd_station, startTime, durationMin,
+                                                           step_s, min_elevation, tolerance_arcsec):
+        eph_file = write_eph_file(eph_dir, sat_name, eph_lines(states))
+        eph_files.append((eph_file, len(states), max_error))
+    return eph_files
+
+
+def compute_ephemerides(catalog, norad_ids, gnd_station, startTime, durationMin:float,
+                        step_s:float=EPHEMERIS_STEP_S, min_elevation:float=EPHEMERIS_MIN_ELEVATION,
+                        tolerance_arcsec:float=EPHEMERIS_TOLERANCE_ARCSEC) -> list:
+    """ the rows write_ephemerides writes, without writing them (e.g. for ephemerisstore.write_store)
+
+    :returns: (satellite name, rows of (mjd, RA, DE, VRA, VDE, azimuth, elevation), largest interpolation error in
+        arcsec) of every satellite
+    :rtype: list
+    """
+    rows = [catalog.row_of(norad_id) for norad_id in norad_ids]
+    satrecs = [catalog.satrecs[row] for row in rows]
+    if tolerance_arcsec > 0:
+        step_s = min(step_s, EPHEMERIS_ADAPTIVE_BASE_STEP_S)
+    all_states = _ephemeris_states(satrecs, startTime, durationMin, gnd_station, step_s, min_elevation)
+    return [(catalog.name(row), *thin_states(states, tolerance_arcsec)) for row, states in zip(rows, all_states)]
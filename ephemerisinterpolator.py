@@ -0,0 +1,115 @@
+import numpy as np
+
+from ephemeris import ARCSEC, EPH_COLUMNS, MJD_OFFSET, read_eph_states, hermite_coefficients, lagrange_derivatives
+from passprediction import DAY_S
+
+PASS_GAP_S = 5 * 60  # lines further apart belong to different passes, adaptive steps are at most a minute or so
+INTERPOLATED_COLUMNS = ('ra', 'de', 'north', 'east', 'up')  # azimuth/elevation as topocentric unit vector
+
+
+def _direction(azimuth_deg, elevation_deg):
+    """ topocentric unit vectors (north, east, up), array (line, 3) """
+    az, el = np.radians(azimuth_deg), np.radians(elevation_deg)
+    return np.column_stack((np.cos(el) * np.cos(az), np.cos(el) * np.sin(az), np.sin(el)))
+
+
+class EphemerisInterpolator:
+    """ RA/DE/Az/El of one satellite at arbitrary epochs from its ephemeris lines
+
+    Every interval between two lines of a pass gets a cubic Hermite polynomial per column, computed once in the
+    constructor. RA/DE use the VRA/VDE rates of the lines if there are any, otherwise (e.g. FreeFlyer files) the
+    derivatives are taken from the polynomial through five neighbouring lines. RA is unwrapped before, so crossing 0
+    is no problem. Azimuth/elevation are interpolated as topocentric unit vector (north, east, up) with the same
+    derivatives, the azimuth of a pass close to the zenith turns too fast for interpolating the angles. Queries are
+    vectorized: one bisection and one Horner evaluation for all epochs. Epochs outside the passes give NaN.
+    """
+
+    def __init__(self, states):
+        """
+        :param states: rows of (mjd, RA [rad], DE [rad], VRA [arcsec/s], VDE [arcsec/s], azimuth [deg], elevation [deg])
+            sorted by time, e.g. ephemeris.read_eph_states or EphemerisStore.states
+        :type states: numpy.ndarray
+        """
+        states = np.asarray(states, dtype=np.float64).reshape(-1, EPH_COLUMNS)
+        self.mjd0 = states[0, 0] if len(states) else 0.0
+        self.t = (states[:, 0] - self.mjd0) * DAY_S  # seconds since the first line, keeps the precision of the mjd
+        self.has_rates = bool(np.any(states[:, 3:5] != 0))
+
+        # coefficients (interval, column, power), intervals across a pass gap stay NaN
+        self.coefficients = np.full((max(len(states) - 1, 0), len(INTERPOLATED_COLUMNS), 4), np.nan)
+        breaks = np.flatnonzero(np.diff(self.t) > PASS_GAP_S) + 1
+        for start, end in zip(np.r_[0, breaks], np.r_[breaks, len(states)]):
+            if end - start >= 2:
+                self._fit_pass(states[start:end], self.t[start:end], start)
+        # one contiguous (interval, column) table per power, a query gathers whole rows
+        self._powers = [np.ascontiguousarray(self.coefficients[..., power]) for power in range(4)]
+        self._lengths = np.diff(self.t)
+
+    def _fit_pass(self, states, t, first):
+        ra = np.unwrap(states[:, 1])
+        de = states[:, 2]
+        if self.has_rates:
+            ra_rate = states[:, 3] * ARCSEC / np.cos(de)  # VRA is sky motion
+            de_rate = states[:, 4] * ARCSEC
+        else:
+            ra_rate = lagrange_derivatives(t, ra)
+            de_rate = lagrange_derivatives(t, de)
+        intervals = slice(first, first + len(t) - 1)
+        self.coefficients[intervals, 0] = hermite_coefficients(t, ra, ra_rate)
+        self.coefficients[intervals, 1] = hermite_coefficients(t, de, de_rate)
+        direction = _direction(states[:, 5], states[:, 6])
+        for axis in range(3):
+            self.coefficients[intervals, 2 + axis] = hermite_coefficients(t, direction[:, axis],
+                                                                           lagrange_derivatives(t, direction[:, axis]))
+
+    @classmethod
+    def from_eph_file(cls, eph_file:str):
+        return cls(read_eph_states(eph_file))
+
+    @classmethod
+    def from_store(cls, store, sat_name:str):
+        """ interpolator of a satellite of an ephemerisstore.EphemerisStore """
+        return cls(store.states(sat_name))
+
+    @property
+    def first_mjd(self) -> float:
+        return self.mjd0
+
+    @property
+    def last_mjd(self) -> float:
+        return self.mjd0 + (self.t[-1] / DAY_S if len(self.t) else 0.0)
+
+    def _evaluate(self, mjd):
+        mjd = np.asarray(mjd, dtype=np.float64)
+        if len(self.coefficients) == 0:
+            return np.full(mjd.shape + (len(INTERPOLATED_COLUMNS),), np.nan)
+        s = (mjd - self.mjd0) * DAY_S
+        interval = np.searchsorted(self.t, s, side='right') - 1
+        np.clip(interval, 0, len(self._lengths) - 1, out=interval)
+        s -= self.t[interval]
+        s[(s < 0) | (s > self._lengths[interval])] = np.nan  # before the first or after the last line
+        s = s[..., np.newaxis]
+        # Horner, in place
+        values = self._powers[3][interval]
+        for power in (2, 1, 0):
+            values *= s
+            values += self._powers[power][interval]
+        return values
+
+    def __call__(self, mjd) -> tuple:
+        """ RA [rad], DE [rad], azimuth [deg] and elevation [deg] at the epochs mjd (UTC), NaN outside the passes
+
+        :param mjd: modified julian dates, any shape
+        :type mjd: float or numpy.ndarray
+
+        :rtype: tuple of numpy.ndarray
+        """
+        values = self._evaluate(np.atleast_1d(mjd))
+        ra = values[..., 0] % (2 * np.pi)
+        north, east, up = values[..., 2], values[..., 3], values[..., 4]  # not normalized, atan2 does not mind
+        azimuth = np.degrees(np.arctan2(east, north)) % 360.0
+        return ra, values[..., 1], azimuth, np.degrees(np.arctan2(up, np.hypot(north, east)))
+
+    def at_jd(self, jd) -> tuple:
+        """ same as calling the interpolator, with julian dates (UTC) """
+        return self(np.asarray(jd, dtype=np.float64) - MJD_OFFSET)
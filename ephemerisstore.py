@@ -0,0 +1,126 @@
+import datetime
+import json
+import os
+
+import numpy as np
+from numpy.lib import recfunctions
+
+from ephemeris import EPH_COLUMNS, eph_file_name, eph_header, eph_lines
+
+# one row per epoch, the columns of an .eph data line
+EPHEMERIS_STORE_DTYPE = np.dtype([('mjd', np.float64),
+                                  ('ra', np.float64),  # rad, geocentric ICRF
+                                  ('de', np.float64),  # rad
+                                  ('vra', np.float64),  # arcsec/s, sky motion
+                                  ('vde', np.float64),  # arcsec/s
+                                  ('az', np.float64),  # deg
+                                  ('el', np.float64)])  # deg
+STORE_FORMAT_VERSION = 1
+
+
+def store_files(store_path:str) -> tuple:
+    """ .npy data and .json index of a store, store_path may be given with or without extension """
+    base = os.path.splitext(store_path)[0] if store_path.endswith((".npy", ".json")) else store_path
+    return base + ".npy", base + ".json"
+
+
+def write_store(store_path:str, ephemerides) -> str:
+    """ writes the ephemerides of one run into a single store, the satellites are stored one after the other
+
+    :param store_path: path of the store without extension, e.g. ephemerides/2025Nov27__10_57__90
+    :type store_path: str
+
+    :param ephemerides: (satellite name, rows of (mjd, RA, DE, VRA, VDE, azimuth, elevation)) per satellite, e.g. the
+        first two entries of ephemeris.compute_ephemerides
+    :type ephemerides: iterable
+
+    :returns: path of the .npy file
+    :rtype: str
+    """
+    satellites = dict()
+    blocks = list()
+    row = 0
+    for sat_name, states, *_ in ephemerides:
+        states = np.asarray(states, dtype=np.float64).reshape(-1, EPH_COLUMNS)
+        satellites[sat_name] = [row, row + len(states)]  # same name twice: the last one wins, like the .eph files
+        blocks.append(states)
+        row += len(states)
+    data = np.concatenate(blocks) if blocks else np.empty((0, EPH_COLUMNS))
+    data = recfunctions.unstructured_to_structured(data, dtype=EPHEMERIS_STORE_DTYPE)
+
+    data_file, index_file = store_files(store_path)
+    os.makedirs(os.path.dirname(os.path.abspath(data_file)), exist_ok=True)
+    # tmp files + replace, a reader never sees a half written store
+    np.save(data_file + ".tmp.npy", data)
+    with open(index_file + ".tmp", "w") as f:
+        json.dump({"version": STORE_FORMAT_VERSION,
+                   "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                   "satellites": satellites}, f, indent=1)
+    os.replace(data_file + ".tmp.npy", data_file)
+    os.replace(index_file + ".tmp", index_file)
+    return data_file
+
+
+class EphemerisStore:
+    """ Ephemerides of one run in one memory mapped array
+
+    The index maps every satellite to its row range, so looking up a satellite is a dict access and its rows are a
+    view into the mapped file (nothing is read before it is used). The epoch of a satellite is found by bisection
+    within its own rows, which are sorted by time.
+    """
+
+    def __init__(self, store_path:str):
+        self.data_file, self.index_file = store_files(store_path)
+        with open(self.index_file, "r") as f:
+            index = json.load(f)
+        if index.get("version") != STORE_FORMAT_VERSION:
+            raise ValueError(f"{self.index_file} has an unknown format version {index.get('version')}")
+        self.created = index["created"]
+        self._rows = {sat_name: tuple(rows) for sat_name, rows in index["satellites"].items()}
+        self.data = np.load(self.data_file, mmap_mode='r')
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, sat_name):
+        return sat_name in self._rows
+
+    def __repr__(self):
+        return f"EphemerisStore({self.data_file}, {len(self)} satellites)"
+
+    @property
+    def names(self) -> list:
+        """ satellite names in the order they were stored """
+        return list(self._rows)
+
+    def rows(self, sat_name:str) -> np.ndarray:
+        """ all epochs of a satellite, a read-only view of EPHEMERIS_STORE_DTYPE """
+        start, stop = self._rows[sat_name]
+        return self.data[start:stop]
+
+    def states(self, sat_name:str) -> np.ndarray:
+        """ all epochs of a satellite as rows of (mjd, RA, DE, VRA, VDE, azimuth, elevation) """
+        return recfunctions.structured_to_unstructured(self.rows(sat_name))
+
+    def row_at(self, sat_name:str, mjd:float):
+        """ last epoch of a satellite at or before mjd, None if mjd is before the first one
+
+        :rtype: numpy.void or None
+        """
+        rows = self.rows(sat_name)
+        idx = np.searchsorted(rows['mjd'], mjd, side='right') - 1
+        return rows[idx] if idx >= 0 else None
+
+    def eph_lines(self, sat_name:str) -> list:
+        """ the ASA .eph text of a satellite as lines with newline, header included (created is the time the store
+        was written, so the same satellite always gives the same text) """
+        header = eph_header(sat_name, datetime.datetime.fromisoformat(self.created))
+        return header.splitlines(keepends=True) + eph_lines(self.states(sat_name))
+
+    def export_eph(self, sat_name:str, eph_dir:str) -> str:
+        """ writes the ASATrackingData_*.eph file of a satellite to eph_dir, returns its path """
+        os.makedirs(eph_dir, exist_ok=True)
+        eph_file = os.path.join(eph_dir, eph_file_name(sat_name))
+        with open(eph_file, "w") as f:
+            f.writelines(self.eph_lines(sat_name))
+        return eph_file
@@ -1,5 +1,12 @@
+import asyncio
 import os
-from utils.configManager import MISSION_PLAN_PATH
+import queue
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from utils.configManager import MISSION_PLAN_PATH, FREEFLYER_ENGINES, FREEFLYER_ENGINE_RETRIES, FREEFLYER_POLL_MS
+from ephemeris import eph_file_name
 
 try:
     from aisolutions.ExampleUtilities import ExampleUtilities
@@ -9,42 +16,160 @@ except ImportError:
     print("Import error!")
 
 
+def read_export_names() -> list:
+    """ names of the satellites in TLE_export.tle, in file order """
+    with open(os.path.join(MISSION_PLAN_PATH, "TLE_export.tle"), "r") as tle_export_file:
+        # got name of TLE, remove "0 " and "\n"
+        return [line[2:].strip("\n") for line in tle_export_file.readlines() if line.startswith("0")]
+
+
+class EnginePool:
+    """ A fixed number of FreeFlyer engines shared by worker threads
+
+    Every task gets an engine of its own for its whole duration. An engine whose task raised an exception is
+    destroyed and replaced by a new one before the task is repeated (up to `retries` times) or before the next task
+    runs on it. An engine that can not be replaced is dropped, the pool gets smaller and tasks that find no engine left
+    fail. engine_factory creates the engines, anything with the RuntimeApiEngine method surface works (e.g.
+    tests/fakeengine.py).
+    """
+
+    def __init__(self, engine_factory, size: int = FREEFLYER_ENGINES, retries: int = FREEFLYER_ENGINE_RETRIES):
+        self.engine_factory = engine_factory
+        self.size = 0 # live engines, shrinks if a failed engine can not be replaced
+        self.retries = retries
+        self._engines = queue.Queue() # (engine, failed flag), (None, True) once no engine is left
+        self._lock = threading.Lock()
+        try:
+            for _ in range(max(1, size)):
+                self._engines.put((self.engine_factory(), False))
+                self.size += 1
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """ destroys all engines """
+        while not self._engines.empty():
+            engine, failed = self._engines.get()
+            if engine is not None:
+                self._discard(engine, failed)
+
+    @staticmethod
+    def _destroy(engine):
+        try:
+            engine.destroyEngine()
+        except Exception as e:
+            print(f"FreeFlyer engine could not be destroyed: {str(e)}")
+
+    @staticmethod
+    def _discard(engine, failed: bool):
+        if failed:
+            try:
+                engine.killEngine() # the state of a failed engine is unknown
+            except Exception:
+                pass  # already dead
+        EnginePool._destroy(engine)
+
+    def _restart(self, engine):
+        """ replaces a failed engine, None if no new one can be created (the pool is one engine smaller then) """
+        self._discard(engine, True)
+        try:
+            return self.engine_factory()
+        except Exception as e:
+            print(f"FreeFlyer engine could not be restarted: {str(e)}")
+            with self._lock:
+                self.size -= 1
+                if self.size == 0:
+                    self._engines.put((None, True)) # wakes up the tasks still waiting for an engine
+            return None
+
+    def _run(self, task, item):
+        engine, failed = self._engines.get()
+        if engine is None:
+            self._engines.put((None, True)) # for the next waiting task
+            return item, None, "No FreeFlyer engine left"
+        error_msg = None
+        for attempt in range(self.retries + 1):
+            if failed: # left behind by a failed attempt of this or an earlier task
+                engine = self._restart(engine)
+                if engine is None:
+                    return item, None, error_msg or "No FreeFlyer engine left"
+            try:
+                result = task(engine, item)
+            except Exception as e:
+                error_msg = str(e)
+                failed = True
+                print(f"FreeFlyer engine failed on {item} (attempt {attempt + 1}): {error_msg}")
+            else:
+                self._engines.put((engine, False))
+                return item, result, None
+        # no retry left, the engine is only restarted if another task needs it
+        self._engines.put((engine, True))
+        return item, None, error_msg
+
+    def map(self, task, items) -> list:
+        """ runs task(engine, item) for all items on the engines of the pool
+
+        :param task: function called with an engine and one item
+        :type task: (engine, item) -> object
+
+        :param items: work items, e.g. satellite names
+        :type items: iterable
+
+        :returns: list of (item, result, error message or None) in the order of items
+        :rtype: list
+        """
+        with ThreadPoolExecutor(max_workers=max(self.size, 1)) as executor:
+            return list(executor.map(lambda item: self._run(task, item), items))
+
+
 class MissionPlanRunner:
     """ Runs Mission Plans """
 
-    def __init__(self):
+    def __init__(self, engine_factory=None):
         self.missionplan_success_flag = None
         self.error_msg = None
+        self.satellite_timings = list() # (name, seconds) of every satellite of the last run
 
-        # Get path to runtime library
-        self.ff_install_dir = ExampleUtilities.get_freeflyer_install_directory()
-
-    def run_SGP4_EPH_plan(self, durationMin: float, startTimeUTCString: str):
-        """ Runs the sgp4_eph missionplan which creates eph files to track sgp4 propagated satellites """
+        if engine_factory is None:
+            # Get path to runtime library
+            self.ff_install_dir = ExampleUtilities.get_freeflyer_install_directory()
+            engine_factory = lambda: RuntimeApiEngine(self.ff_install_dir)
+        self.engine_factory = engine_factory
 
+    @staticmethod
+    def _run_SGP4_EPH_satellite(engine, sat_name: str, durationMin: float, startTimeUTCString: str):
+        """ runs the sgp4_eph missionplan for one satellite on the given engine """
         mission_plan_path = os.path.join(MISSION_PLAN_PATH, "SGP4_EPH.MissionPlan")
 
-        try:
-            with RuntimeApiEngine(self.ff_install_dir) as engine:
-                with open(os.path.join(MISSION_PLAN_PATH, "TLE_export.tle"), "r") as tle_export_file:
-                    for line in tle_export_file.readlines():
-                        if line.startswith("0"): # got name of TLE
-                            sat_name = line[2:].strip("\n") # remove "0 " and "\n"
+        # run now mission plan
+        engine.loadMissionPlanFromFile(mission_plan_path)
+
+        engine.prepareMissionPlan()
 
-                            # run now mission plan
-                            engine.loadMissionPlanFromFile(mission_plan_path)
+        engine.executeUntilApiLabel("Python-Input")
 
-                            engine.prepareMissionPlan()
+        engine.setExpressionString("SpaceCraftName", sat_name)
+        engine.setExpressionString("startTime_String", startTimeUTCString)
+        engine.assignExpression("watchWindow_Timespan", f"TIMESPAN({durationMin} minutes)")
 
-                            engine.executeUntilApiLabel("Python-Input")
+        engine.executeRemainingStatements()
+        engine.cleanupMissionPlan()
 
-                            engine.setExpressionString("SpaceCraftName", sat_name)
-                            engine.setExpressionString("startTime_String", startTimeUTCString)
-                            engine.assignExpression("watchWindow_Timespan", f"TIMESPAN({durationMin} minutes)")
+    def run_SGP4_EPH_plan(self, durationMin: float, startTimeUTCString: str):
+        """ Runs the sgp4_eph missionplan which creates eph files to track sgp4 propagated satellites """
 
-                            engine.executeRemainingStatements()
-                            engine.cleanupMissionPlan()
-                            self.missionplan_success_flag = True
+        try:
+            with self.engine_factory() as engine:
+                for sat_name in read_export_names():
+                    self._run_SGP4_EPH_satellite(engine, sat_name, durationMin, startTimeUTCString)
+                    self.missionplan_success_flag = True
 
         except RuntimeApiException as e:
             self.missionplan_success_flag = False
@@ -58,5 +183,145 @@ class MissionPlanRunner:
             self.missionplan_success_flag = False
             self.error_msg = str(e)
 
+    def run_SGP4_EPH_plan_parallel(self, durationMin: float, startTimeUTCString: str, engines: int = FREEFLYER_ENGINES):
+        """ Runs the sgp4_eph missionplan for the satellites of TLE_export.tle on a pool of engines
+
+        All engines write into the same tmp directory (one file per satellite). Failed engines are restarted and the
+        satellite is tried again, satellites that still fail are listed in error_msg.
+        """
+        self.satellite_timings = list()
+
+        def run_satellite(engine, sat_name):
+            start = perf_counter()
+            self._run_SGP4_EPH_satellite(engine, sat_name, durationMin, startTimeUTCString)
+            return perf_counter() - start
+
+        try:
+            sat_names = read_export_names()
+            with EnginePool(self.engine_factory, min(engines, max(len(sat_names), 1))) as pool:
+                results = pool.map(run_satellite, sat_names)
+        except Exception as e: # engines could not be created or TLE_export.tle is missing
+            self.missionplan_success_flag = False
+            self.error_msg = str(e)
+            return
+
+        self.satellite_timings = [(sat_name, duration) for sat_name, duration, error_msg in results
+                                  if error_msg is None]
+        errors = [f"{sat_name}: {error_msg}" for sat_name, _, error_msg in results if error_msg is not None]
+        self.missionplan_success_flag = len(errors) == 0
+        self.error_msg = "\n".join(errors) if errors else None
 
+    @staticmethod
+    def _queue_SGP4_EPH_satellite(engine, sat_name: str, durationMin: float, startTimeUTCString: str) -> int:
+        """ queues the sgp4_eph sequence of one satellite with the *Async calls, returns at once
+
+        :returns: sync point that is cleared once the engine has worked off the sequence
+        :rtype: int
+        """
+        mission_plan_path = os.path.join(MISSION_PLAN_PATH, "SGP4_EPH.MissionPlan")
+        engine.loadMissionPlanFromFileAsync(mission_plan_path)
+        engine.prepareMissionPlanAsync()
+        engine.executeUntilApiLabelAsync("Python-Input")
+        engine.setExpressionStringAsync("SpaceCraftName", sat_name)
+        engine.setExpressionStringAsync("startTime_String", startTimeUTCString)
+        engine.assignExpressionAsync("watchWindow_Timespan", f"TIMESPAN({durationMin} minutes)")
+        engine.executeRemainingStatementsAsync()
+        engine.cleanupMissionPlanAsync()
+        return engine.setSyncPointAsync()
+
+    @staticmethod
+    def _wait_for_sync_point(engine, sync_point: int):
+        """ blocks until the engine has cleared sync_point, raises if a queued call failed """
+        # the engine's queue waits for the sync point, synchronize blocks until the queue is worked off (False after
+        # FREEFLYER_POLL_MS without being done, then it is simply called again)
+        engine.waitForAllSyncPointsAsync([sync_point])
+        while not engine.synchronize(FREEFLYER_POLL_MS):
+            pass
+
+    async def _engine_worker(self, engine_list: list, index: int, sat_names: asyncio.Queue, durationMin: float,
+                             startTimeUTCString: str, eph_dir: str, results: dict):
+        """ works off satellites with one engine, the file of the previous satellite is moved while the engine runs """
+        loop = asyncio.get_running_loop()
+        engine = engine_list[index]
+        finished = None # satellite whose file still has to be moved
+        while True:
+            try:
+                sat_name = sat_names.get_nowait()
+            except asyncio.QueueEmpty:
+                sat_name = None
+
+            queue_error = None
+            if sat_name is not None:
+                start = perf_counter()
+                try:
+                    sync_point = self._queue_SGP4_EPH_satellite(engine, sat_name, durationMin, startTimeUTCString)
+                except Exception as e: # e.g. the engine died, handled like a failed call below
+                    queue_error = e
+            if finished is not None and eph_dir is not None:
+                eph_file = os.path.join(MISSION_PLAN_PATH, "tmp", eph_file_name(finished))
+                try:
+                    if os.path.exists(eph_file):
+                        await loop.run_in_executor(None, shutil.move, eph_file, eph_dir)
+                except OSError as e:
+                    print(f"{eph_file} could not be moved to {eph_dir}: {str(e)}")
+            if sat_name is None:
+                return
+
+            try:
+                if queue_error is not None:
+                    raise queue_error
+                await loop.run_in_executor(None, self._wait_for_sync_point, engine, sync_point)
+                results[sat_name] = (perf_counter() - start, None)
+                finished = sat_name
+            except Exception as e:
+                results[sat_name] = (None, str(e))
+                finished = None
+                # state of the engine is unknown after a failed call
+                engine_list[index] = None
+                await loop.run_in_executor(None, EnginePool._discard, engine, True)
+                try:
+                    engine = await loop.run_in_executor(None, self.engine_factory)
+                except Exception as e:
+                    print(f"FreeFlyer engine could not be restarted: {str(e)}")
+                    return # the other engines take the remaining satellites
+                engine_list[index] = engine
+
+    async def run_SGP4_EPH_plan_async(self, durationMin: float, startTimeUTCString: str, eph_dir: str = None,
+                                      engines: int = FREEFLYER_ENGINES) -> dict:
+        """ Runs the sgp4_eph missionplan for the satellites of TLE_export.tle with the asynchronous Runtime API
+
+        Every engine gets the whole load/prepare/set/execute sequence of a satellite queued at once and is awaited
+        without blocking the event loop. While an engine works on the next satellite the eph file of the previous one
+        is moved from missionplans/tmp to eph_dir (stays in tmp if eph_dir is None).
+
+        :returns: dict name -> (seconds, error message or None), also sets missionplan_success_flag and error_msg
+        :rtype: dict
+        """
+        loop = asyncio.get_running_loop()
+        results = dict()
+        engine_list = list()
+        try:
+            sat_names = asyncio.Queue()
+            for sat_name in read_export_names():
+                sat_names.put_nowait(sat_name)
+            for _ in range(max(1, min(engines, sat_names.qsize()))):
+                engine_list.append(await loop.run_in_executor(None, self.engine_factory))
+            await asyncio.gather(*[self._engine_worker(engine_list, index, sat_names, durationMin, startTimeUTCString,
+                                                       eph_dir, results) for index in range(len(engine_list))])
+            while not sat_names.empty(): # every engine failed and could not be restarted
+                results[sat_names.get_nowait()] = (None, "No FreeFlyer engine left")
+        except Exception as e: # engines could not be created or TLE_export.tle is missing
+            self.missionplan_success_flag = False
+            self.error_msg = str(e)
+            return results
+        finally:
+            for engine in engine_list:
+                if engine is not None:
+                    EnginePool._destroy(engine)
 
+        self.satellite_timings = [(sat_name, duration) for sat_name, (duration, error_msg) in results.items()
+                                  if error_msg is None]
+        errors = [f"{sat_name}: {error_msg}" for sat_name, (_, error_msg) in results.items() if error_msg is not None]
+        self.missionplan_success_flag = len(errors) == 0
+        self.error_msg = "\n".join(errors) if errors else None
+        return results
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from passprediction import PASS_DTYPE, COARSE_STEP_S, FINE_STEP_S, SUNLIT_STEP_S, SUNLIT_BRACKET_S, \
+    SUNLIT_TOLERANCE_S, PREFILTER_MARGIN_RAD, GEO_MAX_ECCENTRICITY, GEO_DRIFT_UNCERTAINTY_RAD_PER_DAY
+
+# passes as stored on disk: catalog row, event times (TT julian dates), max. elevation and sunlit fraction (0..1)
+CACHED_PASS_DTYPE = np.dtype(PASS_DTYPE.descr + [('sunlit', np.float64)])
+DUPLICATE_PASS_S = 60  # the same pass found by two overlapping computations has (almost) the same rise time
+INDEX_FILE = "index.json"
+
+
+def _prediction_settings() -> list:
+    return [float(COARSE_STEP_S), float(FINE_STEP_S), float(SUNLIT_STEP_S), float(SUNLIT_BRACKET_S),
+            float(SUNLIT_TOLERANCE_S), float(PREFILTER_MARGIN_RAD), float(GEO_MAX_ECCENTRICITY),
+            float(GEO_DRIFT_UNCERTAINTY_RAD_PER_DAY)]
+
+
+def cache_key(catalog_fingerprint:str, gnd_lat:float, gnd_long:float, gnd_alt:float, min_elevation:float,
+              sunlit_adaptive:bool) -> str:
+    """ identifies a set of cached passes, the time window is not part of it (see PassCacheEntry.intervals)
+
+    The sampling and pre-filter settings of passprediction are part of the key, passes predicted with other settings
+    are computed again.
+    """
+    key = json.dumps([catalog_fingerprint, round(gnd_lat, 7), round(gnd_long, 7), round(gnd_alt, 2),
+                      float(min_elevation), bool(sunlit_adaptive), _prediction_settings()])
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+class PassCacheEntry:
+    """ all passes of one catalog / station / elevation mask computed so far
+
+    intervals holds the time ranges (TT julian dates, merged and sorted) in which every complete pass is known.
+    Two neighbouring computations are only joined correctly for passes shorter than the margin used in gaps().
+    """
+
+    def __init__(self, intervals=None, passes=None):
+        self.intervals = np.empty((0, 2)) if intervals is None else intervals
+        self.passes = np.empty(0, dtype=CACHED_PASS_DTYPE) if passes is None else passes
+
+    def gaps(self, t0_tt:float, t1_tt:float, margin_days:float) -> list:
+        """ time windows that still have to be computed to know all passes within [t0_tt, t1_tt]
+
+        Sides touching already covered time are extended by the margin so that passes crossing the border are
+        found completely by the new computation.
+
+        :returns: list of (start, end) in TT julian dates
+        :rtype: list
+        """
+        windows = list()
+        start = t0_tt
+        after_covered = False  # start is the end of a covered interval
+        for covered_start, covered_end in self.intervals:
+            if covered_end < start:
+                continue
+            if covered_start > t1_tt:
+                break
+            if covered_start > start:
+                windows.append((start - margin_days if after_covered else start, covered_start + margin_days))
+            start = max(start, covered_end)
+            after_covered = True
+            if start >= t1_tt:
+                break
+        if start < t1_tt:
+            windows.append((start - margin_days if after_covered else start, t1_tt))
+        return windows
+
+    def add(self, windows:list, passes:np.ndarray):
+        """ merges newly computed passes and marks their windows as covered """
+        intervals = sorted([tuple(interval) for interval in self.intervals] + list(windows))
+        merged = list()
+        for start, end in intervals:
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.intervals = np.array(merged, dtype=np.float64).reshape(-1, 2)
+
+        passes = np.concatenate((self.passes, passes.astype(CACHED_PASS_DTYPE)))
+        passes = passes[np.lexsort((passes['rise_tt'], passes['sat_idx']))]
+        keep = np.ones(len(passes), dtype=bool)
+        keep[1:] = ((passes['sat_idx'][1:] != passes['sat_idx'][:-1]) |
+                    ((passes['rise_tt'][1:] - passes['rise_tt'][:-1]) * 86400 > DUPLICATE_PASS_S))
+        self.passes = passes[keep]
+
+    def window(self, t0_tt:float, t1_tt:float, rows=None) -> np.ndarray:
+        """ complete passes within [t0_tt, t1_tt], sorted by catalog row and rise time
+
+        :param rows: only passes of these catalog rows, None for all
+        :type rows: numpy.ndarray
+        """
+        inside = (self.passes['rise_tt'] >= t0_tt) & (self.passes['set_tt'] <= t1_tt)
+        if rows is not None:
+            inside &= np.isin(self.passes['sat_idx'], rows)
+        return self.passes[inside]
+
+
+class PassCache:
+    """ pass prediction results on disk, one .npz per cache key, least recently used entries are deleted """
+
+    def __init__(self, cache_dir:str, max_entries:int):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+
+    def _index(self) -> dict:
+        try:
+            with open(os.path.join(self.cache_dir, INDEX_FILE), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return dict()
+
+    def _write_index(self, index:dict):
+        tmp_file = os.path.join(self.cache_dir, INDEX_FILE + ".tmp")
+        with open(tmp_file, "w") as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp_file, os.path.join(self.cache_dir, INDEX_FILE))
+
+    def _file(self, key:str) -> str:
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def load(self, key:str) -> PassCacheEntry:
+        """ cached passes of a key, an empty entry if there are none (or the file can not be read) """
+        if not os.path.exists(self._file(key)):
+            return PassCacheEntry()
+        try:
+            with np.load(self._file(key)) as cached:
+                entry = PassCacheEntry(cached["intervals"], cached["passes"])
+        except Exception as e:
+            print(f"Pass cache {self._file(key)} can not be loaded, computing again: {str(e)}")
+            return PassCacheEntry()
+        try:
+            index = self._index()
+            index[key] = time.time()
+            self._write_index(index)
+        except OSError as e:
+            print(f"Pass cache index can not be written: {str(e)}")
+        return entry
+
+    def store(self, key:str, entry:PassCacheEntry):
+        """ saves an entry and removes the least recently used ones above max_entries """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_file = self._file(key) + ".tmp.npz"
+            np.savez(tmp_file, intervals=entry.intervals, passes=entry.passes)
+            os.replace(tmp_file, self._file(key))
+
+            index = self._index()
+            index[key] = time.time()
+            for old_key in sorted(index, key=index.get)[:max(len(index) - self.max_entries, 0)]:
+                del index[old_key]
+                if os.path.exists(self._file(old_key)):
+                    os.remove(self._file(old_key))
+            self._write_index(index)
+        except OSError as e:
+            print(f"Pass cache {self._file(key)} can not be written: {str(e)}")
@@ -0,0 +1,414 @@
+import numpy as np
+from sgp4.api import SatrecArray, jday
+from skyfield.sgp4lib import TEME, theta_GMST1982
+
+from satcatalog import GEO_REV_PER_DAY
+
+DAY_S = 86400.0
+J2000_TT = 2451545.0
+ERAD_KM = 6378.1366  # same earth radius skyfield uses for is_sunlit
+
+# one row per complete pass (rise and set inside the watch window), times are TT julian dates
+PASS_DTYPE = np.dtype([('sat_idx', np.int64),
+                       ('rise_tt', np.float64),
+                       ('culm_tt', np.float64),
+                       ('set_tt', np.float64),
+                       ('max_elevation', np.float64)])
+
+COARSE_STEP_S = 30  # passes shorter than two coarse steps could slip through, but those get dropped anyway (< 1 min)
+FINE_STEP_S = 1  # resolution used to refine rise, set and culmination inside a coarse interval
+CHUNK_SIZE = 512  # satellites propagated at once, keeps the (sats x times x 3) arrays at a few MB
+SUNLIT_STEP_S = 5  # sampling of the sunlit percentage
+SUNLIT_BRACKET_S = 60  # adaptive mode: shadow entries / exits are searched on this grid and then bisected
+SUNLIT_TOLERANCE_S = 1e-3
+
+# pre-filter constants, every approximation is made in favour of keeping a satellite
+EARTH_POLAR_RADIUS_KM = 6356.752  # smallest station radius -> largest possible visibility footprint
+EARTH_ROTATION_RAD_PER_MIN = 7.2921158553e-5 * 60
+PREFILTER_MARGIN_RAD = np.radians(0.5)  # geodetic vs. geocentric latitude, TLE mean elements vs. osculating ones
+GEO_MAX_ECCENTRICITY = 0.01
+GEO_DRIFT_UNCERTAINTY_RAD_PER_DAY = np.radians(0.05)  # unmodelled J2 rates, grows with the age of the TLE
+
+
+class TimeGrid:
+    """ TT julian dates together with the split UTC / UT1 dates needed by sgp4 and the TEME -> ITRS rotation """
+
+    def __init__(self, t0, offsets_days):
+        jd0, fr0 = jday(*t0.utc)
+        self.jd = jd0
+        self.fr_utc = fr0 + offsets_days
+        self.tt = t0.tt + offsets_days
+        # ut1 - utc is constant over a watch window (no leap second handling needed here)
+        self.fr_ut1 = self.fr_utc + (t0.ut1 - (jd0 + fr0))
+        self.theta = theta_GMST1982(self.jd, self.fr_ut1)[0]
+
+    def __len__(self):
+        return len(self.tt)
+
+
+def station_itrs(gnd_station):
+    """ returns ITRS position in km and the local up unit vector of a skyfield wgs84 station """
+    lat = gnd_station.latitude.radians
+    lon = gnd_station.longitude.radians
+    up = np.array([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+    return np.asarray(gnd_station.itrs_xyz.km), up
+
+
+def _elevation_deg(r_teme, error, theta, station_xyz, up):
+    """ elevation in degrees of TEME positions r_teme (..., n_t, 3) seen from the station
+
+    satellites for which sgp4 reports an error are put far below the horizon
+    """
+    cos_t, sin_t = np.cos(theta), np.sin(theta)
+    # TEME -> pseudo earth fixed, polar motion is negligible for visibility purposes
+    x = cos_t * r_teme[..., 0] + sin_t * r_teme[..., 1] - station_xyz[0]
+    y = -sin_t * r_teme[..., 0] + cos_t * r_teme[..., 1] - station_xyz[1]
+    z = r_teme[..., 2] - station_xyz[2]
+    rho = np.sqrt(x * x + y * y + z * z)
+    elevation = np.degrees(np.arcsin((x * up[0] + y * up[1] + z * up[2]) / rho))
+    return np.where(error == 0, elevation, -90.0)
+
+
+def _coarse_passes(above):
+    """ pairs rising and setting grid intervals of a boolean (sats x times) matrix
+
+    :returns: satellite index, coarse index before rising, coarse index before setting
+    """
+    rises = ~above[:, :-1] & above[:, 1:]
+    sets = above[:, :-1] & ~above[:, 1:]
+    # a set without a preceding rise (already visible at t0) or a rise without set (still visible at t1)
+    # is no complete pass -> drop the first set / last rise of those satellites
+    sets[above[:, 0], np.argmax(sets[above[:, 0]], axis=1)] = False
+    rises[above[:, -1], (rises.shape[1] - 1) - np.argmax(rises[above[:, -1], ::-1], axis=1)] = False
+
+    rise_sat, rise_k = np.nonzero(rises)
+    set_sat, set_k = np.nonzero(sets)
+    # rise and set alternate for every satellite, so both lists are aligned now
+    return rise_sat, rise_k, set_k
+
+
+def _crossing(tt, elevation, min_elevation, rising):
+    """ linear interpolation of the first threshold crossing within a finely sampled interval """
+    above = elevation >= min_elevation
+    k = np.argmax(above) if rising else np.argmax(~above)
+    if k == 0:
+        return tt[0]
+    e0, e1 = elevation[k - 1] - min_elevation, elevation[k] - min_elevation
+    return tt[k - 1] + (tt[k] - tt[k - 1]) * e0 / (e0 - e1)
+
+
+def _culmination(tt, elevation):
+    """ refines the maximum of a finely sampled elevation curve with a parabola through its neighbours """
+    k = int(np.argmax(elevation))
+    if k == 0 or k == len(elevation) - 1:
+        return tt[k], elevation[k]
+    e0, e1, e2 = elevation[k - 1:k + 2]
+    denom = e0 - 2 * e1 + e2
+    if denom >= 0:
+        return tt[k], e1
+    shift = 0.5 * (e0 - e2) / denom  # in units of the fine step
+    return tt[k] + shift * (tt[k + 1] - tt[k]), e1 - 0.25 * (e0 - e2) * shift
+
+
+def _footprint_half_angle(radius_km, min_elevation):
+    """ earth central angle between station and sub-satellite point at which an object at radius_km is seen at
+    min_elevation, objects further away are below the mask """
+    eps = np.radians(min_elevation)
+    cos_arg = np.clip(EARTH_POLAR_RADIUS_KM * np.cos(eps) / radius_km, -1.0, 1.0)
+    return np.arccos(cos_arg) - eps
+
+
+def visibility_prefilter(catalog, gnd_station, t0, t1, min_elevation):
+    """ cheap analytic test which satellites can possibly rise above min_elevation, runs before any sgp4 call
+
+    An orbit with inclination i never has a sub-satellite point beyond latitude i (180° - i for retrograde orbits),
+    and even at apogee it can only be seen above the mask within a certain earth central angle from the station.
+    Geostationary objects (about one revolution per day, nearly circular) additionally keep their sub-satellite
+    longitude, which drifts linearly with the difference of mean motion and earth rotation, so the longitude band
+    they cover during the window must come close enough to the station.
+
+    :param catalog: satellites to check
+    :type catalog: SatelliteCatalog
+
+    :param gnd_station: observing ground station
+    :type gnd_station: skyfield.toposlib.GeographicPosition
+
+    :param t0: begin of watch window
+    :type t0: skyfield.api.Time
+
+    :param t1: end of watch window
+    :type t1: skyfield.api.Time
+
+    :param min_elevation: elevation mask in degree
+    :type min_elevation: float
+
+    :returns: mask which is False for satellites that provably stay below the mask
+    :rtype: numpy.ndarray of bool
+    """
+    elements = catalog.elements
+    station_lat = abs(gnd_station.latitude.radians)
+    station_lon = gnd_station.longitude.radians
+    inclination = np.minimum(elements['inclination'], np.pi - elements['inclination'])
+    apogee_radius = catalog.semi_major_axis_km * (1 + elements['eccentricity'])
+    footprint = _footprint_half_angle(apogee_radius, min_elevation) + PREFILTER_MARGIN_RAD
+
+    possible = station_lat - inclination <= footprint
+
+    # geostationary belt: check the longitude band covered during the window
+    rev_per_day = catalog.rev_per_day
+    geo = ((rev_per_day >= GEO_REV_PER_DAY[0]) & (rev_per_day <= GEO_REV_PER_DAY[1])
+           & (elements['eccentricity'] < GEO_MAX_ECCENTRICITY) & possible)
+    if np.any(geo):
+        geo_elements = elements[geo]
+        mean_longitude = geo_elements['raan'] + geo_elements['arg_perigee'] + geo_elements['mean_anomaly']
+        drift = geo_elements['mean_motion'] - EARTH_ROTATION_RAD_PER_MIN  # rad/min
+
+        def sub_satellite_longitude(t):
+            minutes_since_epoch = (t.ut1 - geo_elements['epoch']) * 24 * 60
+            theta = theta_GMST1982(geo_elements['epoch'], 0.0)[0]  # sidereal angle at epoch
+            return mean_longitude - theta + drift * minutes_since_epoch
+
+        lon0 = sub_satellite_longitude(t0)
+        lon1 = sub_satellite_longitude(t1)
+        # longitude oscillates by about 2e (eccentricity) and i^2/4 (inclination) around its mean
+        tle_age_days = np.maximum(np.abs(t0.ut1 - geo_elements['epoch']), np.abs(t1.ut1 - geo_elements['epoch']))
+        wobble = (2 * geo_elements['eccentricity'] + 0.25 * inclination[geo] ** 2 + PREFILTER_MARGIN_RAD
+                  + GEO_DRIFT_UNCERTAINTY_RAD_PER_DAY * tle_age_days)
+        lon_mid = 0.5 * (lon0 + lon1)
+        half_width = 0.5 * np.abs(lon1 - lon0) + wobble
+        # angular distance of the station meridian to the covered longitude band
+        offset = np.abs((station_lon - lon_mid + np.pi) % (2 * np.pi) - np.pi)
+        delta_lon = np.maximum(offset - half_width, 0.0)
+
+        # smallest central angle between station and any latitude within +-i on that meridian
+        sin_lat, cos_lat = np.sin(station_lat), np.cos(station_lat)
+        amplitude = np.sqrt(sin_lat ** 2 + (cos_lat * np.cos(delta_lon)) ** 2)
+        closest_lat = np.arctan2(sin_lat, cos_lat * np.cos(delta_lon))
+        reachable_lat = np.clip(closest_lat, -inclination[geo], inclination[geo])
+        min_central_angle = np.arccos(np.clip(amplitude * np.cos(closest_lat - reachable_lat), -1.0, 1.0))
+
+        possible[geo] = min_central_angle <= footprint[geo]
+
+    return possible
+
+
+def predict_passes(satrecs, gnd_station, t0, t1, min_elevation, coarse_step_s=COARSE_STEP_S):
+    """ finds all complete passes above min_elevation of many satellites at once
+
+    All satellites are propagated with sgp4's array interface on one shared coarse time grid, threshold crossings
+    are detected by sign changes of the elevation and only those coarse intervals (and the one around the highest
+    coarse sample) get refined on a fine grid. Passes shorter than two coarse steps can be missed.
+
+    :param satrecs: sgp4 Satrec objects (e.g. EarthSatellite.model)
+    :type satrecs: list
+
+    :param gnd_station: observing ground station
+    :type gnd_station: skyfield.toposlib.GeographicPosition
+
+    :param t0: begin of watch window
+    :type t0: skyfield.api.Time
+
+    :param t1: end of watch window
+    :type t1: skyfield.api.Time
+
+    :param min_elevation: elevation mask in degree
+    :type min_elevation: float
+
+    :param coarse_step_s: step of the shared coarse grid in seconds
+    :type coarse_step_s: float
+
+    :returns: passes sorted by satellite index and rise time
+    :rtype: numpy.ndarray of PASS_DTYPE
+    """
+    window_s = (t1.tt - t0.tt) * DAY_S
+    if len(satrecs) == 0 or window_s <= 0:
+        return np.zeros(0, dtype=PASS_DTYPE)
+
+    n_steps = max(int(np.ceil(window_s / coarse_step_s)), 1)
+    offsets = np.linspace(0.0, window_s, n_steps + 1) / DAY_S
+    grid = TimeGrid(t0, offsets)
+    station_xyz, up = station_itrs(gnd_station)
+
+    # subdivide every coarse interval into an integer number of fine steps so coarse samples are hit exactly
+    n_sub = max(int(np.ceil(offsets[1] * DAY_S / FINE_STEP_S)), 1)
+
+    def fine_elevation(satrec, k_start, n_coarse):
+        # samples one satellite finely over n_coarse coarse intervals beginning at grid index k_start
+        n_fine = n_coarse * n_sub + 1
+        offs = offsets[k_start] + np.arange(n_fine) * (offsets[1] / n_sub)
+        fine = TimeGrid(t0, offs)
+        e, r, _ = satrec.sgp4_array(np.full(n_fine, fine.jd), fine.fr_utc)
+        return fine.tt, _elevation_deg(r, e, fine.theta, station_xyz, up)
+
+    passes = []
+    for start in range(0, len(satrecs), CHUNK_SIZE):
+        chunk = satrecs[start:start + CHUNK_SIZE]
+        e, r, _ = SatrecArray(chunk).sgp4(np.full(len(grid), grid.jd), grid.fr_utc)
+        elevation = _elevation_deg(r, e, grid.theta, station_xyz, up)
+
+        rise_sat, rise_k, set_k = _coarse_passes(elevation >= min_elevation)
+        for sat, k_rise, k_set in zip(rise_sat, rise_k, set_k):
+            satrec = chunk[sat]
+            tt, el = fine_elevation(satrec, k_rise, 1)
+            rise_tt = _crossing(tt, el, min_elevation, rising=True)
+            tt, el = fine_elevation(satrec, k_set, 1)
+            set_tt = _crossing(tt, el, min_elevation, rising=False)
+
+            # highest coarse sample of the pass and its two neighbouring intervals
+            k_max = k_rise + 1 + int(np.argmax(elevation[sat, k_rise + 1:k_set + 1]))
+            tt, el = fine_elevation(satrec, k_max - 1, 2)
+            inside = (tt >= rise_tt) & (tt <= set_tt)
+            inside[n_sub] = True  # the highest coarse sample itself, guards against rounding at the edges
+            culm_tt, max_elevation = _culmination(tt[inside], el[inside])
+
+            passes.append((start + sat, rise_tt, culm_tt, set_tt, max_elevation))
+
+    return np.array(passes, dtype=PASS_DTYPE)
+
+
+def first_passes(passes):
+    """ reduces passes to the first one of every satellite
+
+    :param passes: passes sorted by satellite index and rise time
+    :type passes: numpy.ndarray of PASS_DTYPE
+
+    :rtype: numpy.ndarray of PASS_DTYPE
+    """
+    if len(passes) == 0:
+        return passes
+    first = np.ones(len(passes), dtype=bool)
+    first[1:] = passes['sat_idx'][1:] != passes['sat_idx'][:-1]
+    return passes[first]
+
+
+def _sun_teme_km(planets, t):
+    """ geocentric sun position in the TEME frame of sgp4 for every epoch of t, shape (n, 3) """
+    sun_gcrs = (planets['sun'] - planets['earth']).at(t).xyz.km
+    # TEME.rotation_at rotates GCRS into TEME
+    return np.einsum('ijn,jn->ni', TEME.rotation_at(t), sun_gcrs)
+
+
+def _sunlit_margin(r_teme, sun_teme):
+    """ positive if sunlit, zero or negative inside earth's shadow (same geometry as skyfield's is_sunlit)
+
+    the margin is the distance of the satellite-sun line from earth's centre minus earth's radius as long as earth
+    lies in the direction of the sun, so it changes sign exactly at shadow entry and exit
+    """
+    to_sun = sun_teme - r_teme
+    to_sun /= np.linalg.norm(to_sun, axis=-1, keepdims=True)
+    along = -np.sum(to_sun * r_teme, axis=-1)
+    miss_distance = np.sqrt(np.maximum(np.sum(r_teme * r_teme, axis=-1) - along * along, 0.0))
+    return np.where(along > 0, miss_distance - ERAD_KM, ERAD_KM)
+
+
+def _propagate_teme(satrecs, sat_idx, ts, tt):
+    """ TEME positions in km of satrecs[sat_idx[i]] at tt[i], one sgp4 call per run of equal satellites """
+    r = np.empty((len(tt), 3))
+    if len(tt) == 0:
+        return r
+    ref = ts.tt_jd(tt.min())
+    jd0, fr0 = jday(*ref.utc)
+    fr = fr0 + (tt - ref.tt)
+    starts = np.flatnonzero(np.r_[True, sat_idx[1:] != sat_idx[:-1], True])
+    for a, b in zip(starts[:-1], starts[1:]):
+        _, r[a:b], _ = satrecs[sat_idx[a]].sgp4_array(np.full(b - a, jd0), fr[a:b])
+    return r
+
+
+def _anchored_samples(t_from, t_to, step_s):
+    """ epochs on a fixed step_s grid (counted from J2000) inside [t_from, t_to) for many intervals at once
+
+    the grid does not depend on the watch window, so the same pass always gets the same samples
+
+    :returns: interval index and TT epoch of every sample
+    """
+    first = np.ceil((t_from - J2000_TT) * DAY_S / step_s).astype(np.int64)
+    last = np.ceil((t_to - J2000_TT) * DAY_S / step_s).astype(np.int64) - 1
+    counts = np.maximum(last - first + 1, 0)
+    interval = np.repeat(np.arange(len(t_from)), counts)
+    k = first[interval] + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+    return interval, J2000_TT + k * (step_s / DAY_S)
+
+
+def sunlit_fractions(satrecs, passes, ts, planets, step_s=SUNLIT_STEP_S, adaptive=False):
+    """ fraction of every pass that the satellite spends in sunlight
+
+    The sample epochs of all passes are concatenated into one time array, the sun is evaluated once per distinct
+    epoch and the shadow test runs vectorized over all samples.
+    In adaptive mode shadow entry and exit are located by bisection inside a coarse bracket grid (step_s then
+    defaults to SUNLIT_BRACKET_S), which gives the exact fraction with a handful of evaluations per pass.
+
+    :param satrecs: sgp4 Satrec objects, passes['sat_idx'] indexes into this list
+    :type satrecs: list
+
+    :param passes: passes as returned by predict_passes
+    :type passes: numpy.ndarray of PASS_DTYPE
+
+    :param ts: skyfield timescale
+    :type ts: skyfield.timelib.Timescale
+
+    :param planets: planetary ephemeris containing sun and earth
+    :type planets: skyfield.jpllib.SpiceKernel
+
+    :param step_s: sampling step (or bracket step in adaptive mode) in seconds
+    :type step_s: float
+
+    :param adaptive: search shadow boundaries instead of counting samples
+    :type adaptive: bool
+
+    :returns: sunlit fraction between 0 and 1 for each pass
+    :rtype: numpy.ndarray
+    """
+    if len(passes) == 0:
+        return np.zeros(0)
+    if adaptive:
+        return _sunlit_fractions_adaptive(satrecs, passes, ts, planets,
+                                          SUNLIT_BRACKET_S if step_s == SUNLIT_STEP_S else step_s)
+
+    pass_idx, tt = _anchored_samples(passes['rise_tt'], passes['set_tt'], step_s)
+    epochs, epoch_idx = np.unique(tt, return_inverse=True)
+    sun = _sun_teme_km(planets, ts.tt_jd(epochs))[epoch_idx]
+    r = _propagate_teme(satrecs, passes['sat_idx'][pass_idx], ts, tt)
+
+    sunlit = _sunlit_margin(r, sun) > 0
+    n_samples = np.bincount(pass_idx, minlength=len(passes))
+    n_sunlit = np.bincount(pass_idx, weights=sunlit, minlength=len(passes))
+    return np.divide(n_sunlit, n_samples, out=np.zeros(len(passes)), where=n_samples > 0)
+
+
+def _sunlit_fractions_adaptive(satrecs, passes, ts, planets, bracket_s):
+    """ exact sunlit fractions from bisected shadow boundaries, see sunlit_fractions """
+    # bracket grid: rise, anchored grid points in between and set of every pass
+    pass_idx, tt = _anchored_samples(passes['rise_tt'], passes['set_tt'], bracket_s)
+    pass_idx = np.concatenate((np.arange(len(passes)), pass_idx, np.arange(len(passes))))
+    tt = np.concatenate((passes['rise_tt'], tt, passes['set_tt']))
+    order = np.lexsort((tt, pass_idx))
+    pass_idx, tt = pass_idx[order], tt[order]
+    sat_idx = passes['sat_idx'][pass_idx]
+
+    def margin(sat, t):
+        return _sunlit_margin(_propagate_teme(satrecs, sat, ts, t), _sun_teme_km(planets, ts.tt_jd(t)))
+
+    sunlit = margin(sat_idx, tt) > 0
+
+    # every change of the sunlit state inside a pass brackets one shadow entry or exit
+    change = (pass_idx[1:] == pass_idx[:-1]) & (sunlit[1:] != sunlit[:-1])
+    lo, hi = tt[:-1][change], tt[1:][change]
+    lo_sunlit = sunlit[:-1][change]
+    crossing_pass, crossing_sat = pass_idx[:-1][change], sat_idx[:-1][change]
+    while len(lo) and np.max(hi - lo) * DAY_S > SUNLIT_TOLERANCE_S:
+        mid = 0.5 * (lo + hi)
+        same = (margin(crossing_sat, mid) > 0) == lo_sunlit
+        lo = np.where(same, mid, lo)
+        hi = np.where(same, hi, mid)
+    crossing_tt = 0.5 * (lo + hi)
+
+    # sunlit time = sum over the segments between rise, crossings and set that start in sunlight
+    first = np.flatnonzero(np.r_[True, pass_idx[1:] != pass_idx[:-1]])
+    sunlit_at_rise = sunlit[first]
+    duration = passes['set_tt'] - passes['rise_tt']
+    sunlit_time = np.where(sunlit_at_rise, duration, 0.0)
+    # each crossing toggles the state: entering shadow removes the remaining time, leaving it adds it back
+    remaining = passes['set_tt'][crossing_pass] - crossing_tt
+    np.add.at(sunlit_time, crossing_pass, np.where(lo_sunlit, -remaining, remaining))
+    return np.divide(sunlit_time, duration, out=np.zeros(len(passes)), where=duration > 0)
@@ -1,5 +1,5 @@
 import os
-from datetime import timedelta, timezone
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import numpy as np
 import requests
@@ -7,14 +7,26 @@ import json
 from skyfield.api import load as sky_load
 from skyfield.api import wgs84 as sky_wgs84
 import skyfield.api as sky
-from skyfield.iokit import parse_tle_file as sky_parse_tle_file
 
 from utils.configManager import (STATION_CFG,
                                  SPACE_TRACK_CFG,
                                  LEO_TLE_FILE,
                                  TLE_DATA_PATH,
                                  OGS_TLE_FILE,
-                                 MIN_ALTITUDE_ElEVATION)
+                                 OGS_CATALOG_CACHE,
+                                 LEO_CATALOG_CACHE,
+                                 MIN_ALTITUDE_ElEVATION,
+                                 SUNLIT_ADAPTIVE,
+                                 PASS_PREDICTION_WORKERS,
+                                 PASS_PREDICTION_SHARD_SIZE,
+                                 PASS_CACHE_PATH,
+                                 PASS_CACHE_MAX_ENTRIES,
+                                 PASS_CACHE_MARGIN_MIN)
+from utils.skyfieldProvider import get_timescale, get_planets
+from tlecache import load_catalog
+from satcatalog import SatelliteCatalog, EARTH_RADIUS_KM
+from passprediction import predict_passes, first_passes, sunlit_fractions, visibility_prefilter
+from passcache import CACHED_PASS_DTYPE, PassCache, PassCacheEntry, cache_key
 
 
 def load_StationLatLongAlt() -> (float, float, float):
@@ -105,8 +117,110 @@ def get_TLE_data_aga(ogs_flag:bool=False) -> int:
     else:
         return round(sky_load.days_old(LEO_TLE_FILE))
 
-def create_satellite_data_list(startTime:sky.Time, durationMin:int, ogs_flag:bool=False) -> (list, dict):
-    """ creates a list with satellite data and a dictionary mapping the satellite ID to its TLE data
+def load_TLE_catalog(ogs_flag:bool=False) -> SatelliteCatalog:
+    """ returns the satellite catalog of the selected source, compiled TLEs are cached (see tlecache.load_catalog)
+
+    :param ogs_flag: flag indicating which source to use
+    :type ogs_flag: bool
+
+    :rtype: SatelliteCatalog
+    """
+    if ogs_flag:
+        tle_dir = os.path.join(TLE_DATA_PATH, "ogs_tle")
+        tle_files = [os.path.join(tle_dir, f) for f in os.listdir(tle_dir) if f.endswith(".tle")]
+        return SatelliteCatalog.from_arrays(load_catalog(tle_files, OGS_CATALOG_CACHE))
+    else:
+        return SatelliteCatalog.from_arrays(load_catalog([LEO_TLE_FILE], LEO_CATALOG_CACHE))
+
+# ground station of a pass prediction worker process, set by _init_prediction_worker
+_worker_station = None
+
+
+def _init_prediction_worker(gnd_lat:float, gnd_long:float, gnd_alt:float):
+    """ runs once in every worker process: loads timescale, planetary ephemeris and ground station """
+    global _worker_station
+    get_timescale()
+    get_planets()
+    _worker_station = sky_wgs84.latlon(gnd_lat, gnd_long, gnd_alt)
+
+
+def _predict_shard(shard:SatelliteCatalog, windows_tt:list, gnd_station=None) -> np.ndarray:
+    """ computes all complete passes of one catalog shard (in a worker process or in the calling one)
+
+    :param windows_tt: time windows as (start, end) in TT julian dates
+    :type windows_tt: list
+
+    :returns: passes incl. sunlit fraction, sat_idx is the row within the shard
+    :rtype: numpy.ndarray of passcache.CACHED_PASS_DTYPE
+    """
+    ts = get_timescale()
+    eph = get_planets()
+    if gnd_station is None:
+        gnd_station = _worker_station
+
+    # all satellites of the shard are propagated together
+    satrecs = shard.satrecs
+    shard_passes = [np.empty(0, dtype=CACHED_PASS_DTYPE)]
+    for t0_tt, t1_tt in windows_tt:
+        passes = predict_passes(satrecs, gnd_station, ts.tt_jd(t0_tt), ts.tt_jd(t1_tt), MIN_ALTITUDE_ElEVATION)
+        with_sunlit = np.empty(len(passes), dtype=CACHED_PASS_DTYPE)
+        for field in passes.dtype.names:
+            with_sunlit[field] = passes[field]
+        # time in sunlight of all passes in one go (5 second samples or exact shadow boundaries)
+        with_sunlit['sunlit'] = sunlit_fractions(satrecs, passes, ts, eph, adaptive=SUNLIT_ADAPTIVE)
+        shard_passes.append(with_sunlit)
+    return np.concatenate(shard_passes)
+
+
+def _satellite_rows(catalog:SatelliteCatalog, passes:np.ndarray, t0_tt:float, heights:np.ndarray) -> list:
+    """ builds the satellite-data rows out of the passes in the watch window
+
+    :param passes: complete passes in the window sorted by catalog row and rise time
+    :type passes: numpy.ndarray of passcache.CACHED_PASS_DTYPE
+
+    :returns: list of (catalog row, satellite-data tuple), see create_satellite_data_list
+    :rtype: list
+    """
+    # only the first complete pass in the window is listed
+    passes = first_passes(passes)
+    # ignore flights that are not even visible for just a minute
+    passes = passes[(passes['set_tt'] - passes['rise_tt']) * 24 * 60 >= 1]
+
+    rows = list()
+    for sat_pass in passes:
+        row = int(sat_pass['sat_idx'])
+        name = catalog.name(row)
+        noradID = str(catalog.norad_ids[row])
+        height = heights[row]
+
+        rise_time_delta = (sat_pass['rise_tt'] - t0_tt) * 24 * 60
+        flight_duration = (sat_pass['set_tt'] - sat_pass['rise_tt']) * 24 * 60
+        sunlit_percentage = sat_pass['sunlit'] * 100
+        maximum_elevation = sat_pass['max_elevation']
+
+        # finally fill all data into list
+        rows.append((row, (name, noradID, f"{rise_time_delta:.2f} min", f"{flight_duration:.2f} min",
+                           f"{sunlit_percentage:.2f} %", f"{height:.2f} km",
+                           f"{maximum_elevation:.2f} °" if maximum_elevation != 0 else "----")))
+    return rows
+
+
+def _prediction_workers(workers:int=None) -> int:
+    workers = PASS_PREDICTION_WORKERS if workers is None else workers
+    return (os.cpu_count() or 1) if workers <= 0 else workers
+
+
+def iter_satellite_data(catalog:SatelliteCatalog, startTime:sky.Time, durationMin:int, workers:int=None,
+                        use_cache:bool=True):
+    """ computes the satellite-data rows of a catalog shard by shard and yields them as soon as a shard is done
+
+    With more than one worker the shards are spread over a process pool whose workers load ephemeris and ground
+    station once. Shards finish in any order, the catalog row delivered with every entry allows a deterministic merge.
+    Passes are cached on disk per catalog, station and elevation mask; only the part of the watch window that was
+    not computed before is propagated, the cache is updated once all shards are done.
+
+    :param catalog: satellites to check
+    :type catalog: SatelliteCatalog
 
     :param startTime: skyfield Time object marking the beginning of observation time
     :type startTime: skyfield.api.Time
@@ -114,79 +228,17 @@ def create_satellite_data_list(startTime:sky.Time, durationMin:int, ogs_flag:boo
     :param durationMin: duration of watch window in minutes
     :type durationMin: int
 
-    :param ogs_flag: flag indicating which source to use
-    :type ogs_flag: bool
+    :param workers: number of processes, 1 computes in the calling process, 0 uses all cores,
+                    None takes PASS_PREDICTION_WORKERS
+    :type workers: int
 
-    :returns: Tuple with list of satellite-data and a satellite-dict mapping ID -> TLE data
-                satellite-data is a tuple with
-                    0: name
-                    1: NoradID
-                    2: rise-time-delta to starting point in decimal minutes with resolution of seconds
-                    3: time visible in minutes with second resolution
-                    4: percentage of flight time in sunlight
-                    5: distance to earth surface in km
-                    6: maximum elevation in degree
-                satellite-dict:
-                    keys: satellite NoradID's
-                    item: Tuple with line0, line1, line2 as strings
-    :rtype: tuple
-    """
-    ts = sky_load.timescale()
-
-    satellites_dict = dict()
-    satellite_data_list = list()
-    if ogs_flag:
-        satellites = []
-        for ogs_tle_file in os.listdir(os.path.join(TLE_DATA_PATH, "ogs_tle")):
-            if ogs_tle_file.endswith(".tle"):
-                with sky_load.open(os.path.join(TLE_DATA_PATH, "ogs_tle", ogs_tle_file)) as f:
-                    satellites += list(sky_parse_tle_file(f, ts))
-                with open(os.path.join(TLE_DATA_PATH, "ogs_tle", ogs_tle_file)) as f:
-                    # modified for format received by celes-track (ogs data)
-                    line0, line1, line2 = "", "", ""
-                    idx = 0
-                    for line in f.readlines():
-                        if line.startswith("1"):
-                            line1 = line.strip().strip("\n")
-                            idx += 1
-                        elif line.startswith("2"):
-                            line2 = line.strip().strip("\n")
-                            idx += 1
-                        else:
-                            line0 = line.strip().strip("\n")
-                            if not line0.startswith("0"):
-                                line0 = "0 " + line0
-                            idx += 1
-
-                        if idx == 3:
-                            idx = 0
-                            satellites_dict[line1[2:8]] = (line0+"\n", line1+"\n", line2+"\n")
-    else:
-        with sky_load.open(LEO_TLE_FILE) as f:
-            satellites = list(sky_parse_tle_file(f, ts))
-        with open(LEO_TLE_FILE) as f:
-            # modified for format received by Space-track (LEO data)
-            line0, line1, line2 = "", "", ""
-            idx = 0
-            for line in f.readlines():
-                if line.startswith("0"):
-                    line0 = line.strip().strip("\n")
-                    if not line0.startswith("0"):
-                        line0 = "0 " + line0
-                    idx += 1
-                elif line.startswith("1"):
-                    line1 = line.strip().strip("\n")
-                    idx += 1
-                elif line.startswith("2"):
-                    line2 = line.strip().strip("\n")
-                    idx += 1
-                else:
-                    continue
-                if idx == 3:
-                    idx = 0
-                    satellites_dict[line1[2:8]] = (line0+"\n", line1+"\n", line2+"\n")
+    :param use_cache: reuse and extend the pass cache (PASS_CACHE_PATH)
+    :type use_cache: bool
 
-    print('Loaded', len(satellites), 'satellites')
+    :returns: generator of (processed satellites, satellites to process, list of (catalog row, satellite-data))
+    :rtype: generator
+    """
+    ts = get_timescale()
 
     gnd_lat, gnd_long, gnd_alt = load_StationLatLongAlt()
     gnd_station = sky_wgs84.latlon(gnd_lat, gnd_long, gnd_alt)
@@ -199,67 +251,122 @@ def create_satellite_data_list(startTime:sky.Time, durationMin:int, ogs_flag:boo
                          startTime.utc.minute + durationMin % 60
                          )
 
-    for sat in satellites:
-        name = sat.name
-        # intDes = sat.intldesg
-        noradID = sat.model.satnum_str + sat.model.classification
-        height = (sat.model.a - 1) * sat.model.radiusearthkm # a is given in earth_radii
-
-        t, events = sat.find_events(gnd_station, t0, t1, altitude_degrees=MIN_ALTITUDE_ElEVATION) #
-        # events[i] = 0 — Satellite rose above altitude_degrees.
-        # events[i] = 1 — Satellite culminated and started to descend again.
-        # events[i] = 2 — Satellite fell below altitude_degrees.
-        rise_time_delta, set_time_delta = None, None
-        maximum_elevation = 0
-        for time_stamp, event in zip(t, events):
-            if event == 0 and rise_time_delta is None:
-                rise_time_delta = (time_stamp.utc.hour*60 + time_stamp.utc.minute + time_stamp.utc.second/60) \
-                                  - (startTime.utc.hour*60 + startTime.utc.minute)
-            elif event == 1:
-                elevation = (sat-gnd_station).at(time_stamp).altaz()[0].degrees
-                if elevation > maximum_elevation:
-                    maximum_elevation = elevation
-            elif event == 2 and set_time_delta is None and rise_time_delta is not None:
-                set_time_delta = (time_stamp.utc.hour*60 + time_stamp.utc.minute + time_stamp.utc.second/60) \
-                                  - (startTime.utc.hour*60 + startTime.utc.minute)
-                flight_duration = set_time_delta - rise_time_delta
-        if set_time_delta is None or flight_duration < 1:
-            # ignore flights that do not set or are not even visible for just a minute
-            continue
-
-        # if set_time_delta is not None: # satellite does set in given window -> calculate time in sunlight
-        # minute resolution sucks -> change to 5 second resolution
-        time_points = int(flight_duration*60/5)
-        watch_times = ts.from_datetimes([startTime.utc_datetime().replace(tzinfo=timezone.utc)
-                                        + timedelta(minutes=rise_time_delta) # accepts partial minutes
-                                        + timedelta(seconds=step*5)
-                                        for step in range(time_points)
-        ])
-
-        eph = sky_load('de421.bsp')
-        sunlit = sat.at(watch_times).is_sunlit(eph) # returns array of [False, False, True, ..., False]
-        sunlit_percentage = np.array(sunlit, dtype=bool).sum() / len(sunlit) * 100
+    # passes computed for earlier (overlapping) watch windows
+    use_cache = use_cache and PASS_CACHE_MAX_ENTRIES > 0
+    pass_cache = PassCache(PASS_CACHE_PATH, PASS_CACHE_MAX_ENTRIES)
+    key = cache_key(catalog.fingerprint(), gnd_lat, gnd_long, gnd_alt, MIN_ALTITUDE_ElEVATION, SUNLIT_ADAPTIVE)
+    cached = pass_cache.load(key) if use_cache else PassCacheEntry()
+    windows_tt = cached.gaps(t0.tt, t1.tt, PASS_CACHE_MARGIN_MIN / (24 * 60))
+    heights = catalog.semi_major_axis_km - EARTH_RADIUS_KM
+
+    # drop satellites that can never reach the elevation mask before propagating anything
+    if windows_tt:
+        span = ts.tt_jd(windows_tt[0][0]), ts.tt_jd(windows_tt[-1][1])
+        candidate_rows = np.flatnonzero(visibility_prefilter(catalog, gnd_station, *span, MIN_ALTITUDE_ElEVATION))
+    else:
+        candidate_rows = np.empty(0, dtype=np.int64)
+    print('Pre-filter skipped', len(catalog) - len(candidate_rows), 'of', len(catalog), 'satellites,',
+          len(windows_tt), 'time windows not cached')
+    candidates = catalog[candidate_rows]
+
+    # satellites that are not propagated again are complete with the cached passes
+    others = np.setdiff1d(np.arange(len(catalog)), candidate_rows)
+    yield 0, len(candidates), _satellite_rows(catalog, cached.window(t0.tt, t1.tt, others), t0.tt, heights)
+
+    shards = [(candidates[start:start + PASS_PREDICTION_SHARD_SIZE], start)
+              for start in range(0, len(candidates), PASS_PREDICTION_SHARD_SIZE)]
+    new_passes = [np.empty(0, dtype=CACHED_PASS_DTYPE)]
+
+    def merge_shard(shard, first_row, passes):
+        # shard rows -> catalog rows, combined with the cached passes of the same satellites
+        passes['sat_idx'] = candidate_rows[first_row + passes['sat_idx']]
+        new_passes.append(passes)
+        shard_rows = candidate_rows[first_row:first_row + len(shard)]
+        entry = PassCacheEntry(passes=cached.window(t0.tt, t1.tt, shard_rows))
+        entry.add([], passes)
+        return _satellite_rows(catalog, entry.window(t0.tt, t1.tt), t0.tt, heights)
+
+    done = 0
+    workers = _prediction_workers(workers)
+    if workers == 1 or len(shards) <= 1:
+        for shard, first_row in shards:
+            passes = _predict_shard(shard, windows_tt, gnd_station)
+            done += len(shard)
+            yield done, len(candidates), merge_shard(shard, first_row, passes)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards)), initializer=_init_prediction_worker,
+                                 initargs=(gnd_lat, gnd_long, gnd_alt)) as executor:
+            futures = {executor.submit(_predict_shard, shard, windows_tt): (shard, first_row)
+                       for shard, first_row in shards}
+            try:
+                for future in as_completed(futures):
+                    shard, first_row = futures[future]
+                    done += len(shard)
+                    yield done, len(candidates), merge_shard(shard, first_row, future.result())
+            finally:
+                # stopped early (error or consumer gave up) -> do not start the remaining shards
+                for future in futures:
+                    future.cancel()
+
+    # only reached if all shards were computed, a cancelled run leaves the cache untouched
+    if use_cache and windows_tt:
+        cached.add(windows_tt, np.concatenate(new_passes))
+        pass_cache.store(key, cached)
+
+
+def create_satellite_data_list(startTime:sky.Time, durationMin:int, ogs_flag:bool=False,
+                               workers:int=None) -> (list, SatelliteCatalog):
+    """ creates a list with satellite data and the catalog holding the TLE data of the satellites
 
-        # finally fill all data into list
-        #if rise_time_delta is not None and set_time_delta is not None:
-        satellite_data_list.append((name, noradID, f"{rise_time_delta:.2f} min", f"{flight_duration:.2f} min",
-                                    f"{sunlit_percentage:.2f} %", f"{height:.2f} km",
-                                    f"{maximum_elevation:.2f} °" if maximum_elevation != 0 else "----"
-                                    ))
+    :param startTime: skyfield Time object marking the beginning of observation time
+    :type startTime: skyfield.api.Time
+
+    :param durationMin: duration of watch window in minutes
+    :type durationMin: int
+
+    :param ogs_flag: flag indicating which source to use
+    :type ogs_flag: bool
+
+    :param workers: number of processes for the pass prediction, see iter_satellite_data
+    :type workers: int
+
+    :returns: Tuple with list of satellite-data and the satellite catalog
+                satellite-data is a tuple with
+                    0: name
+                    1: NoradID
+                    2: rise-time-delta to starting point in decimal minutes with resolution of seconds
+                    3: time visible in minutes with second resolution
+                    4: percentage of flight time in sunlight
+                    5: distance to earth surface in km
+                    6: maximum elevation in degree
+                satellite catalog:
+                    SatelliteCatalog of the source, catalog.tle_lines(NoradID) gives line0, line1, line2
+    :rtype: tuple
+    """
+    # compiled catalog, the TLE text files are only parsed again if they changed
+    catalog = load_TLE_catalog(ogs_flag)
+    print('Loaded', len(catalog), 'satellites')
+
+    rows = list()
+    for _, _, shard_rows in iter_satellite_data(catalog, startTime, durationMin, workers):
+        rows += shard_rows
+    # catalog order, independent of the number of workers and of the order the shards finished in
+    rows.sort(key=lambda item: item[0])
+    satellite_data_list = [sat_data for _, sat_data in rows]
 
-    return satellite_data_list, satellites_dict
+    return satellite_data_list, catalog
 
 
 if __name__ == "__main__":
-    ts = sky_load.timescale() # needed many times
+    ts = get_timescale() # needed many times
 
-    sat_data_list, sat_dict = create_satellite_data_list(ts.now(), durationMin=90, ogs_flag=True)
-    print(sat_dict)
+    sat_data_list, sat_catalog = create_satellite_data_list(ts.now(), durationMin=90, ogs_flag=True)
+    print(sat_catalog)
 
-    # create satellite objects
+    # create satellite objects from the catalog
     satellites = []
-    for sat_TLEs in sat_dict.values():
-        satellites.append(sky.EarthSatellite(sat_TLEs[1].rstrip("\n"), sat_TLEs[2].rstrip("\n"), sat_TLEs[0][2:], ts))
+    for row in range(len(sat_catalog)):
+        satellites.append(sky.EarthSatellite.from_satrec(sat_catalog.satrecs[row], ts))
 
     print('Loaded', len(satellites), 'satellites')
 
@@ -0,0 +1,209 @@
+import hashlib
+
+import numpy as np
+from sgp4.api import Satrec
+
+EARTH_RADIUS_KM = 6378.135  # wgs72, the earth model of sgp4
+MU_EARTH = 398600.8  # km^3/s^2, wgs72
+J2 = 0.001082616
+XKE = 60.0 / np.sqrt(EARTH_RADIUS_KM ** 3 / MU_EARTH)  # sqrt(mu) in earth radii^1.5 per minute
+
+# one row per TLE, angles in radians and mean motion in rad/min like sgp4 uses them
+CATALOG_DTYPE = np.dtype([('epoch', np.float64),  # julian date (UTC)
+                          ('inclination', np.float64),
+                          ('raan', np.float64),
+                          ('eccentricity', np.float64),
+                          ('arg_perigee', np.float64),
+                          ('mean_anomaly', np.float64),
+                          ('mean_motion', np.float64),
+                          ('bstar', np.float64),
+                          ('norad', np.int64),  # catalog number without classification
+                          ('name_idx', np.int64)])
+
+# boundaries of the orbit regimes in revolutions per day / eccentricity
+LEO_MIN_REV_PER_DAY = 11.25  # same boundary as the Space-Track LEO query
+GEO_REV_PER_DAY = (0.99, 1.01)
+HEO_MIN_ECCENTRICITY = 0.25
+ORBIT_REGIMES = ('LEO', 'MEO', 'GEO', 'HEO')
+
+
+class SatelliteCatalog:
+    """ Columnar satellite catalog
+
+    The elements live in one structured array (CATALOG_DTYPE), names are stored once and referenced by index and the
+    raw TLE lines are kept for the export. Slicing with a slice returns a sub-catalog made of views (no copy),
+    filtering with masks or index arrays returns a compact copy. The sgp4 models are only built when needed.
+    """
+
+    def __init__(self, elements, names, norad_ids, lines0, lines1, lines2, satrecs=None):
+        self.elements = elements
+        self._names = names  # unique names, indexed by elements['name_idx']
+        self.norad_ids = norad_ids  # NoradID as used by the GUI, e.g. '25544U'
+        self.lines0 = lines0
+        self.lines1 = lines1
+        self.lines2 = lines2
+        self._satrecs = satrecs
+        self._row_of = None
+
+    @classmethod
+    def from_arrays(cls, catalog:dict):
+        """ builds the catalog from the columnar arrays of tlecache.load_catalog
+
+        :param catalog: dict of arrays as returned by tlecache.load_catalog
+        :type catalog: dict
+
+        :rtype: SatelliteCatalog
+        """
+        elements = np.empty(len(catalog["line1"]), dtype=CATALOG_DTYPE)
+        elements['epoch'] = catalog["jdsatepoch"] + catalog["jdsatepochF"]
+        elements['inclination'] = catalog["inclo"]
+        elements['raan'] = catalog["nodeo"]
+        elements['eccentricity'] = catalog["ecco"]
+        elements['arg_perigee'] = catalog["argpo"]
+        elements['mean_anomaly'] = catalog["mo"]
+        elements['mean_motion'] = catalog["no_kozai"]
+        elements['bstar'] = catalog["bstar"]
+        elements['norad'] = [int(line1[2:7]) if line1[2:7].isdigit() else -1 for line1 in catalog["line1"]]
+        names, elements['name_idx'] = np.unique([line0[2:].strip() for line0 in catalog["line0"]],
+                                                return_inverse=True)
+        return cls(elements, names, catalog["norad_id"], catalog["line0"], catalog["line1"], catalog["line2"])
+
+    def __getstate__(self):
+        # sgp4 models and the NoradID lookup are rebuilt on demand, e.g. after sending a shard to a worker process
+        state = self.__dict__.copy()
+        state['_satrecs'] = None
+        state['_row_of'] = None
+        return state
+
+    def __len__(self):
+        return len(self.elements)
+
+    def __repr__(self):
+        return f"SatelliteCatalog({len(self)} satellites)"
+
+    def __getitem__(self, key):
+        """ sub-catalog, zero-copy for slices, copy for boolean masks and index arrays """
+        if isinstance(key, (int, np.integer)):
+            key = [key]
+        satrecs = None
+        if self._satrecs is not None:
+            satrecs = self._satrecs[key] if isinstance(key, slice) else [self._satrecs[i] for i in self._rows(key)]
+        return SatelliteCatalog(self.elements[key], self._names, self.norad_ids[key],
+                                self.lines0[key], self.lines1[key], self.lines2[key], satrecs)
+
+    def _rows(self, key):
+        return np.flatnonzero(key) if np.asarray(key).dtype == bool else np.asarray(key)
+
+    @property
+    def names(self):
+        """ satellite name of every row """
+        return self._names[self.elements['name_idx']]
+
+    def name(self, row:int) -> str:
+        return str(self._names[self.elements['name_idx'][row]])
+
+    @property
+    def satrecs(self) -> list:
+        """ sgp4 models of all rows, built once on first access """
+        if self._satrecs is None:
+            self._satrecs = [Satrec.twoline2rv(line1, line2) for line1, line2 in zip(self.lines1, self.lines2)]
+        return self._satrecs
+
+    def fingerprint(self) -> str:
+        """ sha1 of all TLE lines, changes whenever a single element set changes """
+        sha1 = hashlib.sha1()
+        for lines in (self.lines1, self.lines2):
+            sha1.update(np.ascontiguousarray(lines).tobytes())
+        return sha1.hexdigest()
+
+    # derived orbit quantities, vectorized over the whole catalog
+    @property
+    def rev_per_day(self):
+        return self.elements['mean_motion'] * 1440.0 / (2 * np.pi)
+
+    @property
+    def semi_major_axis_km(self):
+        """ semi-major axis from the un-Kozai (Brouwer) mean motion, identical to Satrec.a * radiusearthkm """
+        n_kozai = self.elements['mean_motion']
+        cos_i = np.cos(self.elements['inclination'])
+        beta = np.sqrt(1 - self.elements['eccentricity'] ** 2)
+        d1 = 0.75 * J2 * (3 * cos_i * cos_i - 1) / (beta * beta * beta)
+        ak = (XKE / n_kozai) ** (2 / 3)
+        delta = d1 / (ak * ak)
+        adel = ak * (1 - delta * delta - delta * (1 / 3 + 134 * delta * delta / 81))
+        n_unkozai = n_kozai / (1 + d1 / (adel * adel))
+        return (XKE / n_unkozai) ** (2 / 3) * EARTH_RADIUS_KM
+
+    @property
+    def perigee_km(self):
+        """ perigee altitude above the (spherical) earth """
+        return self.semi_major_axis_km * (1 - self.elements['eccentricity']) - EARTH_RADIUS_KM
+
+    @property
+    def apogee_km(self):
+        """ apogee altitude above the (spherical) earth """
+        return self.semi_major_axis_km * (1 + self.elements['eccentricity']) - EARTH_RADIUS_KM
+
+    def orbit_regime(self):
+        """ classifies every row as 'LEO', 'MEO', 'GEO' or 'HEO'
+
+        :rtype: numpy.ndarray of str
+        """
+        rev_per_day = self.rev_per_day
+        regime = np.full(len(self), 'MEO', dtype='<U3')
+        regime[rev_per_day >= LEO_MIN_REV_PER_DAY] = 'LEO'
+        regime[(rev_per_day >= GEO_REV_PER_DAY[0]) & (rev_per_day <= GEO_REV_PER_DAY[1])] = 'GEO'
+        regime[self.elements['eccentricity'] >= HEO_MIN_ECCENTRICITY] = 'HEO'
+        return regime
+
+    def filter_regime(self, *regimes):
+        """ sub-catalog with the rows of the given orbit regimes, see ORBIT_REGIMES
+
+        :rtype: SatelliteCatalog
+        """
+        return self[np.isin(self.orbit_regime(), regimes)]
+
+    def filter_altitude(self, min_km:float=0.0, max_km:float=np.inf):
+        """ sub-catalog of orbits that stay within the altitude band (perigee and apogee inside)
+
+        :rtype: SatelliteCatalog
+        """
+        return self[(self.perigee_km >= min_km) & (self.apogee_km <= max_km)]
+
+    def filter_norad(self, norad_ids):
+        """ sub-catalog of the given NoradIDs (e.g. '25544U') or catalog numbers (e.g. 25544)
+
+        :rtype: SatelliteCatalog
+        """
+        norad_ids = list(norad_ids)
+        if all(isinstance(norad_id, (int, np.integer)) for norad_id in norad_ids):
+            return self[np.isin(self.elements['norad'], norad_ids)]
+        return self[np.isin(self.norad_ids, [str(norad_id) for norad_id in norad_ids])]
+
+    def row_of(self, norad_id:str) -> int:
+        """ row of a NoradID, for duplicates the last entry wins (like the former TLE dict) """
+        if self._row_of is None:
+            self._row_of = {str(key): row for row, key in enumerate(self.norad_ids)}
+        return self._row_of[str(norad_id)]
+
+    def tle_lines(self, norad_id:str) -> tuple:
+        """ raw TLE of a NoradID
+
+        :returns: line0, line1, line2 as strings ending with a newline
+        :rtype: tuple
+        """
+        row = self.row_of(norad_id)
+        return self.lines0[row] + "\n", self.lines1[row] + "\n", self.lines2[row] + "\n"
+
+    def export_tle(self, file_path:str, norad_ids):
+        """ writes the TLEs of the given NoradIDs in 3-line format
+
+        :param file_path: target file
+        :type file_path: str
+
+        :param norad_ids: NoradIDs to export, in that order
+        :type norad_ids: iterable
+        """
+        with open(file_path, "w", encoding='utf-8') as f:
+            for norad_id in norad_ids:
+                f.writelines(self.tle_lines(norad_id))
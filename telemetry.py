@@ -0,0 +1,193 @@
+import threading
+import time
+
+import numpy as np
+
+from utils.configManager import TELEMETRY_RATE_HZ, TELEMETRY_BUFFER_S, TELEMETRY_STALE_PERIODS
+
+# one row per status request of the telescope
+TELEMETRY_DTYPE = np.dtype([('time', np.float64),  # unix time of the request (system clock)
+                            ('jd', np.float64),  # JulianDate of the mount
+                            ('ra', np.float64),  # deg, topocentric as reported by the mount
+                            ('de', np.float64),  # deg
+                            ('az', np.float64),  # deg, computed from ra/de
+                            ('el', np.float64),  # deg
+                            ('tel_status', np.int32),  # Status of GetTelStatus
+                            ('sat_status', np.int32),  # status of getSatStatus
+                            ('track_err_ax1', np.float64),  # mrad
+                            ('track_err_ax2', np.float64)])  # mrad
+
+
+class TelemetrySample:
+    """ one status request, the fields of TELEMETRY_DTYPE """
+    __slots__ = TELEMETRY_DTYPE.names
+
+    def __init__(self, time, jd, ra, de, az, el, tel_status, sat_status, track_err_ax1, track_err_ax2):
+        self.time = time
+        self.jd = jd
+        self.ra = ra
+        self.de = de
+        self.az = az
+        self.el = el
+        self.tel_status = tel_status
+        self.sat_status = sat_status
+        self.track_err_ax1 = track_err_ax1
+        self.track_err_ax2 = track_err_ax2
+
+    @classmethod
+    def from_telescope(cls, telescope, sample_time:float):
+        """ sample of the values of the last successful TelescopeWrapper.update_status """
+        return cls(sample_time, telescope.status_jd, telescope.RA_deg, telescope.DE_deg, telescope.AZ_deg,
+                   telescope.EL_deg, telescope.tel_status_bits, telescope.sat_status_bits,
+                   telescope.track_err_ax1, telescope.track_err_ax2)
+
+    def as_tuple(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    @property
+    def tracking_bit(self) -> int:
+        return self.sat_status & 0b1
+
+    @property
+    def slewing_bit(self) -> int:
+        return self.tel_status >> 2
+
+
+class TelemetryBuffer:
+    """ Ring buffer of the last capacity samples in a preallocated array of TELEMETRY_DTYPE
+
+    Appending overwrites the oldest row, nothing is allocated while sampling. Readers get copies, so they never see
+    a row that is written at the same time.
+    """
+
+    def __init__(self, capacity:int):
+        self.capacity = max(int(capacity), 1)
+        self._data = np.zeros(self.capacity, dtype=TELEMETRY_DTYPE)
+        self._count = 0 # samples appended since the start, the next row is _count % capacity
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def append(self, sample:TelemetrySample):
+        with self._lock:
+            self._data[self._count % self.capacity] = sample.as_tuple()
+            self._count += 1
+
+    def latest(self):
+        """ the newest sample, None if the buffer is empty
+
+        :rtype: TelemetrySample or None
+        """
+        with self._lock:
+            if self._count == 0:
+                return None
+            return TelemetrySample(*self._data[(self._count - 1) % self.capacity].tolist())
+
+    def to_array(self, since:float=None) -> np.ndarray:
+        """ copy of the samples in the buffer, oldest first
+
+        :param since: only samples taken after this unix time
+        :type since: float
+
+        :rtype: numpy.ndarray of TELEMETRY_DTYPE
+        """
+        with self._lock:
+            start = self._count % self.capacity
+            if self._count <= self.capacity:
+                samples = self._data[:self._count].copy()
+            else:
+                samples = np.concatenate((self._data[start:], self._data[:start]))
+        if since is not None:
+            samples = samples[np.searchsorted(samples['time'], since, side='right'):]
+        return samples
+
+    def clear(self):
+        with self._lock:
+            self._count = 0
+
+
+class TelemetrySampler:
+    """ Requests the status of the telescope at a fixed rate in a background thread
+
+    Every successful request is appended to the buffer and passed to the listeners (called in the sampler thread,
+    they should not block, an exception of a listener is printed and does not stop the sampling). The requests are
+    scheduled on a monotonic clock, a request that takes too long delays the next one but the rate is not made up for
+    afterwards. The GUI reads latest() or error instead of asking the telescope itself.
+    """
+
+    def __init__(self, telescope, rate_hz:float=TELEMETRY_RATE_HZ, buffer_s:float=TELEMETRY_BUFFER_S,
+                 listeners=None):
+        """
+        :param telescope: polled with update_status
+        :type telescope: tracking.TelescopeWrapper
+
+        :param rate_hz: status requests per second
+        :type rate_hz: float
+
+        :param buffer_s: time span the buffer holds at this rate
+        :type buffer_s: float
+
+        :param listeners: called with every TelemetrySample
+        :type listeners: list
+        """
+        self.telescope = telescope
+        self.period_s = 1.0 / rate_hz
+        self.buffer = TelemetryBuffer(int(np.ceil(rate_hz * buffer_s)))
+        self.listeners = list() if listeners is None else list(listeners)
+        self.error = None # message of the last failed request, None after a successful one
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def latest(self):
+        return self.buffer.latest()
+
+    def is_stale(self, since:float=None, periods:float=TELEMETRY_STALE_PERIODS) -> bool:
+        """ True if the sampler does not run or its newest sample is older than periods sampling periods
+
+        :param since: unix time from which on the age is counted if it is later than the newest sample, e.g. the start
+            of a track
+        :type since: float
+        """
+        if not self.running:
+            return True
+        sample = self.latest()
+        newest = max(sample.time if sample is not None else -np.inf, -np.inf if since is None else since)
+        return time.time() - newest > periods * self.period_s
+
+    def start(self):
+        """ starts sampling, does nothing if the sampler is running already """
+        if self.running:
+            return
+        self._stop_event.clear()
+        self.error = None
+        self._thread = threading.Thread(target=self._run, daemon=True, name="telemetry-sampler")
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self.running and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self):
+        next_request = time.monotonic()
+        while not self._stop_event.is_set():
+            sample_time = time.time()
+            err_msg = self.telescope.update_status()
+            if err_msg is not None:
+                self.error = err_msg
+            else:
+                self.error = None
+                sample = TelemetrySample.from_telescope(self.telescope, sample_time)
+                self.buffer.append(sample)
+                for listener in tuple(self.listeners): # listeners may be added or removed meanwhile
+                    try:
+                        listener(sample)
+                    except Exception as e:
+                        print(f"Telemetry listener {listener} failed: {str(e)}")
+            next_request = max(next_request + self.period_s, time.monotonic())
+            self._stop_event.wait(next_request - time.monotonic())
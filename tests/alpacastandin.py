@@ -0,0 +1,130 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+SAT_STATUS_TRACKING = 0b1  # bit of getSatStatus
+
+
+class AlpacaStandIn:
+    """ Alpaca telescope server with the actions and commands tracking.TelescopeWrapper uses, no mount needed
+
+    sat:ephlines replaces the ephemeris lines of the mount, sat:ephlinesappend appends to them (the contract of a
+    chunked upload, TELESCOPE_EPH_CHUNK_LINES > 0). sat:start starts "tracking", the status commands report it until
+    finish_track is called. Calls listed in fail_calls answer with HTTP 500, like a mount that drops a request.
+
+    Run it as a script to try the GUI without a mount: python tests/alpacastandin.py
+    """
+
+    def __init__(self, host:str="localhost", port:int=11111):
+        """
+        :param port: 0 -> any free port, see address
+        :type port: int
+        """
+        self.lines = list() # ephemeris lines of the "mount"
+        self.actions = list() # (action, number of lines) of every successful sat:ephlines* call, else (action, None)
+        self.fail_calls = set() # numbers of the action calls (1, 2, ...) that fail
+        self.action_calls = 0
+        self.tracking = False
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def address(self) -> str:
+        """ host:port for alpaca.telescope.Telescope, e.g. to patch tracking.TELESCOPE_ADDRESS """
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="alpaca-stand-in")
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def finish_track(self):
+        self.tracking = False
+
+    def _action(self, name:str, parameters:str):
+        # returns False if the call fails
+        with self._lock:
+            self.action_calls += 1
+            if self.action_calls in self.fail_calls:
+                return False
+            if name == "sat:ephlines":
+                self.lines = json.loads(parameters)
+                self.actions.append((name, len(self.lines)))
+            elif name == "sat:ephlinesappend":
+                lines = json.loads(parameters)
+                self.lines.extend(lines)
+                self.actions.append((name, len(lines)))
+            else:
+                self.actions.append((name, None))
+                if name == "sat:start":
+                    self.tracking = True
+            return True
+
+    def _command(self, command:str) -> str:
+        if command == "GetTelStatus":
+            return json.dumps({"JulianDate": 2461007.0, "RigthAscension": 180.0, "Declination": 45.0,
+                               "Status": 0, "ErrornumberAxis1": 0, "ErrornumberAxis2": 0})
+        if command == "getSatStatus":
+            return json.dumps({"status": SAT_STATUS_TRACKING if self.tracking else 0,
+                               "TrackErrAx1": 0.0, "TrackErrAx2": 0.0})
+        return ""
+
+    def _handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, value=""):
+                body = json.dumps({"Value": value, "ErrorNumber": 0, "ErrorMessage": "",
+                                   "ClientTransactionID": 0, "ServerTransactionID": 0}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_PUT(self):
+                data = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode(), keep_blank_values=True)
+                method = self.path.rstrip("/").rsplit("/", 1)[-1].lower()
+                if method == "action":
+                    if not stand_in._action(data["Action"][0], data.get("Parameters", [""])[0]):
+                        self.send_response(500)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    self._reply()
+                elif method == "commandstring":
+                    self._reply(stand_in._command(data["Command"][0]))
+                else:
+                    self._reply()
+
+            def do_GET(self):
+                method = self.path.split("?")[0].rstrip("/").rsplit("/", 1)[-1].lower()
+                self._reply({"interfaceversion": 3, "connecting": False}.get(method, True))
+
+        return Handler
+
+
+if __name__ == "__main__":
+    with AlpacaStandIn() as server:
+        print(f"Alpaca stand-in on {server.address}, Ctrl+C to stop")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+# the modules of the app are top level modules of the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TLES = """0 GAOFEN 14
+1 47231U 20092A   25330.46927271  .00011176  00000-0  44741-3 0  9990
+2 47231  97.2496  37.6914 0001169  99.0654 261.0717 15.25222443276926
+0 STARLINK-1614
+1 46124U 20057H   25330.25004630  .00166577  00000-0  21115-2 0  9998
+2 46124  53.0457 354.8885 0006734 312.2464 273.2089 15.58391219  5916
+"""
+
+
+@pytest.fixture(scope="session")
+def catalog(tmp_path_factory):
+    """ GAOFEN 14 and STARLINK-1614, both have a pass above 80 deg at the station on 2025-11-27 """
+    from satcatalog import SatelliteCatalog
+    from tlecache import build_catalog
+
+    tle_file = tmp_path_factory.mktemp("tle") / "high_passes.tle"
+    tle_file.write_text(TLES)
+    return SatelliteCatalog.from_arrays(build_catalog([str(tle_file)]))
+
+
+@pytest.fixture(scope="session")
+def station():
+    from skyfield.api import wgs84
+
+    return wgs84.latlon(48.181927150599996, 16.396529607155557, 242.5827)
@@ -0,0 +1,171 @@
+import itertools
+import threading
+
+
+class FakeEngineError(Exception):
+    """ raised by a fake engine where FreeFlyer would raise a RuntimeApiException """
+
+
+class FakeEngine:
+    """ Stand-in for RuntimeApiEngine with the methods freeflyer.py calls, no FreeFlyer needed
+
+    The mission plan is not interpreted, the engine only remembers the expressions set and the satellites it
+    "propagated". executeRemainingStatements raises for the satellites the factory was told to fail. The *Async calls
+    are queued and worked off by synchronize, like the real engine reports the error of a queued call there.
+    """
+
+    def __init__(self, factory, number:int):
+        self.factory = factory
+        self.number = number
+        self.expressions = dict()
+        self.satellites = list() # SpaceCraftName of every executeRemainingStatements that succeeded
+        self.destroyed = 0
+        self.killed = 0
+        self._queue = list() # queued async calls
+        self._sync_points = itertools.count(1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.destroyEngine()
+
+    def __repr__(self):
+        return f"FakeEngine({self.number})"
+
+    def _check(self):
+        if self.destroyed:
+            raise RuntimeError("A closed engine cannot be used")
+
+    def destroyEngine(self):
+        self._check()
+        self.destroyed += 1
+
+    def killEngine(self):
+        self.killed += 1
+
+    def isEngineIdle(self):
+        self._check()
+        return len(self._queue) == 0
+
+    # synchronous calls
+    def loadMissionPlanFromFile(self, path):
+        self._check()
+        self.expressions = {"MissionPlan": path}
+
+    def prepareMissionPlan(self):
+        self._check()
+
+    def executeUntilApiLabel(self, label):
+        self._check()
+
+    def setExpressionString(self, name, value):
+        self._check()
+        self.expressions[name] = value
+
+    def assignExpression(self, name, value):
+        self._check()
+        self.expressions[name] = value
+
+    def executeRemainingStatements(self):
+        self._check()
+        sat_name = self.expressions.get("SpaceCraftName")
+        self.factory.executions.append((self.number, sat_name))
+        if self.factory.should_fail(self, sat_name):
+            raise FakeEngineError(f"{sat_name} failed on engine {self.number}")
+        self.satellites.append(sat_name)
+
+    def cleanupMissionPlan(self):
+        self._check()
+
+    # asynchronous calls, the errors are reported by synchronize
+    def _queue_call(self, method, *args):
+        self._check()
+        if self.number in self.factory.dead_engines:
+            raise FakeEngineError(f"engine {self.number} does not respond")
+        self._queue.append((method, args))
+
+    def loadMissionPlanFromFileAsync(self, path):
+        self._queue_call(self.loadMissionPlanFromFile, path)
+
+    def prepareMissionPlanAsync(self):
+        self._queue_call(self.prepareMissionPlan)
+
+    def executeUntilApiLabelAsync(self, label):
+        self._queue_call(self.executeUntilApiLabel, label)
+
+    def setExpressionStringAsync(self, name, value):
+        self._queue_call(self.setExpressionString, name, value)
+
+    def assignExpressionAsync(self, name, value):
+        self._queue_call(self.assignExpression, name, value)
+
+    def executeRemainingStatementsAsync(self):
+        self._queue_call(self.executeRemainingStatements)
+
+    def cleanupMissionPlanAsync(self):
+        self._queue_call(self.cleanupMissionPlan)
+
+    def setSyncPointAsync(self):
+        self._check()
+        sync_point = next(self._sync_points)
+        self._queue.append((None, (sync_point,)))
+        return sync_point
+
+    def waitForAllSyncPointsAsync(self, sync_points):
+        self._check()
+        self.factory.waited.append((self.number, list(sync_points)))
+
+    def synchronize(self, timeout):
+        """ works off the queue, True if it is empty afterwards (the fake never times out) """
+        self._check()
+        self.factory.synchronize_calls += 1
+        while self._queue:
+            method, args = self._queue.pop(0)
+            if method is None:
+                continue # sync point
+            try:
+                method(*args)
+            except Exception:
+                self._queue.clear() # FreeFlyer drops the rest of the queue of a failed call
+                raise
+        return True
+
+
+class FakeEngineFactory:
+    """ engine_factory for EnginePool and MissionPlanRunner, keeps every engine it created
+
+    :param fail: satellite names whose execution raises, a name listed n times fails n times
+    :type fail: list
+
+    :param creation_limit: engines that can be created before the factory raises (e.g. a failing restart)
+    :type creation_limit: int
+
+    :param dead_engines: numbers of the engines whose *Async calls raise right away, like a crashed engine
+    :type dead_engines: list
+    """
+
+    def __init__(self, fail=(), creation_limit:int=None, dead_engines=()):
+        self.fail = list(fail)
+        self.creation_limit = creation_limit
+        self.dead_engines = set(dead_engines)
+        self.engines = list()
+        self.executions = list() # (engine number, satellite) of every execution, failed ones included
+        self.waited = list() # (engine number, sync points) of every waitForAllSyncPointsAsync
+        self.synchronize_calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            if self.creation_limit is not None and len(self.engines) >= self.creation_limit:
+                raise FakeEngineError("no more FreeFlyer licenses")
+            engine = FakeEngine(self, len(self.engines))
+            self.engines.append(engine)
+            return engine
+
+    def should_fail(self, engine, sat_name) -> bool:
+        with self._lock:
+            if sat_name in self.fail:
+                self.fail.remove(sat_name)
+                return True
+            return False
@@ -0,0 +1,79 @@
+import asyncio
+
+import freeflyer
+from freeflyer import MissionPlanRunner
+from fakeengine import FakeEngineFactory
+
+SATELLITES = [f"SAT-{index}" for index in range(7)]
+
+
+def run_async(factory, engines):
+    runner = MissionPlanRunner(engine_factory=factory)
+    results = asyncio.run(runner.run_SGP4_EPH_plan_async(30, "Nov 27 2025 10:57:00", engines=engines))
+    return runner, results
+
+
+def test_all_satellites_are_run_and_waited_for_by_sync_point(monkeypatch):
+    monkeypatch.setattr(freeflyer, "read_export_names", lambda: SATELLITES)
+    factory = FakeEngineFactory()
+    runner, results = run_async(factory, engines=3)
+
+    assert runner.missionplan_success_flag is True
+    assert runner.error_msg is None
+    assert sorted(results) == SATELLITES
+    assert sorted(sat for engine in factory.engines for sat in engine.satellites) == SATELLITES
+    # one wait per satellite, on the sync point queued after its sequence
+    assert len(factory.waited) == len(SATELLITES)
+    assert all(len(sync_points) == 1 for _, sync_points in factory.waited)
+    assert all(engine.destroyed == 1 for engine in factory.engines)
+
+
+def test_failed_satellite_replaces_the_engine(monkeypatch):
+    monkeypatch.setattr(freeflyer, "read_export_names", lambda: SATELLITES)
+    factory = FakeEngineFactory(fail=["SAT-3"])
+    runner, results = run_async(factory, engines=2)
+
+    assert runner.missionplan_success_flag is False
+    assert runner.error_msg.startswith("SAT-3: SAT-3 failed on engine ")
+    assert results["SAT-3"][0] is None
+    assert all(results[sat][1] is None for sat in SATELLITES if sat != "SAT-3")
+    assert len(factory.engines) == 3
+    failed_engine = next(engine for engine in factory.engines if engine.killed)
+    assert failed_engine.destroyed == 1
+    assert all(engine.destroyed == 1 for engine in factory.engines)
+
+
+def test_engine_that_can_not_be_restarted(monkeypatch):
+    monkeypatch.setattr(freeflyer, "read_export_names", lambda: SATELLITES)
+    factory = FakeEngineFactory(fail=["SAT-0"], creation_limit=1)
+    runner, results = run_async(factory, engines=1)
+
+    assert runner.missionplan_success_flag is False
+    assert results["SAT-0"][1] == "SAT-0 failed on engine 0"
+    assert all(results[sat] == (None, "No FreeFlyer engine left") for sat in SATELLITES[1:])
+    assert factory.engines[0].destroyed == 1
+
+
+def test_engines_can_not_be_created(monkeypatch):
+    monkeypatch.setattr(freeflyer, "read_export_names", lambda: SATELLITES)
+    factory = FakeEngineFactory(creation_limit=1)
+    runner, results = run_async(factory, engines=2)
+
+    assert runner.missionplan_success_flag is False
+    assert runner.error_msg == "no more FreeFlyer licenses"
+    assert results == dict()
+    assert factory.engines[0].destroyed == 1
+
+
+def test_engine_failing_while_queueing_is_replaced(monkeypatch):
+    monkeypatch.setattr(freeflyer, "read_export_names", lambda: SATELLITES)
+    factory = FakeEngineFactory(dead_engines=[0])
+    runner, results = run_async(factory, engines=2)
+
+    assert runner.missionplan_success_flag is False
+    assert runner.error_msg == "SAT-0: engine 0 does not respond"
+    assert all(results[sat][1] is None for sat in SATELLITES[1:])
+    assert sorted(sat for engine in factory.engines for sat in engine.satellites) == SATELLITES[1:]
+    assert len(factory.engines) == 3
+    assert factory.engines[0].killed == 1
+    assert all(engine.destroyed == 1 for engine in factory.engines)
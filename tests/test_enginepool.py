@@ -0,0 +1,145 @@
+import threading
+import time
+
+import freeflyer
+from freeflyer import EnginePool, MissionPlanRunner
+from fakeengine import FakeEngineFactory
+
+SATELLITES = [f"SAT-{index}" for index in range(9)]
+
+
+def run_satellite(engine, sat_name):
+    engine.setExpressionString("SpaceCraftName", sat_name)
+    engine.executeRemainingStatements()
+    time.sleep(0.01) # long enough for the other engines to get work as well
+    return engine.number
+
+
+def test_items_are_distributed_over_all_engines():
+    factory = FakeEngineFactory()
+    with EnginePool(factory, size=3, retries=0) as pool:
+        results = pool.map(run_satellite, SATELLITES)
+
+    assert [item for item, _, _ in results] == SATELLITES
+    assert all(error_msg is None for _, _, error_msg in results)
+    assert {engine_number for _, engine_number, _ in results} == {0, 1, 2}
+    assert sorted(sat for engine in factory.engines for sat in engine.satellites) == SATELLITES
+    assert [engine.destroyed for engine in factory.engines] == [1, 1, 1]
+
+
+def test_engines_are_not_shared_between_running_tasks():
+    factory = FakeEngineFactory()
+    busy = set()
+    lock = threading.Lock()
+
+    def task(engine, item):
+        with lock:
+            assert engine.number not in busy
+            busy.add(engine.number)
+        time.sleep(0.01)
+        with lock:
+            busy.remove(engine.number)
+
+    with EnginePool(factory, size=2, retries=0) as pool:
+        results = pool.map(task, range(8))
+    assert all(error_msg is None for _, _, error_msg in results)
+
+
+def test_failed_engine_is_restarted_and_item_retried():
+    factory = FakeEngineFactory(fail=["SAT-4"])
+    with EnginePool(factory, size=2, retries=1) as pool:
+        results = pool.map(run_satellite, SATELLITES)
+
+    assert all(error_msg is None for _, _, error_msg in results)
+    assert len(factory.engines) == 3 # one replacement
+    failed_engine = next(engine for engine in factory.engines if engine.killed)
+    assert failed_engine.destroyed == 1
+    assert [sat for engine_number, sat in factory.executions].count("SAT-4") == 2
+    assert all(engine.destroyed == 1 for engine in factory.engines)
+
+
+def test_last_attempt_does_not_restart_the_engine():
+    factory = FakeEngineFactory(fail=["SAT-0", "SAT-0"])
+    with EnginePool(factory, size=1, retries=1) as pool:
+        results = pool.map(run_satellite, ["SAT-0"])
+        # the failed engine stays in the pool until a task needs it
+        assert len(factory.engines) == 2
+    assert results[0][2] == "SAT-0 failed on engine 1"
+    assert factory.engines[1].killed == 1 and factory.engines[1].destroyed == 1
+
+
+def test_failed_engine_is_replaced_before_the_next_task():
+    factory = FakeEngineFactory(fail=["SAT-0"])
+    with EnginePool(factory, size=1, retries=0) as pool:
+        results = pool.map(run_satellite, ["SAT-0", "SAT-1"])
+    assert results[0][2] == "SAT-0 failed on engine 0"
+    assert results[1][1:] == (1, None)
+
+
+def test_engine_that_can_not_be_restarted_is_dropped():
+    factory = FakeEngineFactory(fail=["SAT-0"], creation_limit=2)
+    with EnginePool(factory, size=2, retries=1) as pool:
+        results = pool.map(run_satellite, SATELLITES)
+        assert pool.size == 1
+
+    assert results[0][2] == "SAT-0 failed on engine 0"
+    assert all(error_msg is None for _, _, error_msg in results[1:])
+    # the dead engine is never used again and destroyed exactly once
+    assert factory.engines[0].destroyed == 1
+    assert all(engine_number == 1 for _, engine_number, _ in results[1:])
+    assert factory.engines[1].destroyed == 1
+
+
+def test_items_fail_when_no_engine_is_left():
+    factory = FakeEngineFactory(fail=["SAT-0"], creation_limit=1)
+    with EnginePool(factory, size=1, retries=1) as pool:
+        results = pool.map(run_satellite, SATELLITES[:3])
+        assert pool.size == 0
+    assert [error_msg for _, _, error_msg in results] == ["SAT-0 failed on engine 0", "No FreeFlyer engine left",
+                                                          "No FreeFlyer engine left"]
+    assert factory.engines[0].destroyed == 1
+
+
+def test_pool_creation_failure_destroys_the_created_engines():
+    factory = FakeEngineFactory(creation_limit=2)
+    try:
+        EnginePool(factory, size=3)
+    except Exception as e:
+        assert str(e) == "no more FreeFlyer licenses"
+    else:
+        assert False, "pool without engines"
+    assert [engine.destroyed for engine in factory.engines] == [1, 1]
+
+
+def test_parallel_runner_aggregates_results(monkeypatch):
+    monkeypatch.setattr(freeflyer, "read_export_names", lambda: SATELLITES)
+    factory = FakeEngineFactory(fail=["SAT-2"] * (freeflyer.FREEFLYER_ENGINE_RETRIES + 1)) # fails on every attempt
+    runner = MissionPlanRunner(engine_factory=factory)
+    runner.run_SGP4_EPH_plan_parallel(30, "Nov 27 2025 10:57:00", engines=3)
+
+    assert runner.missionplan_success_flag is False
+    assert runner.error_msg.startswith("SAT-2: SAT-2 failed on engine ")
+    assert len(runner.error_msg.splitlines()) == 1
+    ok = [sat for sat in SATELLITES if sat != "SAT-2"]
+    assert [sat_name for sat_name, _ in runner.satellite_timings] == ok
+    assert sorted(sat for engine in factory.engines for sat in engine.satellites) == ok
+    assert all(engine.expressions["startTime_String"] == "Nov 27 2025 10:57:00" for engine in factory.engines
+               if engine.satellites)
+    assert all(engine.destroyed == 1 for engine in factory.engines)
+
+
+def test_parallel_runner_success(monkeypatch):
+    monkeypatch.setattr(freeflyer, "read_export_names", lambda: SATELLITES)
+    runner = MissionPlanRunner(engine_factory=FakeEngineFactory())
+    runner.run_SGP4_EPH_plan_parallel(30, "Nov 27 2025 10:57:00", engines=4)
+    assert runner.missionplan_success_flag is True
+    assert runner.error_msg is None
+    assert len(runner.satellite_timings) == len(SATELLITES)
+
+
+def test_parallel_runner_without_engines(monkeypatch):
+    monkeypatch.setattr(freeflyer, "read_export_names", lambda: SATELLITES)
+    runner = MissionPlanRunner(engine_factory=FakeEngineFactory(creation_limit=0))
+    runner.run_SGP4_EPH_plan_parallel(30, "Nov 27 2025 10:57:00", engines=2)
+    assert runner.missionplan_success_flag is False
+    assert runner.error_msg == "no more FreeFlyer licenses"
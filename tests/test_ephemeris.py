@@ -0,0 +1,54 @@
+import numpy as np
+from sgp4.api import SatrecArray
+from skyfield.sgp4lib import TEME
+
+from ephemeris import ARCSEC, DAY_S, _ra_dec, compute_ephemerides, thin_states
+from ephemerisinterpolator import EphemerisInterpolator
+from passprediction import TimeGrid
+from utils.skyfieldProvider import get_timescale
+
+RATE_CHECK_STEP_S = 0.5  # half the time between the two positions of the finite difference
+PASS_START = (2025, 11, 27, 20, 29)  # GAOFEN 14, culminates above 80 deg
+PASS_MINUTES = 8
+
+
+def _ra_dec_at(satrecs, t0, offsets_s):
+    """ RA/DE and their rates of all satrecs at t0 + offsets_s, arrays are (satellite, offset) """
+    ts = get_timescale()
+    grid = TimeGrid(t0, np.asarray(offsets_s, dtype=np.float64) / DAY_S)
+    _, r_teme, v_teme = SatrecArray(list(satrecs)).sgp4(np.full(len(grid), grid.jd), grid.fr_utc)
+    return _ra_dec(r_teme, v_teme, TEME.rotation_at(ts.tt_jd(grid.tt)))
+
+
+def test_rates_match_finite_differences(catalog):
+    offsets = np.arange(0, 90 * 60, 10.0)
+    start_time = get_timescale().utc(*PASS_START)
+    _, de, vra, vde = _ra_dec_at(catalog.satrecs, start_time, offsets)
+    ra_before, de_before, _, _ = _ra_dec_at(catalog.satrecs, start_time, offsets - RATE_CHECK_STEP_S)
+    ra_after, de_after, _, _ = _ra_dec_at(catalog.satrecs, start_time, offsets + RATE_CHECK_STEP_S)
+    d_ra = (ra_after - ra_before + np.pi) % (2 * np.pi) - np.pi  # RA may wrap around between the two epochs
+    vra_fd = d_ra / (2 * RATE_CHECK_STEP_S) * np.cos(de) / ARCSEC
+    vde_fd = (de_after - de_before) / (2 * RATE_CHECK_STEP_S) / ARCSEC
+    assert np.abs(vra - vra_fd).max() < 0.05
+    assert np.abs(vde - vde_fd).max() < 0.05
+
+
+def test_thinning_with_rates_stays_within_tolerance(catalog, station):
+    start_time = get_timescale().utc(*PASS_START)
+    truth = compute_ephemerides(catalog, ["47231U"], station, start_time, PASS_MINUTES, step_s=1,
+                                tolerance_arcsec=0)[0][1]
+    for tolerance_arcsec in (0.5, 5.0):
+        kept, max_error = thin_states(truth, tolerance_arcsec)
+        without_rates = truth.copy()
+        without_rates[:, 3:5] = 0.0  # like the files of FreeFlyer, checked with linear interpolation
+        assert len(kept) < len(thin_states(without_rates, tolerance_arcsec)[0]) / 3
+        assert max_error <= tolerance_arcsec
+
+        # the dropped rows are reproduced by the interpolator of the tracking
+        ra, de, az, el = EphemerisInterpolator(kept)(truth[:, 0])
+        cos_angle = (np.sin(de) * np.sin(truth[:, 2]) +
+                     np.cos(de) * np.cos(truth[:, 2]) * np.cos(ra - truth[:, 1]))
+        assert np.degrees(np.arccos(np.clip(cos_angle, -1, 1))).max() * 3600 <= tolerance_arcsec * 1.01
+        cos_angle = (np.sin(np.radians(el)) * np.sin(np.radians(truth[:, 6])) + np.cos(np.radians(el)) *
+                     np.cos(np.radians(truth[:, 6])) * np.cos(np.radians(az - truth[:, 5])))
+        assert np.degrees(np.arccos(np.clip(cos_angle, -1, 1))).max() * 3600 <= tolerance_arcsec * 1.01
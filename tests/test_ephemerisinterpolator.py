@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from ephemeris import ARCSEC, compute_ephemerides
+from ephemerisinterpolator import EphemerisInterpolator
+from utils.skyfieldProvider import get_timescale
+
+# (norad id, pass start UTC, minutes), both culminate above 80 deg
+PASSES = [("47231U", (2025, 11, 27, 20, 29), 8),
+          ("46124U", (2025, 11, 27, 21, 18), 6)]
+
+
+@pytest.mark.parametrize("norad_id, start, minutes", PASSES)
+def test_high_pass_matches_fine_sgp4(catalog, station, norad_id, start, minutes):
+    start_time = get_timescale().utc(*start)
+    lines = compute_ephemerides(catalog, [norad_id], station, start_time, minutes, step_s=3, tolerance_arcsec=0)[0][1]
+    truth = compute_ephemerides(catalog, [norad_id], station, start_time, minutes, step_s=0.25,
+                                tolerance_arcsec=0)[0][1]
+    assert truth[:, 6].max() > 80
+
+    interpolator = EphemerisInterpolator(lines)
+    ra, de, az, el = interpolator(truth[:, 0])
+    inside = ~np.isnan(ra)
+    assert inside.sum() > 0.9 * len(truth)
+    truth = truth[inside]
+
+    # RA/DE as angle between the directions
+    cos_angle = (np.sin(de[inside]) * np.sin(truth[:, 2]) +
+                 np.cos(de[inside]) * np.cos(truth[:, 2]) * np.cos(ra[inside] - truth[:, 1]))
+    assert np.degrees(np.arccos(np.clip(cos_angle, -1, 1))).max() * 3600 < 0.05
+    azimuth_error = ((az[inside] - truth[:, 5] + 180) % 360 - 180) * np.cos(np.radians(truth[:, 6])) * 3600
+    assert np.abs(azimuth_error).max() < 0.5
+    assert np.abs(el[inside] - truth[:, 6]).max() * 3600 < 0.5
+
+
+def test_without_rates_and_outside_passes(catalog, station):
+    start_time = get_timescale().utc(*PASSES[0][1])
+    lines = compute_ephemerides(catalog, ["47231U"], station, start_time, 8, step_s=3, tolerance_arcsec=0)[0][1]
+    no_rates = lines.copy()
+    no_rates[:, 3:5] = 0.0 # like the files of FreeFlyer
+    middle = lines[len(lines) // 2, 0] + 1.5 / 86400
+    with_rates = EphemerisInterpolator(lines)(middle)
+    without = EphemerisInterpolator(no_rates)(middle)
+    assert abs(with_rates[0][0] - without[0][0]) < 0.01 * ARCSEC
+    assert np.isnan(EphemerisInterpolator(lines)(lines[-1, 0] + 0.01)[0][0])
@@ -0,0 +1,21 @@
+import pytest
+
+import passcache
+from passcache import cache_key
+
+KEY_ARGUMENTS = ("fingerprint", 48.181927150599996, 16.396529607155557, 242.5827, 26.0, False)
+
+
+def test_key_depends_on_station_and_mask():
+    assert cache_key(*KEY_ARGUMENTS) == cache_key(*KEY_ARGUMENTS)
+    assert cache_key(*KEY_ARGUMENTS[:4], 20.0, False) != cache_key(*KEY_ARGUMENTS)
+    assert cache_key(*KEY_ARGUMENTS[:5], True) != cache_key(*KEY_ARGUMENTS)
+
+
+@pytest.mark.parametrize("setting", ["COARSE_STEP_S", "FINE_STEP_S", "SUNLIT_STEP_S", "SUNLIT_BRACKET_S",
+                                     "SUNLIT_TOLERANCE_S", "PREFILTER_MARGIN_RAD", "GEO_MAX_ECCENTRICITY",
+                                     "GEO_DRIFT_UNCERTAINTY_RAD_PER_DAY"])
+def test_key_depends_on_prediction_settings(monkeypatch, setting):
+    key = cache_key(*KEY_ARGUMENTS)
+    monkeypatch.setattr(passcache, setting, getattr(passcache, setting) * 2)
+    assert cache_key(*KEY_ARGUMENTS) != key
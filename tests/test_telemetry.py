@@ -0,0 +1,60 @@
+import time
+
+from telemetry import TelemetrySampler
+
+
+class FakeTelescope:
+    """ the attributes of tracking.TelescopeWrapper the sampler reads, every update_status succeeds """
+
+    def __init__(self):
+        self.status_jd, self.RA_deg, self.DE_deg, self.AZ_deg, self.EL_deg = 2461007.0, 180.0, 45.0, 90.0, 30.0
+        self.tel_status_bits, self.sat_status_bits = 0, 1
+        self.track_err_ax1, self.track_err_ax2 = 0.0, 0.0
+        self.blocked = False # update_status hangs, like a mount that does not answer
+
+    def update_status(self):
+        while self.blocked:
+            time.sleep(0.01)
+        return None
+
+
+def _wait_for(condition, timeout_s:float=2.0):
+    deadline = time.monotonic() + timeout_s
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_failing_listener_does_not_stop_sampling():
+    received = list()
+
+    def failing(sample):
+        raise ValueError("disk full")
+
+    sampler = TelemetrySampler(FakeTelescope(), rate_hz=100, buffer_s=1, listeners=[failing, received.append])
+    sampler.start()
+    try:
+        assert _wait_for(lambda: len(received) >= 5)
+        assert sampler.running
+    finally:
+        sampler.stop()
+
+
+def test_stale_when_stopped_or_without_new_samples():
+    telescope = FakeTelescope()
+    sampler = TelemetrySampler(telescope, rate_hz=100, buffer_s=1)
+    assert sampler.is_stale()
+    sampler.start()
+    try:
+        assert _wait_for(lambda: sampler.latest() is not None)
+        assert not sampler.is_stale(periods=10)
+        telescope.blocked = True
+        assert _wait_for(lambda: sampler.is_stale(periods=10))
+        telescope.blocked = False
+        assert _wait_for(lambda: not sampler.is_stale(periods=10))
+        # counted from since if the newest sample is older
+        assert not sampler.is_stale(since=time.time() + 60, periods=10)
+    finally:
+        telescope.blocked = False
+        sampler.stop()
+    assert sampler.is_stale()
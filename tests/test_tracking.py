@@ -0,0 +1,161 @@
+import time
+
+import numpy as np
+import pytest
+from skyfield.api import wgs84
+from skyfield.positionlib import build_position
+
+import tracking
+from alpacastandin import AlpacaStandIn
+from tracking import TelescopeWrapper, TrackScheduler, encode_eph_chunks, LST_MODEL_SPAN_DAYS, UNIX_EPOCH_MJD
+from utils.skyfieldProvider import get_timescale
+
+STATION = (48.181927150599996, 16.396529607155557, 242.5827)
+LINES = [f"{61006.5 + i / 86400:.8f} 1.0 0.5 0.0 0.0 180.0 45.0\n" for i in range(10)]
+
+
+@pytest.fixture
+def mount(monkeypatch):
+    with AlpacaStandIn(port=0) as server:
+        monkeypatch.setattr(tracking, "TELESCOPE_ADDRESS", server.address)
+        yield server
+
+
+@pytest.fixture
+def telescope(mount):
+    telescope = TelescopeWrapper()
+    assert telescope.connect_telescope() is None
+    return telescope
+
+
+def test_chunks_replace_then_append(mount, telescope):
+    progress = list()
+    chunks = encode_eph_chunks(LINES, 4)
+    assert telescope.start_track(chunks=chunks, progress=lambda sent, total: progress.append((sent, total))) is None
+    assert mount.actions[:3] == [("sat:ephlines", 4), ("sat:ephlinesappend", 4), ("sat:ephlinesappend", 2)]
+    assert [name for name, _ in mount.actions[3:]] == ["sat:startalt", "sat:start"]
+    assert mount.lines == [line.rstrip("\n") for line in LINES]
+    assert progress == [(4, 10), (8, 10), (10, 10)]
+    assert telescope.tracking_flag
+
+    # a second upload replaces the lines of the first one
+    telescope.tracking_flag = False
+    assert telescope.start_track(lines=LINES[:3]) is None
+    assert mount.lines == [line.rstrip("\n") for line in LINES[:3]]
+
+
+def test_failed_chunk_is_retried(mount, telescope):
+    mount.fail_calls = {2} # first attempt of the second chunk
+    assert telescope.start_track(chunks=encode_eph_chunks(LINES, 4)) is None
+    assert mount.lines == [line.rstrip("\n") for line in LINES]
+
+
+def test_failed_upload_resumes_at_the_failed_chunk(mount, telescope):
+    chunks = encode_eph_chunks(LINES, 4)
+    mount.fail_calls = {2 + attempt for attempt in range(tracking.TELESCOPE_UPLOAD_RETRIES + 1)}
+    err_msg = telescope.start_track(chunks=chunks)
+    assert err_msg.startswith("Ephemeris upload failed at chunk 2 of 3")
+    assert not telescope.tracking_flag
+    assert mount.lines == [line.rstrip("\n") for line in LINES[:4]]
+
+    progress = list()
+    assert telescope.start_track(chunks=encode_eph_chunks(LINES, 4),
+                                 progress=lambda sent, total: progress.append(sent)) is None
+    assert [name for name, _ in mount.actions[:3]] == ["sat:ephlines", "sat:ephlinesappend", "sat:ephlinesappend"]
+    assert mount.lines == [line.rstrip("\n") for line in LINES]
+    assert progress == [8, 10]
+
+
+def test_status_follows_the_track(mount, telescope):
+    assert telescope.update_status() is None
+    assert telescope.tracking_bit == 0
+    assert telescope.start_track(lines=LINES) is None
+    assert telescope.update_status() is None
+    assert telescope.tracking_bit == 1
+    mount.finish_track()
+    assert telescope.update_status() is None
+    assert telescope.tracking_bit == 0
+
+
+def test_no_second_start_during_an_upload(mount, telescope):
+    err_msgs = list()
+    progress = lambda sent, total: err_msgs.append(telescope.start_track(lines=LINES[:2]))
+    assert telescope.start_track(chunks=encode_eph_chunks(LINES, 4), progress=progress) is None
+    assert err_msgs == ["Ephemeris upload is ongoing! Cannot start a new track!"] * 3
+    assert mount.lines == [line.rstrip("\n") for line in LINES]
+
+
+def _pass_lines(start_min:float, minutes:float=5) -> list:
+    """ .eph lines every 10 s of a pass starting start_min minutes from now (negative: in the past) """
+    first = time.time() / 86400.0 + UNIX_EPOCH_MJD + start_min / 1440.0
+    return [f"{first + step * 10 / 86400:.8f} 1.0 0.5 0.0 0.0 180.0 45.0\n" for step in range(int(minutes * 6) + 1)]
+
+
+def _wait_for(condition, timeout_s:float=5.0):
+    deadline = time.monotonic() + timeout_s
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_scheduler_starts_passes_in_start_order(mount, telescope):
+    started, errors = list(), list()
+    scheduler = TrackScheduler(telescope, on_start=started.append, on_error=errors.append, poll_s=0.01)
+    passes = {"later": _pass_lines(60), "earlier": _pass_lines(30), "over": _pass_lines(-30, 5)}
+    futures = [scheduler.add(lines=lines, name=name) for name, lines in passes.items()]
+    for future in futures:
+        future.result(timeout=5)
+    assert scheduler.names == ["over", "earlier", "later"]
+
+    scheduler.start()
+    try:
+        assert _wait_for(lambda: started == ["earlier"])
+        assert errors == ["over skipped, the pass is already over"]
+        assert mount.lines == [line.rstrip("\n") for line in passes["earlier"]]
+        time.sleep(0.1)
+        assert started == ["earlier"] # waits for the end of the current track
+
+        telescope.tracking_flag = False # cleared by whoever follows the track, e.g. APP._follow_track
+        assert _wait_for(lambda: started == ["earlier", "later"])
+        assert mount.lines == [line.rstrip("\n") for line in passes["later"]]
+        assert len(scheduler) == 0
+    finally:
+        scheduler.stop()
+
+
+def _angle_arcsec(az1, el1, az2, el2):
+    # atan2 instead of arccos, which resolves only ~0.003 arcsec
+    u, v = ([np.cos(el) * np.cos(az), np.cos(el) * np.sin(az), np.sin(el)]
+            for az, el in ((np.radians(az1), np.radians(el1)), (np.radians(az2), np.radians(el2))))
+    u, v = np.array(u), np.array(v)
+    return np.degrees(np.arctan2(np.linalg.norm(np.cross(u, v, axis=0), axis=0), np.sum(u * v, axis=0))) * 3600
+
+
+def test_radec_to_azel_matches_skyfield_across_model_refits(monkeypatch):
+    monkeypatch.setattr(tracking, "load_StationLatLongAlt", lambda: STATION)
+    telescope = TelescopeWrapper()
+    station = wgs84.latlon(*STATION)
+    ts = get_timescale()
+    # RA/DE of date of a grid over the sky
+    ra, de = (np.radians(angle).ravel() for angle in np.meshgrid(np.arange(0, 360, 30.0), np.arange(-30, 90, 10.0)))
+    direction_of_date = np.array([np.cos(de) * np.cos(ra), np.cos(de) * np.sin(ra), np.sin(de)])
+
+    jd_first = ts.utc(2025, 11, 27, 18).tt
+    models = set()
+    for jd in jd_first + np.arange(0, 2.5 * LST_MODEL_SPAN_DAYS, 0.05):
+        t = ts.tt_jd(jd)
+        elevation, azimuth, _ = build_position(t.M.T @ direction_of_date, center=station, t=t).altaz()
+        above = elevation.degrees > 0
+        az, el = telescope.radec_to_azel(np.degrees(ra), np.degrees(de), np.full(len(ra), jd))
+        models.add(telescope._lst_model[0])
+        # a linear sidereal time stays within 0.002 arcsec of Skyfield's (LST_MODEL_SPAN_DAYS)
+        assert _angle_arcsec(az, el, azimuth.degrees, elevation.degrees)[above].max() < 0.002
+    assert len(models) == 3
+
+    # a batch longer than the model span is computed by Skyfield directly
+    jd = jd_first + np.linspace(0, 2 * LST_MODEL_SPAN_DAYS, len(ra))
+    t = ts.tt_jd(jd)
+    directions = np.einsum('jik,jk->ik', t.M, direction_of_date)  # GCRS direction of every column at its own epoch
+    elevation, azimuth, _ = build_position(directions, center=station, t=t).altaz()
+    az, el = telescope.radec_to_azel(np.degrees(ra), np.degrees(de), jd)
+    assert _angle_arcsec(az, el, azimuth.degrees, elevation.degrees).max() < 1e-4
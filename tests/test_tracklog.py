@@ -0,0 +1,48 @@
+import datetime
+
+import numpy as np
+
+from telemetry import TelemetrySample
+from tracklog import TrackLogWriter, night_of, read_night, read_track_log
+
+
+def _utc(*args) -> float:
+    return datetime.datetime(*args, tzinfo=datetime.timezone.utc).timestamp()
+
+
+def _log_track(log_dir, name:str, start:float, samples:int=5) -> TrackLogWriter:
+    writer = TrackLogWriter(name, log_dir=str(log_dir), flush_rows=2, start_time=start)
+    for index in range(samples):
+        writer(TelemetrySample(start + index, 2461007.0, 180.0, 45.0, 90.0, 30.0, 0, 1, 0.0, 0.0))
+    writer.close()
+    return writer
+
+
+def test_night_starts_at_noon():
+    assert night_of(_utc(2025, 11, 27, 12, 0)) == "2025-11-27"
+    assert night_of(_utc(2025, 11, 28, 11, 59)) == "2025-11-27"
+    assert night_of(_utc(2025, 11, 27, 11, 59)) == "2025-11-26"
+
+
+def test_night_is_ordered_by_track_start(tmp_path):
+    morning = _log_track(tmp_path, "SAT-B", _utc(2025, 11, 28, 1, 0))
+    evening = _log_track(tmp_path, "SAT-A", _utc(2025, 11, 27, 23, 0))
+
+    names, samples = read_night("2025-11-27", log_dir=str(tmp_path))
+    assert names == ["230000_SAT-A", "010000_SAT-B"]
+    assert len(samples) == 10
+    assert np.all(np.diff(samples['time']) > 0)
+    assert list(samples['track']) == [0] * 5 + [1] * 5
+    assert len(read_track_log(evening.track_dir)) == len(read_track_log(morning.track_dir)) == 5
+
+
+def test_same_name_in_the_same_second_gets_its_own_directory(tmp_path):
+    first = _log_track(tmp_path, "SAT-A", _utc(2025, 11, 27, 23, 0, 0), samples=3)
+    second = _log_track(tmp_path, "SAT-A", _utc(2025, 11, 27, 23, 0, 0, 500000), samples=4)
+
+    assert first.track_dir != second.track_dir
+    assert second.track_dir.endswith("230000_SAT-A_2")
+    assert len(read_track_log(first.track_dir)) == 3
+    assert len(read_track_log(second.track_dir)) == 4
+    names, _ = read_night("2025-11-27", log_dir=str(tmp_path))
+    assert names == ["230000_SAT-A", "230000_SAT-A_2"]
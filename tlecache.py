@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from tleparser import iter_tle_file
+
+# element columns stored next to the raw lines, angles in radians, mean motion in rad/min (sgp4 units)
+ELEMENT_COLUMNS = ('jdsatepoch', 'jdsatepochF', 'inclo', 'nodeo', 'ecco', 'argpo', 'mo', 'no_kozai', 'bstar')
+
+
+def _file_hash(file_path:str) -> str:
+    with open(file_path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _source_signature(file_paths) -> dict:
+    """ mtime and size of every source file, the hash is only computed when those do not match anymore """
+    signature = dict()
+    for file_path in file_paths:
+        stat = os.stat(file_path)
+        signature[os.path.basename(file_path)] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+    return signature
+
+
+def _is_up_to_date(cached_signature:dict, file_paths) -> tuple:
+    """ :returns: whether the cache still matches the files and the signature to store, in which the mtimes of files
+        that were touched but have the same content are refreshed (so they are not hashed again on the next start)
+    :rtype: tuple
+    """
+    current = _source_signature(file_paths)
+    if cached_signature.keys() != current.keys():
+        return False, current
+    for file_path in file_paths:
+        name = os.path.basename(file_path)
+        cached = cached_signature[name]
+        if cached["mtime_ns"] == current[name]["mtime_ns"] and cached["size"] == current[name]["size"]:
+            current[name]["sha1"] = cached.get("sha1")
+            continue
+        # touched (e.g. downloaded again) -> only the content decides
+        sha1 = _file_hash(file_path)
+        if cached.get("sha1") != sha1:
+            return False, current
+        current[name]["sha1"] = sha1
+    return True, current
+
+
+def build_catalog(file_paths) -> dict:
+    """ parses the TLE files into columnar arrays
+
+    :param file_paths: paths of the .tle files
+    :type file_paths: list
+
+    :returns: dict with the arrays 'line0', 'line1', 'line2', 'norad_id' and one array per ELEMENT_COLUMNS entry
+    :rtype: dict
+    """
+    lines0, lines1, lines2, norad_ids = [], [], [], []
+    elements = {column: [] for column in ELEMENT_COLUMNS}
+    for file_path in file_paths:
+        for norad_id, satrec, (line0, line1, line2) in iter_tle_file(file_path):
+            lines0.append(line0.rstrip("\n"))
+            lines1.append(line1.rstrip("\n"))
+            lines2.append(line2.rstrip("\n"))
+            norad_ids.append(norad_id)
+            for column in ELEMENT_COLUMNS:
+                elements[column].append(getattr(satrec, column))
+
+    catalog = {"line0": np.array(lines0, dtype=str),
+               "line1": np.array(lines1, dtype="<U69"),
+               "line2": np.array(lines2, dtype="<U69"),
+               "norad_id": np.array(norad_ids, dtype="<U6")}
+    for column in ELEMENT_COLUMNS:
+        catalog[column] = np.array(elements[column], dtype=np.float64)
+    return catalog
+
+
+def load_catalog(file_paths, cache_file:str) -> dict:
+    """ returns the compiled catalog of the TLE files, rebuilding the .npz cache only if a source file changed
+
+    :param file_paths: paths of the .tle files
+    :type file_paths: list
+
+    :param cache_file: path of the .npz cache
+    :type cache_file: str
+
+    :returns: see build_catalog
+    :rtype: dict
+    """
+    file_paths = sorted(file_paths)
+    if os.path.exists(cache_file):
+        try:
+            with np.load(cache_file) as cached:
+                cached_signature = json.loads(str(cached["signature"]))
+                up_to_date, signature = _is_up_to_date(cached_signature, file_paths)
+                if up_to_date:
+                    catalog = {key: cached[key] for key in cached.files if key != "signature"}
+            if up_to_date:
+                if signature != cached_signature: # touched files with the same content
+                    _write_cache(cache_file, signature, catalog)
+                return catalog
+        except Exception as e:
+            print(f"TLE catalog cache {cache_file} can not be loaded, rebuilding it: {str(e)}")
+
+    catalog = build_catalog(file_paths)
+    signature = _source_signature(file_paths)
+    for file_path in file_paths:
+        signature[os.path.basename(file_path)]["sha1"] = _file_hash(file_path)
+    _write_cache(cache_file, signature, catalog)
+    return catalog
+
+
+def _write_cache(cache_file:str, signature:dict, catalog:dict):
+    try:
+        # write to a temporary file first so an interrupted save never leaves a broken cache behind
+        tmp_file = cache_file + ".tmp.npz"
+        np.savez(tmp_file, signature=json.dumps(signature), **catalog)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        print(f"TLE catalog cache {cache_file} can not be written: {str(e)}")
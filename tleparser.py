@@ -0,0 +1,93 @@
+from sgp4.api import Satrec
+from skyfield.api import EarthSatellite
+
+
+def tle_checksum(line:str) -> int:
+    """ computes the modulo 10 checksum of a TLE line (digits count by value, minus signs count as 1)
+
+    :param line: line 1 or line 2 of a TLE
+    :type line: str
+
+    :rtype: int
+    """
+    return sum(int(c) if c.isdigit() else c == '-' for c in line[:68]) % 10
+
+
+def _is_valid(line:str) -> bool:
+    return len(line) >= 69 and line[68].isdigit() and int(line[68]) == tle_checksum(line)
+
+
+def iter_tle_lines(lines):
+    """ streams TLE entries out of CelesTrak or Space-Track files
+
+    Accepts the 3-line format with ("0 NAME", Space-Track) or without ("NAME", CelesTrak) the leading zero as well
+    as plain 2-line files. Entries whose lines fail the checksum or do not belong to the same satellite are skipped.
+
+    :param lines: iterable of text lines, e.g. an open file
+    :type lines: iterable
+
+    :returns: generator of (line0, line1, line2) with line0 always in the "0 NAME" form (NAME is the NORAD ID for
+              2-line files) and without line endings
+    :rtype: generator
+    """
+    line0 = line1 = ''
+    skipped = 0
+    for line2 in lines:
+        line2 = line2.rstrip(' \r\n')
+        if not line2:
+            continue  # Space-Track files end lines with \r\r\n, which reads as an extra empty line
+        if line2.startswith('2 ') and line1.startswith('1 ') and len(line1) >= 69 and len(line2) >= 69:
+            if _is_valid(line1) and _is_valid(line2) and line1[2:7] == line2[2:7]:
+                line0 = line0.strip()
+                if not line0:
+                    line0 = line1[2:7]
+                if not line0.startswith('0'):
+                    line0 = '0 ' + line0
+                yield line0, line1, line2
+            else:
+                skipped += 1
+            line0 = line1 = ''  # don't accidentally use line 2 as next satellite's name
+        else:
+            line0 = line1
+            line1 = line2
+    if skipped:
+        print(f'Skipped {skipped} TLEs with invalid checksum or mismatching lines')
+
+
+def iter_tle_file(file_path:str):
+    """ reads a TLE file once and yields the sgp4 model together with the raw lines
+
+    :param file_path: path to a .tle file
+    :type file_path: str
+
+    :returns: generator of (NoradID, Satrec, (line0, line1, line2)) where NoradID is the catalog number plus
+              classification (e.g. '25544U') and the lines end with a newline, ready to be exported again
+    :rtype: generator
+    """
+    with open(file_path) as f:
+        for line0, line1, line2 in iter_tle_lines(f):
+            satrec = Satrec.twoline2rv(line1, line2)
+            yield line1[2:8], satrec, (line0 + "\n", line1 + "\n", line2 + "\n")
+
+
+def load_tle_files(file_paths, ts) -> (list, dict):
+    """ loads satellites from TLE files, every file is read exactly once
+
+    :param file_paths: paths of the .tle files
+    :type file_paths: list
+
+    :param ts: timescale used for the satellite epochs
+    :type ts: skyfield.timelib.Timescale
+
+    :returns: list of EarthSatellite objects and dict mapping NoradID -> (line0, line1, line2)
+    :rtype: tuple
+    """
+    satellites = list()
+    satellites_dict = dict()
+    for file_path in file_paths:
+        for norad_id, satrec, lines in iter_tle_file(file_path):
+            sat = EarthSatellite.from_satrec(satrec, ts)
+            sat.name = lines[0][2:].strip()
+            satellites.append(sat)
+            satellites_dict[norad_id] = lines
+    return satellites, satellites_dict
@@ -1,14 +1,52 @@
 from alpaca.telescope import Telescope
+from concurrent.futures import ThreadPoolExecutor
+import heapq
+import itertools
 import json
+import os
+import threading
+import time
 import numpy as np
 from numpy import pi
 
-from skyfield.api import load as sky_load
 from skyfield.api import wgs84 as sky_wgs84
 
-from utils.configManager import MIN_ALTITUDE_ElEVATION
+from utils.configManager import MIN_ALTITUDE_ElEVATION, TELESCOPE_ADDRESS, TELESCOPE_EPH_ACTION, \
+    TELESCOPE_EPH_APPEND_ACTION, TELESCOPE_EPH_CHUNK_LINES, TELESCOPE_UPLOAD_RETRIES, TRACK_SCHEDULER_POLL_S
+from utils.skyfieldProvider import get_timescale
 from preprocessing import load_StationLatLongAlt
 
+UNIX_EPOCH_MJD = 40587.0  # mjd of 1970-01-01
+LST_MODEL_SPAN_DAYS = 0.5  # a linear sidereal time stays within 0.002 arcsec of Skyfield's over half a day
+SIDEREAL_RATE = 2 * pi * 1.00273781191135448  # rad per day, only used to count the turns within a model span
+
+
+
+def encode_eph_chunks(lines, chunk_lines:int=TELESCOPE_EPH_CHUNK_LINES) -> list:
+    """ JSON payloads of the ephemeris lines for the upload, encoded once before the first call
+
+    :param lines: .eph lines with or without newline, e.g. a file object or EphemerisStore.eph_lines
+    :type lines: iterable
+
+    :param chunk_lines: lines per payload, 0 -> all lines in one payload
+    :type chunk_lines: int
+
+    :returns: (payload, number of lines) per chunk
+    :rtype: list
+    """
+    lines = [line.rstrip('\n') for line in lines]  # Strip newlines if needed
+    if chunk_lines <= 0:
+        return [(json.dumps(lines), len(lines))]
+    return [(json.dumps(lines[start:start + chunk_lines]), len(lines[start:start + chunk_lines]))
+            for start in range(0, len(lines), chunk_lines)]
+
+
+def eph_time_span(lines) -> tuple:
+    """ mjd of the first and the last data line of .eph lines, (None, None) if there are none """
+    epochs = [float(line.split()[0]) for line in lines if line.strip() and not line.startswith("#")]
+    return (epochs[0], epochs[-1]) if epochs else (None, None)
+
+
 class TelescopeWrapper():
     def __init__(self):
         self._telescope = None
@@ -18,15 +56,28 @@ class TelescopeWrapper():
         self._sat_status = None
         self.AZ_deg = None
         self.EL_deg = None
+        # raw values of the last status request, see update_status
+        self.status_jd = None
+        self.RA_deg = None
+        self.DE_deg = None
+        self.tel_status_bits = 0
+        self.sat_status_bits = 0
+        self.track_err_ax1 = None # mrad
+        self.track_err_ax2 = None # mrad
         self.tracking_bit = 0
         self.slewing_bit = 0
+        self._pending_upload = None # (chunks, index of the first chunk not sent) of a failed upload
+        self._start_lock = threading.Lock() # tracks are started by the GUI and the TrackScheduler thread
 
-        self._ts = sky_load.timescale()
+        self._ts = get_timescale()
         self._gnd_station = sky_wgs84.latlon(*load_StationLatLongAlt())
+        lat = self._gnd_station.latitude.radians
+        self._sin_lat, self._cos_lat = np.sin(lat), np.cos(lat)
+        self._lst_model = None # (first jd, last jd, LAST at first jd [rad], rate [rad/day]), see _lst_rad
 
     def connect_telescope(self):
         try:
-            self._telescope = Telescope('localhost:11111', 0)
+            self._telescope = Telescope(TELESCOPE_ADDRESS, 0)
             self._telescope.Connected = True
             self.connected_flag = True
             return None
@@ -41,18 +92,35 @@ class TelescopeWrapper():
         except Exception as e:
             return f'Telescope disconnect failed:\n{str(e)}'
 
-    def start_track(self, eph_filepath):
+    def start_track(self, eph_filepath=None, lines=None, progress=None, chunks=None):
+        # lines: .eph text e.g. exported from an ephemerisstore.EphemerisStore, used instead of reading eph_filepath
+        # progress: called with (lines sent, total lines) after every chunk
+        # chunks: already encoded lines (encode_eph_chunks), e.g. prepared by the TrackScheduler
+        # called from worker threads, the upload can take a while
+        if not self._start_lock.acquire(blocking=False):
+            return "Ephemeris upload is ongoing! Cannot start a new track!"
+        try:
+            return self._start_track(eph_filepath, lines, progress, chunks)
+        finally:
+            self._start_lock.release()
+
+    def _start_track(self, eph_filepath, lines, progress, chunks):
         # check if tracking is not ongoing
         if self.tracking_flag:
             return "Track is ongoing! Cannot start a new one!"
-        # Read all lines from the file
-        with open(eph_filepath, "r") as file:
-            lines = [line.rstrip('\n') for line in file]  # Strip newlines if needed
+        if chunks is None:
+            if lines is None:
+                # Read all lines from the file
+                with open(eph_filepath, "r") as file:
+                    lines = list(file)
+            chunks = encode_eph_chunks(lines)
 
-        # Serialize the list of lines to JSON
-        lines_list_serialized = json.dumps(lines)
         try:
-            self._telescope.Action("sat:ephlines", lines_list_serialized)
+            first = 0
+            if self._pending_upload is not None and self._pending_upload[0] == chunks:
+                # same ephemeris as the failed upload -> continue where it stopped
+                first = self._pending_upload[1]
+            self._upload_eph_chunks(chunks, first, progress)
 
             # provide telescope with min elevation (=altitude) and start track
             self._telescope.Action("sat:startalt", MIN_ALTITUDE_ElEVATION)
@@ -60,8 +128,34 @@ class TelescopeWrapper():
             self.tracking_flag = True
             return None
         except Exception as e:
+            if self._pending_upload is not None:
+                return f"Ephemeris upload failed at chunk {self._pending_upload[1] + 1} of {len(chunks)}, " \
+                       f"start the track again to resume:\n{str(e)}"
             return f"Tracking failed:\n{str(e)}"
 
+    def _upload_eph_chunks(self, chunks:list, first:int, progress=None):
+        """ sends the chunks from index first on, the first chunk replaces the lines of the mount, the others are
+        appended. A failing chunk is repeated TELESCOPE_UPLOAD_RETRIES times before the upload is given up and kept
+        in _pending_upload for resuming. """
+        total = sum(n_lines for _, n_lines in chunks)
+        sent = sum(n_lines for _, n_lines in chunks[:first])
+        for index in range(first, len(chunks)):
+            payload, n_lines = chunks[index]
+            action = TELESCOPE_EPH_ACTION if index == 0 else TELESCOPE_EPH_APPEND_ACTION
+            for attempt in range(TELESCOPE_UPLOAD_RETRIES + 1):
+                try:
+                    self._telescope.Action(action, payload)
+                    break
+                except Exception as e:
+                    print(f"Ephemeris chunk {index + 1}/{len(chunks)} failed (attempt {attempt + 1}): {str(e)}")
+                    if attempt == TELESCOPE_UPLOAD_RETRIES:
+                        self._pending_upload = (chunks, index)
+                        raise
+            sent += n_lines
+            if progress is not None:
+                progress(sent, total)
+        self._pending_upload = None
+
     def update_status(self):
         if not self.connected_flag:
             return "Telescope not connected!"
@@ -79,9 +173,11 @@ class TelescopeWrapper():
             # 'ErrornumberAxis1': 0, 'ErrornumberAxis2': 2304}
             # slewing-bit useful as it indicates whether telescope has arrived at waiting position or not
             self.slewing_bit = (self._tel_status['Status'] >> 2) # bit 2 is relevant
-            RA_deg, DE_deg = self._tel_status['RigthAscension'], self._tel_status['Declination']
-            jd = self._tel_status['JulianDate']
-            self.AZ_deg, self.EL_deg = self._topo_radec_to_azel(RA_deg, DE_deg, jd)
+            self.tel_status_bits = self._tel_status['Status']
+            self.RA_deg, self.DE_deg = self._tel_status['RigthAscension'], self._tel_status['Declination']
+            self.status_jd = self._tel_status['JulianDate']
+            self.AZ_deg, self.EL_deg = (float(angle) for angle in
+                                        self.radec_to_azel(self.RA_deg, self.DE_deg, self.status_jd))
 
             # Ask the telescope for its tel_status as JSON
             json_string = self._telescope.CommandString("getSatStatus", True)
@@ -90,55 +186,211 @@ class TelescopeWrapper():
             # {'status': 0, # bit 0: tracking info (works!), bit 1: sunlight (only for cpf or tle tracks, not eph)
             # 'TrackErrAx1': -0.00045685676708373535, # mrad
             # 'TrackErrAx2': -0.0057915890411264215} # mrad
-            self.tracking_bit = self._sat_status['status'] & 0b1
+            self.sat_status_bits = self._sat_status['status']
+            self.tracking_bit = self.sat_status_bits & 0b1
+            self.track_err_ax1, self.track_err_ax2 = self._sat_status['TrackErrAx1'], self._sat_status['TrackErrAx2']
             return None
         except Exception as e:
             return f"Status Request failed:\n{str(e)}"
 
-    def _topo_radec_to_azel(self, ra_deg, dec_deg, jd):
-        """ Convert topocentric RA/Dec in degrees to Azimuth and Elevation in degrees.
+    def _fit_lst_model(self, jd_first:float):
+        # LAST at both ends of the span in one Skyfield call, the line through them is the model
+        jd = np.array([jd_first, jd_first + LST_MODEL_SPAN_DAYS])
+        lst_first, lst_last = np.radians(self._gnd_station.lst_hours_at(self._ts.tt_jd(jd)) * 15.0)
+        turns = np.round((SIDEREAL_RATE * LST_MODEL_SPAN_DAYS - (lst_last - lst_first)) / (2 * pi))
+        rate = (lst_last - lst_first + 2 * pi * turns) / LST_MODEL_SPAN_DAYS
+        self._lst_model = (jd[0], jd[1], lst_first, rate)
+        return self._lst_model
+
+    def _lst_rad(self, jd) -> np.ndarray:
+        """ Local Apparent Sidereal Time in radians at the Julian Dates (TT) jd
+
+        A linear model over LST_MODEL_SPAN_DAYS is fitted when jd leaves the current one, so the status poll and the
+        samples of a pass need no Skyfield Time objects. Longer batches (e.g. the log of a whole night) are computed
+        by Skyfield in one call.
+        """
+        jd = np.asarray(jd, dtype=np.float64)
+        jd_min, jd_max = jd.min(), jd.max()
+        if jd_max - jd_min > LST_MODEL_SPAN_DAYS:
+            return np.radians(self._gnd_station.lst_hours_at(self._ts.tt_jd(jd)) * 15.0)
+        model = self._lst_model
+        if model is None or jd_min < model[0] or jd_max > model[1]:
+            model = self._fit_lst_model(jd_min)
+        jd_first, _, lst_first, rate = model
+        return (lst_first + rate * (jd - jd_first)) % (2 * pi)
+
+    def radec_to_azel(self, ra_deg, dec_deg, jd) -> tuple:
+        """ Convert topocentric RA/Dec in degrees to Azimuth and Elevation in degrees, vectorized.
 
         :param ra_deg: Right Ascension in degrees (topocentric)
-        :type ra_deg: float
+        :type ra_deg: float or numpy.ndarray
         :param dec_deg: Declination in degrees (topocentric)
-        :type dec_deg: float
-        :param jd: Julian Date (TT or UTC, converted to TT internally)
-        :type jd: float
+        :type dec_deg: float or numpy.ndarray
+        :param jd: Julian Date (taken as TT), same shape as ra_deg or a scalar
+        :type jd: float or numpy.ndarray
 
-        :returns: az_deg, el_deg: Azimuth and Elevation in degrees
+        :returns: az_deg, el_deg: Azimuth and Elevation in degrees, arrays of the shape of the inputs
         """
         # Convert RA/Dec to radians
         ra = np.radians(ra_deg)
         dec = np.radians(dec_deg)
-        lat = np.radians(self._gnd_station.latitude.degrees)
-
-        # Time as Terrestrial Time (TT)
-        t = self._ts.tt_jd(jd)  # Terrestrial Time
-
-        # Local Apparent Sidereal Time (LAST) in hours
-        lst_hours = self._gnd_station.lst_hours_at(t)
-        lst_rad = np.radians(lst_hours * 15.0)  # convert hours → degrees → radians
+        sin_dec, cos_dec = np.sin(dec), np.cos(dec)
 
         # Hour Angle
-        ha = lst_rad - ra
+        ha = self._lst_rad(jd) - ra
 
         # Elevation
-        sin_alt = np.sin(dec) * np.sin(lat) + np.cos(dec) * np.cos(lat) * np.cos(ha)
+        sin_alt = sin_dec * self._sin_lat + cos_dec * self._cos_lat * np.cos(ha)
         alt = np.arcsin(sin_alt)
 
         # Azimuth
-        cos_az = (np.sin(dec) - np.sin(alt) * np.sin(lat)) / (np.cos(alt) * np.cos(lat))
+        cos_az = (sin_dec - sin_alt * self._sin_lat) / (np.cos(alt) * self._cos_lat)
         az = np.arccos(np.clip(cos_az, -1.0, 1.0))
 
         # Correct quadrant: if sin(HA) > 0, az = 360° - az
-        az = np.where(np.sin(ha) > 0, 2 * np.pi - az, az)
+        az = np.where(np.sin(ha) > 0, 2 * pi - az, az)
 
         # Convert to degrees
-        az_deg = np.degrees(az)
-        el_deg = np.degrees(alt)
+        return np.degrees(az), np.degrees(alt)
+
+
+class TrackScheduler:
+    """ Queue of tracks that are sent to the mount back to back
+
+    Added ephemerides are read and encoded by a background worker right away, so when a pass ends the next one only
+    has to be uploaded. The queue is ordered by the first epoch of the ephemerides, not by the order they were added.
+    The dispatcher thread starts the earliest track as soon as the telescope is connected and not tracking any more
+    (tracking_flag is cleared by whoever polls the status, e.g. APP._update_status). Tracks that are already over
+    when their turn comes are dropped.
+    The mount replaces its ephemeris lines on upload, so a track can not be uploaded before the current one ended.
+    """
+
+    def __init__(self, telescope, on_start=None, on_error=None, progress=None, poll_s:float=TRACK_SCHEDULER_POLL_S):
+        """
+        :param telescope: the telescope the tracks are started on
+        :type telescope: TelescopeWrapper
+
+        :param on_start: called with the name of a track after the mount accepted it (dispatcher thread)
+        :type on_start: (str) -> None
+
+        :param on_error: called with an error message if a track can not be queued or started (any thread)
+        :type on_error: (str) -> None
+
+        :param progress: passed on to TelescopeWrapper.start_track (dispatcher thread)
+        :type progress: (int, int) -> None
+
+        :param poll_s: time between two checks whether the current track has ended
+        :type poll_s: float
+        """
+        self.telescope = telescope
+        self.on_start = on_start
+        self.on_error = on_error
+        self.progress = progress
+        self.poll_s = poll_s
+        self._queue = list() # heap of (first mjd, sequence number, name, last mjd, chunks)
+        self._preparing = 0 # tracks added but not read and encoded yet
+        self._sequence = itertools.count() # keeps tracks with the same first epoch in the order they were added
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="track-prepare")
+        self._thread = None
+
+    def __len__(self):
+        with self._condition:
+            return len(self._queue) + self._preparing
+
+    @property
+    def names(self) -> list:
+        """ names of the prepared tracks in the order they will be started """
+        with self._condition:
+            return [entry[2] for entry in sorted(self._queue)]
+
+    def add(self, eph_filepath=None, lines=None, name:str=None):
+        """ queues a track, reading and encoding is done in the background
+
+        :param eph_filepath: .eph file of the track
+        :type eph_filepath: str
+
+        :param lines: .eph lines used instead of reading eph_filepath, e.g. EphemerisStore.eph_lines
+        :type lines: list
+
+        :param name: shown in messages, defaults to the file name
+        :type name: str
+
+        :returns: future of the preparation, its result is the first epoch (mjd) of the track
+        :rtype: concurrent.futures.Future
+        """
+        if name is None:
+            name = os.path.basename(eph_filepath) if eph_filepath is not None else "track"
+        with self._condition:
+            self._preparing += 1
+        return self._executor.submit(self._prepare, name, eph_filepath, lines)
+
+    def _prepare(self, name:str, eph_filepath, lines):
+        try:
+            if lines is None:
+                with open(eph_filepath, "r") as file:
+                    lines = list(file)
+            first_mjd, last_mjd = eph_time_span(lines)
+            if first_mjd is None:
+                raise ValueError("no ephemeris lines")
+            chunks = encode_eph_chunks(lines)
+        except Exception as e:
+            with self._condition:
+                self._preparing -= 1
+                self._condition.notify_all()
+            self._report(f"{name} can not be queued:\n{str(e)}")
+            raise
+        with self._condition:
+            heapq.heappush(self._queue, (first_mjd, next(self._sequence), name, last_mjd, chunks))
+            self._preparing -= 1
+            self._condition.notify_all()
+        return first_mjd
+
+    def clear(self):
+        """ removes all prepared tracks, the current track goes on """
+        with self._condition:
+            self._queue.clear()
+
+    def start(self):
+        """ starts the dispatcher thread, does nothing if it is running already """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="track-scheduler")
+        self._thread.start()
 
-        return az_deg, el_deg
+    def stop(self):
+        """ stops the dispatcher after the track it is starting right now, the queue is kept """
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
 
+    def _ready(self) -> bool:
+        # a track still being prepared may start earlier than the queued ones -> wait for it as well
+        return (self.telescope.connected_flag and not self.telescope.tracking_flag
+                and self._preparing == 0 and len(self._queue) > 0)
 
+    def _run(self):
+        while True:
+            with self._condition:
+                # tracking_flag is cleared by another thread without notifying -> poll
+                while not self._stop_event.is_set() and not self._ready():
+                    self._condition.wait(self.poll_s)
+                if self._stop_event.is_set():
+                    return
+                first_mjd, _, name, last_mjd, chunks = heapq.heappop(self._queue)
 
+            if last_mjd < time.time() / 86400.0 + UNIX_EPOCH_MJD:
+                self._report(f"{name} skipped, the pass is already over")
+                continue
+            err_msg = self.telescope.start_track(chunks=chunks, progress=self.progress)
+            if err_msg is not None:
+                self._report(f"{name} could not be started:\n{err_msg}")
+            elif self.on_start is not None:
+                self.on_start(name)
 
+    def _report(self, message:str):
+        print(message)
+        if self.on_error is not None:
+            self.on_error(message)
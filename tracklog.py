@@ -0,0 +1,183 @@
+import datetime
+import itertools
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+from ephemeris import FILE_NAME_REPLACED_CHARS
+from telemetry import TELEMETRY_DTYPE
+from utils.configManager import TRACK_LOG_PATH, TRACK_LOG_FLUSH_ROWS
+
+TRACK_LOG_FORMAT_VERSION = 1
+TRACK_LOG_INDEX = "track.json"
+NIGHT_SHIFT = datetime.timedelta(hours=12)  # a night is named after the date of its evening (UTC)
+# rows of read_night, track is the index into the returned names
+NIGHT_LOG_DTYPE = np.dtype(TELEMETRY_DTYPE.descr + [('track', np.int32)])
+
+
+def night_of(unix_time:float) -> str:
+    """ night a time belongs to, e.g. 2025-11-27 for 2025-11-27 12:00 to 2025-11-28 11:59 UTC """
+    utc = datetime.datetime.fromtimestamp(unix_time, datetime.timezone.utc)
+    return (utc - NIGHT_SHIFT).strftime("%Y-%m-%d")
+
+
+def column_file(track_dir:str, column:str) -> str:
+    return os.path.join(track_dir, f"{column}.bin")
+
+
+class TrackLogWriter:
+    """ Append-only log of the telemetry of one track, one raw binary file per TELEMETRY_DTYPE column
+
+    The writer is a listener of telemetry.TelemetrySampler: samples are copied into a preallocated block, a full block
+    is handed to a background thread which appends every column to its file. So the sampler never waits for the disk.
+    A crash loses at most the block in memory, columns of different length (a crash while appending) are cut to the
+    shortest by the reader.
+    """
+
+    def __init__(self, track_name:str, log_dir:str=TRACK_LOG_PATH, flush_rows:int=TRACK_LOG_FLUSH_ROWS,
+                 start_time:float=None):
+        """
+        :param track_name: e.g. the satellite name, part of the directory name
+        :type track_name: str
+
+        :param log_dir: the logs are written to log_dir/<night>/<HHMMSS>_<track_name>, a second track of the same name
+            started in the same second gets _2 appended and so on
+        :type log_dir: str
+
+        :param flush_rows: samples collected before they are written
+        :type flush_rows: int
+
+        :param start_time: unix time of the track start, defaults to now
+        :type start_time: float
+        """
+        start = datetime.datetime.now(datetime.timezone.utc) if start_time is None \
+            else datetime.datetime.fromtimestamp(start_time, datetime.timezone.utc)
+        for char in FILE_NAME_REPLACED_CHARS:
+            track_name = track_name.replace(char, "-")
+        night_dir = os.path.join(log_dir, night_of(start.timestamp()))
+        os.makedirs(night_dir, exist_ok=True)
+        for number in itertools.count(1):
+            suffix = "" if number == 1 else f"_{number}"
+            self.track_dir = os.path.join(night_dir, f"{start.strftime('%H%M%S')}_{track_name}{suffix}")
+            try:
+                os.mkdir(self.track_dir) # never append to the files of another track
+                break
+            except FileExistsError:
+                pass
+        with open(os.path.join(self.track_dir, TRACK_LOG_INDEX), "w") as f:
+            json.dump({"version": TRACK_LOG_FORMAT_VERSION,
+                       "name": track_name,
+                       "start": start.isoformat(timespec="microseconds"),
+                       "columns": {name: TELEMETRY_DTYPE[name].str for name in TELEMETRY_DTYPE.names}}, f, indent=1)
+
+        self.flush_rows = max(int(flush_rows), 1)
+        self.rows_written = 0 # rows handed to the writer thread
+        self._block = np.empty(self.flush_rows, dtype=TELEMETRY_DTYPE)
+        self._rows = 0 # rows in _block
+        self._closed = False
+        self._lock = threading.Lock() # samples come from the sampler thread, close from another one
+        self._blocks = queue.Queue()
+        self._thread = threading.Thread(target=self._write_blocks, daemon=True, name="track-log")
+        self._thread.start()
+
+    def __call__(self, sample):
+        """ appends a telemetry.TelemetrySample, used as listener of the sampler """
+        with self._lock:
+            if self._closed:
+                return
+            self._block[self._rows] = sample.as_tuple()
+            self._rows += 1
+            if self._rows == self.flush_rows:
+                self._flush()
+
+    def _flush(self):
+        # hands the block over, the writer thread owns it from now on
+        if self._rows > 0:
+            self._blocks.put(self._block[:self._rows])
+            self.rows_written += self._rows
+            self._block = np.empty(self.flush_rows, dtype=TELEMETRY_DTYPE)
+            self._rows = 0
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        """ writes the remaining samples and waits for the writer thread, later samples are ignored """
+        with self._lock:
+            if self._closed:
+                return
+            self._flush()
+            self._closed = True
+            self._blocks.put(None)
+        self._thread.join()
+
+    def _write_blocks(self):
+        while True:
+            block = self._blocks.get()
+            if block is None:
+                return
+            try:
+                for column in TELEMETRY_DTYPE.names:
+                    with open(column_file(self.track_dir, column), "ab") as f:
+                        block[column].tofile(f)
+            except OSError as e:
+                print(f"Track log {self.track_dir} could not be written: {str(e)}")
+
+
+def read_track_log(track_dir:str) -> np.ndarray:
+    """ all samples of a track log
+
+    :rtype: numpy.ndarray of telemetry.TELEMETRY_DTYPE
+    """
+    with open(os.path.join(track_dir, TRACK_LOG_INDEX), "r") as f:
+        index = json.load(f)
+    if index.get("version") != TRACK_LOG_FORMAT_VERSION:
+        raise ValueError(f"{track_dir} has an unknown format version {index.get('version')}")
+    columns = dict()
+    for column, dtype in index["columns"].items():
+        path = column_file(track_dir, column)
+        columns[column] = np.fromfile(path, dtype=dtype) if os.path.exists(path) else np.empty(0, dtype=dtype)
+    rows = min(len(values) for values in columns.values())
+    samples = np.zeros(rows, dtype=TELEMETRY_DTYPE)
+    for column in TELEMETRY_DTYPE.names:
+        if column in columns:
+            samples[column] = columns[column][:rows]
+    return samples
+
+
+def read_night(night:str, log_dir:str=TRACK_LOG_PATH) -> tuple:
+    """ all track logs of a night in one array, ordered by track start
+
+    The order comes from the start in the track.json files, the directory names (HHMMSS) of the tracks after
+    midnight UTC sort before the ones of the evening.
+
+    :param night: e.g. 2025-11-27 (see night_of)
+    :type night: str
+
+    :returns: names of the track directories and the samples of all tracks as NIGHT_LOG_DTYPE, whose track field is
+        the index into the names
+    :rtype: tuple
+    """
+    night_dir = os.path.join(log_dir, night)
+    tracks = list() # (start, name)
+    if os.path.isdir(night_dir):
+        for name in os.listdir(night_dir):
+            index_file = os.path.join(night_dir, name, TRACK_LOG_INDEX)
+            if os.path.exists(index_file):
+                with open(index_file, "r") as f:
+                    tracks.append((datetime.datetime.fromisoformat(json.load(f)["start"]), name))
+    names = list()
+    blocks = list()
+    for _, name in sorted(tracks):
+        samples = read_track_log(os.path.join(night_dir, name))
+        block = np.empty(len(samples), dtype=NIGHT_LOG_DTYPE)
+        for column in TELEMETRY_DTYPE.names:
+            block[column] = samples[column]
+        block['track'] = len(names)
+        names.append(name)
+        blocks.append(block)
+    return names, np.concatenate(blocks) if blocks else np.empty(0, dtype=NIGHT_LOG_DTYPE)
@@ -24,8 +24,39 @@ STATION_CFG = os.path.join(UTILS_DIR, "stationInformation.json")
 TLE_DATA_PATH = os.path.join(BASE_DIR, "TLE_data")
 OGS_TLE_FILE = os.path.join(TLE_DATA_PATH, "ogs_tle", "Stations.tle") # sample tle file, uses more
 LEO_TLE_FILE = os.path.join(TLE_DATA_PATH, "elsetsSpaceTrackLEOMostRecent.tle")
+OGS_CATALOG_CACHE = os.path.join(TLE_DATA_PATH, "ogs_catalog.npz") # compiled TLEs, rebuilt when sources change
+LEO_CATALOG_CACHE = os.path.join(TLE_DATA_PATH, "leo_catalog.npz")
+PASS_CACHE_PATH = os.path.join(TLE_DATA_PATH, "pass_cache") # predicted passes per catalog, station and elevation mask
 SPACE_TRACK_CFG = os.path.join(UTILS_DIR, "space_track.json")
 
 MISSION_PLAN_PATH = os.path.join(BASE_DIR, "missionplans")
+FREEFLYER_ENGINES = 1 # > 1: satellites are distributed over this many engines
+FREEFLYER_ENGINE_RETRIES = 1 # a failed engine is restarted and the satellite tried again this often
+FREEFLYER_ASYNC_MODE = False # True: asynchronous Runtime API calls, files are moved while the engines work
+FREEFLYER_POLL_MS = 200 # timeout of one synchronize call while waiting for an asynchronous engine
 EPHEMERIDES_PATH = os.path.join(BASE_DIR, "ephemerides")
-MIN_ALTITUDE_ElEVATION = 26
\ No newline at end of file
+EPHEMERIS_STEP_S = 3 # time between two lines of the .eph files
+EPHEMERIS_MIN_ELEVATION = 22 # OGS tracks from 26°, a bit lower gives some more data at begin and end of a pass
+EPHEMERIS_TOLERANCE_ARCSEC = 0 # > 0: lines are thinned out as long as the interpolation error stays below this
+EPHEMERIS_ADAPTIVE_BASE_STEP_S = 1 # sampling of the native generator before thinning out (adaptive mode only)
+EPHEMERIS_ADAPTIVE_MAX_STEP_S = 60 # longest time between two lines in adaptive mode
+EPHEMERIS_BINARY_STORE = False # True: one memory mapped store per run (ephemerisstore.py) instead of .eph files
+MIN_ALTITUDE_ElEVATION = 26
+TELESCOPE_ADDRESS = "localhost:11111" # Alpaca server of the mount
+TELESCOPE_EPH_ACTION = "sat:ephlines" # Alpaca action that replaces the ephemeris lines of the mount
+TELESCOPE_EPH_APPEND_ACTION = "sat:ephlinesappend" # Alpaca action that appends lines (chunked upload only)
+TELESCOPE_EPH_CHUNK_LINES = 0 # > 0: ephemeris lines are uploaded in chunks of this many lines, 0 -> one call
+TELESCOPE_UPLOAD_RETRIES = 2 # a failed chunk is sent again this often, then the upload can be resumed from it
+TRACK_SCHEDULER_POLL_S = 0.2 # how often the track queue checks whether the current pass has ended
+TELEMETRY_RATE_HZ = 10 # status requests per second while the telescope is connected
+TELEMETRY_BUFFER_S = 3600 # telemetry kept in memory, older samples are overwritten
+TELEMETRY_GUI_REFRESH_S = 0.25 # time between two updates of the tracking labels
+TELEMETRY_STALE_PERIODS = 10 # a track is not followed any more if the newest sample is older than this many periods
+TRACK_LOG_PATH = os.path.join(BASE_DIR, "tracklogs") # telemetry of every track, one directory per night
+TRACK_LOG_FLUSH_ROWS = 100 # samples kept in memory before they are appended to the track log
+PLANETARY_EPHEMERIS = "de421.bsp" # loaded once per process, see utils/skyfieldProvider.py
+SUNLIT_ADAPTIVE = False # True: exact shadow entry/exit by root finding instead of 5 second samples
+PASS_PREDICTION_WORKERS = 1 # processes used for the pass prediction, 0 -> one per CPU core
+PASS_PREDICTION_SHARD_SIZE = 200 # satellites per work package
+PASS_CACHE_MAX_ENTRIES = 20 # least recently used pass cache files are deleted, 0 -> no pass cache
+PASS_CACHE_MARGIN_MIN = 30 # overlap when extending cached windows, longer passes at the joins can be missed
@@ -0,0 +1,36 @@
+import threading
+
+from skyfield.api import load as sky_load
+
+from utils.configManager import PLANETARY_EPHEMERIS
+
+# process wide skyfield objects, created on first use and shared by preprocessing, tracking and the GUI
+_lock = threading.Lock()
+_timescale = None
+_planets = None
+
+
+def get_timescale():
+    """ returns the shared skyfield timescale, loads it on first call
+
+    :rtype: skyfield.timelib.Timescale
+    """
+    global _timescale
+    if _timescale is None:
+        with _lock:
+            if _timescale is None:
+                _timescale = sky_load.timescale()
+    return _timescale
+
+
+def get_planets():
+    """ returns the shared planetary ephemeris (de421 by default), opens and parses the kernel on first call
+
+    :rtype: skyfield.jpllib.SpiceKernel
+    """
+    global _planets
+    if _planets is None:
+        with _lock:
+            if _planets is None:
+                _planets = sky_load(PLANETARY_EPHEMERIS)
+    return _planets